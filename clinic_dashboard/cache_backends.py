@@ -0,0 +1,307 @@
+"""
+Cache backends for clinic_dashboard.
+
+SQLiteCache stores entries in a local SQLite file, so every gunicorn worker
+on the host shares one cache (unlike LocMemCache, which is per process).
+Entries have per-key expiry and the least recently used entries are evicted
+once MAX_ENTRIES is exceeded. Hits and misses are counted per process and
+flushed to the file periodically so ``manage.py cache_stats`` can report a
+host-wide hit rate.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS cache_entry (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed)",
+    """
+    CREATE TABLE IF NOT EXISTS cache_stats (
+        pid INTEGER PRIMARY KEY,
+        hits INTEGER NOT NULL,
+        misses INTEGER NOT NULL,
+        updated REAL NOT NULL
+    )
+    """,
+]
+
+
+class SQLiteCache(BaseCache):
+    """
+    Host-wide cache in a SQLite file (WAL mode).
+
+    OPTIONS:
+      ACCESS_RESOLUTION  seconds between LRU timestamp updates for a hot key;
+                         keeps most reads from turning into writes (default 30)
+      CULL_CHECK_EVERY   number of sets between eviction checks (default 50)
+      STATS_FLUSH_EVERY  seconds between hit/miss counter flushes (default 10)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._access_resolution = float(options.get("ACCESS_RESOLUTION", 30))
+        self._cull_check_every = int(options.get("CULL_CHECK_EVERY", 50))
+        self._stats_flush_every = float(options.get("STATS_FLUSH_EVERY", 10))
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets_since_cull = 0
+        self._hits = 0
+        self._misses = 0
+        self._last_flush = time.monotonic()
+
+    # Connections
+
+    @property
+    def _connection(self):
+        # One connection per thread, reopened after fork (gunicorn preload)
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def close(self, **kwargs):
+        # Connections are cheap to keep and expensive to reopen per request
+        pass
+
+    # Helpers
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+            due = time.monotonic() - self._last_flush >= self._stats_flush_every
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Write this process's hit/miss counters to the shared file."""
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            self._hits = self._misses = 0
+            self._last_flush = time.monotonic()
+        if not hits and not misses:
+            return
+        self._connection.execute(
+            """
+            INSERT INTO cache_stats (pid, hits, misses, updated) VALUES (?, ?, ?, ?)
+            ON CONFLICT (pid) DO UPDATE SET
+                hits = hits + excluded.hits,
+                misses = misses + excluded.misses,
+                updated = excluded.updated
+            """,
+            (os.getpid(), hits, misses, time.time()),
+        )
+
+    def _maybe_cull(self):
+        with self._lock:
+            self._sets_since_cull += 1
+            if self._sets_since_cull < self._cull_check_every:
+                return
+            self._sets_since_cull = 0
+        self._cull()
+
+    def _cull(self):
+        connection = self._connection
+        connection.execute(
+            "DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?",
+            (time.time(),),
+        )
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache_entry").fetchone()
+        if count > self._max_entries:
+            # Evict down to MAX_ENTRIES less a 1/CULL_FREQUENCY margin
+            excess = count - self._max_entries
+            if self._cull_frequency:
+                excess += self._max_entries // self._cull_frequency
+            connection.execute(
+                """
+                DELETE FROM cache_entry WHERE key IN (
+                    SELECT key FROM cache_entry ORDER BY accessed LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+
+    # Cache API
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection.execute(
+            """
+            INSERT INTO cache_entry (key, value, expires, accessed) VALUES (?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                value = excluded.value,
+                expires = excluded.expires,
+                accessed = excluded.accessed
+            WHERE cache_entry.expires IS NOT NULL AND cache_entry.expires <= ?
+            """,
+            (
+                key,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout),
+                now,
+                now,
+            ),
+        )
+        added = cursor.rowcount == 1
+        if added:
+            self._maybe_cull()
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._connection.execute(
+            "SELECT value, expires, accessed FROM cache_entry WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._record(hit=False)
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._connection.execute(
+                "DELETE FROM cache_entry WHERE key = ? AND expires <= ?", (key, now)
+            )
+            self._record(hit=False)
+            return default
+        if now - accessed >= self._access_resolution:
+            self._connection.execute(
+                "UPDATE cache_entry SET accessed = ? WHERE key = ?", (now, key)
+            )
+        self._record(hit=True)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO cache_entry (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                key,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection.execute(
+            "UPDATE cache_entry SET expires = ?, accessed = ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute(
+            "DELETE FROM cache_entry WHERE key = ?", (key,)
+        )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            "SELECT 1 FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Atomically increment an integer value across all processes."""
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value FROM cache_entry WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            connection.execute(
+                "UPDATE cache_entry SET value = ?, accessed = ? WHERE key = ?",
+                (pickle.dumps(new_value, pickle.HIGHEST_PROTOCOL), now, key),
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return new_value
+
+    def clear(self):
+        self._connection.execute("DELETE FROM cache_entry")
+
+    # Reporting
+
+    def stats(self):
+        """Entry count, on-disk size and host-wide hit rate."""
+        self.flush_stats()
+        connection = self._connection
+        (entries,) = connection.execute("SELECT COUNT(*) FROM cache_entry").fetchone()
+        (expired,) = connection.execute(
+            "SELECT COUNT(*) FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?",
+            (time.time(),),
+        ).fetchone()
+        (value_bytes,) = connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache_entry"
+        ).fetchone()
+        hits, misses, processes = connection.execute(
+            "SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0), COUNT(*) "
+            "FROM cache_stats"
+        ).fetchone()
+        file_bytes = sum(
+            os.path.getsize(path)
+            for path in (self._path, f"{self._path}-wal", f"{self._path}-shm")
+            if os.path.exists(path)
+        )
+        lookups = hits + misses
+        return {
+            "location": self._path,
+            "entries": entries,
+            "expired_entries": expired,
+            "max_entries": self._max_entries,
+            "value_bytes": value_bytes,
+            "file_bytes": file_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else None,
+            "processes": processes,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = self._misses = 0
+        self._connection.execute("DELETE FROM cache_stats")
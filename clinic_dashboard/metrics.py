@@ -0,0 +1,395 @@
+"""
+Prometheus-style metrics shared across gunicorn workers.
+
+Each process keeps its counters, histograms and gauges in memory and
+periodically writes them to its own JSON file in METRICS_DIR. The
+``/metrics`` view reads every file, adds them up and renders the Prometheus
+text exposition format, so a scrape served by any worker covers the whole
+host. Files of processes that have exited are folded into one archive file,
+so counters keep growing across worker recycling.
+
+Metrics that are cheaper to read than to track (placement row count, cache
+hit ratios) are collected at scrape time instead.
+"""
+
+import atexit
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: dead process files are left in place
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Request latency buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help)
+METRICS = {
+    "clinic_http_request_duration_seconds": (
+        "histogram",
+        "Request latency by view",
+    ),
+    "clinic_http_responses_total": ("counter", "Responses by view and status code"),
+    "clinic_db_queries_total": ("counter", "Database queries run by view"),
+    "clinic_db_query_seconds_total": ("counter", "Time spent in database queries by view"),
+    "clinic_template_render_seconds_total": (
+        "counter",
+        "Time spent rendering templates by view",
+    ),
+    "clinic_import_jobs_total": ("counter", "Placement import jobs completed"),
+    "clinic_import_rows_total": ("counter", "Placement rows processed by imports, by result"),
+    "clinic_import_seconds_total": ("counter", "Time spent in placement imports"),
+    "clinic_import_last_rows_per_second": (
+        "gauge",
+        "Throughput of the most recent placement import",
+    ),
+    "clinic_single_flight_total": (
+        "counter",
+        "Coalesced computations by outcome (computed, cached, waited, shared, fallback)",
+    ),
+    "clinic_placements_rows": ("gauge", "Rows in the placements table"),
+    "clinic_cache_hits_total": ("counter", "Cache hits (backends that track them)"),
+    "clinic_cache_misses_total": ("counter", "Cache misses (backends that track them)"),
+    "clinic_cache_hit_ratio": ("gauge", "Cache hit ratio (backends that track them)"),
+    "clinic_metrics_processes": ("gauge", "Live processes reporting metrics"),
+}
+
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".lock"
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class ProcessMetrics:
+    """Metrics of one process, flushed to ``<pid>-<start>.json`` in the metrics dir."""
+
+    def __init__(self, directory, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.path = os.path.join(directory, f"{self.pid}-{time.time_ns()}.json")
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+                    break
+            histogram["sum"] += value
+            histogram["count"] += 1
+        self.maybe_flush()
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _labels_key(labels))] = (value, time.time())
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write this process's metrics to its file (atomically)."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            data = {
+                "pid": self.pid,
+                "counters": [[n, dict(l), v] for (n, l), v in self.counters.items()],
+                "histograms": [[n, dict(l), h] for (n, l), h in self.histograms.items()],
+                "gauges": [[n, dict(l), v, t] for (n, l), (v, t) in self.gauges.items()],
+            }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {self.directory}: {e}")
+
+
+_process_metrics = None
+_process_lock = threading.Lock()
+
+
+def get_process_metrics():
+    """Metrics of the current process (re-created after fork)."""
+    global _process_metrics
+    with _process_lock:
+        if _process_metrics is None or _process_metrics.pid != os.getpid():
+            _process_metrics = ProcessMetrics(
+                settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL
+            )
+    return _process_metrics
+
+
+@atexit.register
+def flush_process_metrics():
+    """Write out pending metrics (at exit, or from gunicorn's worker_exit hook)."""
+    if _process_metrics is not None and _process_metrics.pid == os.getpid():
+        _process_metrics.flush()
+
+
+# Recording helpers
+
+
+def observe_request(view_name, status_code, timer):
+    """Record a finished request timed by RequestTimingMiddleware."""
+    metrics = get_process_metrics()
+    metrics.observe("clinic_http_request_duration_seconds", timer.total, view=view_name)
+    metrics.inc("clinic_http_responses_total", view=view_name, status=str(status_code))
+    metrics.inc("clinic_db_queries_total", timer.queries, view=view_name)
+    metrics.inc("clinic_db_query_seconds_total", timer.db_time, view=view_name)
+    metrics.inc("clinic_template_render_seconds_total", timer.template_time, view=view_name)
+
+
+def record_import(stats, method):
+    """Record a finished placement import (stats as returned by import_placements)."""
+    metrics = get_process_metrics()
+    metrics.inc("clinic_import_jobs_total", method=method)
+    for result in ("created", "skipped", "errors", "deleted"):
+        metrics.inc("clinic_import_rows_total", stats[result], result=result)
+    metrics.inc("clinic_import_seconds_total", stats["seconds"])
+    metrics.set_gauge("clinic_import_last_rows_per_second", stats["rows_per_second"])
+    # Imports can run in a short-lived management command process
+    metrics.flush()
+
+
+def record_single_flight(outcome):
+    """Record how a single-flight computation was served (see dashboard/singleflight.py)."""
+    get_process_metrics().inc("clinic_single_flight_total", outcome=outcome)
+
+
+# Aggregation
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(total, data):
+    """Add one process file (or the archive) into ``total``."""
+    for name, labels, value in data.get("counters", []):
+        key = (name, _labels_key(labels))
+        total["counters"][key] = total["counters"].get(key, 0) + value
+    for name, labels, histogram in data.get("histograms", []):
+        key = (name, _labels_key(labels))
+        merged = total["histograms"].setdefault(
+            key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+        )
+        merged["buckets"] = [a + b for a, b in zip(merged["buckets"], histogram["buckets"])]
+        merged["sum"] += histogram["sum"]
+        merged["count"] += histogram["count"]
+    for name, labels, value, timestamp in data.get("gauges", []):
+        # Gauges report the most recently set value across processes
+        key = (name, _labels_key(labels))
+        if key not in total["gauges"] or total["gauges"][key][1] < timestamp:
+            total["gauges"][key] = (value, timestamp)
+
+
+def _empty():
+    return {"counters": {}, "histograms": {}, "gauges": {}}
+
+
+def _serialize(total):
+    return {
+        "counters": [[n, dict(l), v] for (n, l), v in total["counters"].items()],
+        "histograms": [[n, dict(l), h] for (n, l), h in total["histograms"].items()],
+        "gauges": [[n, dict(l), v, t] for (n, l), (v, t) in total["gauges"].items()],
+    }
+
+
+def collect():
+    """
+    Aggregate the metrics of every process on the host.
+
+    Returns ``(metrics, live_processes)``. Files of exited processes are
+    folded into the archive while the directory lock is held.
+    """
+    flush_process_metrics()
+    directory = settings.METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    lock = open(os.path.join(directory, LOCK_FILE), "w")
+    try:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = _empty()
+        _merge(archive, _read(archive_path) or {})
+
+        total = _empty()
+        dead = []
+        live = 0
+        for name in os.listdir(directory):
+            if not name.endswith(".json") or name == ARCHIVE_FILE:
+                continue
+            path = os.path.join(directory, name)
+            data = _read(path)
+            if data is None:
+                continue
+            if fcntl and not _pid_alive(data["pid"]):
+                _merge(archive, data)
+                dead.append(path)
+            else:
+                _merge(total, data)
+                live += 1
+
+        if dead:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(_serialize(archive), f)
+            os.replace(tmp_path, archive_path)
+            for path in dead:
+                os.unlink(path)
+    finally:
+        lock.close()
+
+    _merge(total, _serialize(archive))
+    return total, live
+
+
+# Exposition
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render(total):
+    """Render aggregated metrics in the Prometheus text format."""
+    samples = {}
+    for (name, labels), value in total["counters"].items():
+        samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for (name, labels), (value, _timestamp) in total["gauges"].items():
+        samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for (name, labels), histogram in total["histograms"].items():
+        lines = samples.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}"
+            )
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    output = []
+    for name, (metric_type, help_text) in METRICS.items():
+        if name not in samples:
+            continue
+        output.append(f"# HELP {name} {help_text}")
+        output.append(f"# TYPE {name} {metric_type}")
+        output.extend(sorted(samples[name]))
+    return "\n".join(output) + "\n"
+
+
+def collect_scrape_time(total):
+    """Add metrics read at scrape time: placement row count and cache statistics."""
+    from django.core.cache import caches
+    from placements.models import Placement
+    from placements.routers import use_read_database
+
+    now = time.time()
+    with use_read_database():
+        total["gauges"][("clinic_placements_rows", ())] = (Placement.objects.count(), now)
+
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if not hasattr(cache, "stats"):
+            continue
+        # Backends with stats() already count host-wide
+        stats = cache.stats()
+        labels = (("cache", alias),)
+        total["counters"][("clinic_cache_hits_total", labels)] = stats["hits"]
+        total["counters"][("clinic_cache_misses_total", labels)] = stats["misses"]
+        if stats["hit_rate"] is not None:
+            total["gauges"][("clinic_cache_hit_ratio", labels)] = (stats["hit_rate"], now)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for the whole host.
+
+    When METRICS_TOKEN is configured, every request must send
+    ``Authorization: Bearer <METRICS_TOKEN>``, whatever its address: behind
+    a proxy on the same host every request comes from 127.0.0.1. Without a
+    token, the endpoint is open to METRICS_ALLOWED_IPS.
+    """
+    from django.http import HttpResponse, HttpResponseForbidden
+
+    token = settings.METRICS_TOKEN
+    if token:
+        # Compared as bytes: compare_digest refuses non-ASCII str, and the
+        # server decoded the header's bytes as latin-1
+        allowed = hmac.compare_digest(
+            request.headers.get("Authorization", "").encode("latin-1", "replace"),
+            f"Bearer {token}".encode(),
+        )
+    else:
+        allowed = request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+    if not allowed:
+        return HttpResponseForbidden("Forbidden\n")
+
+    total, live = collect()
+    collect_scrape_time(total)
+    total["gauges"][("clinic_metrics_processes", ())] = (live, time.time())
+    return HttpResponse(render(total), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "dashboard.middleware.RequestTimingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -52,7 +53,9 @@ ROOT_URLCONF = "clinic_dashboard.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates reporting render time to RequestTimingMiddleware
+        "BACKEND": "dashboard.template_backends.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -74,12 +77,247 @@ WSGI_APPLICATION = "clinic_dashboard.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Backend is chosen from the environment: SQLite by default, or a
+# client/server database (PostgreSQL) described by the DB_* variables.
+DB_ENGINE = config("DB_ENGINE", default="django.db.backends.sqlite3")
+
+if DB_ENGINE == "django.db.backends.sqlite3":
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "NAME": config("DB_NAME", default=str(BASE_DIR / "db.sqlite3")),
+            # Keep connections open between requests; pragmas are applied once
+            "CONN_MAX_AGE": config("CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Take the write lock up front so writers queue on busy_timeout
+                # instead of failing when upgrading a read lock
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
     }
+
+    # Read-only connection to the same SQLite file. With WAL, long analytics
+    # queries on this alias never block (or get blocked by) writes on default.
+    DATABASES["read"] = {
+        **DATABASES["default"],
+        "NAME": f"file:{DATABASES['default']['NAME']}?mode=ro",
+        "OPTIONS": {},
+        "TEST": {"MIRROR": "default"},
+    }
+else:
+    # Pooled connections go back to the pool after each request, so they
+    # cannot also be persistent (CONN_MAX_AGE must be 0)
+    DB_POOL = config("DB_POOL", default=False, cast=bool)
+
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "NAME": config("DB_NAME", default="clinic_dashboard"),
+            "USER": config("DB_USER", default="postgres"),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default="localhost"),
+            "PORT": config("DB_PORT", default="5432"),
+            "CONN_MAX_AGE": 0 if DB_POOL else config("CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            # Exports stream through server-side cursors; disable them when
+            # running behind a transaction-pooling PgBouncer
+            "DISABLE_SERVER_SIDE_CURSORS": config(
+                "DB_DISABLE_SERVER_SIDE_CURSORS", default=False, cast=bool
+            ),
+            "OPTIONS": {},
+        }
+    }
+    if DB_POOL:
+        # Requires psycopg 3 with the pool extra: pip install "psycopg[pool]"
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+            "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+        }
+
+    # Optional streaming replica for analytics and export reads
+    DB_READ_HOST = config("DB_READ_HOST", default="")
+    if DB_READ_HOST:
+        DATABASES["read"] = {
+            **DATABASES["default"],
+            "HOST": DB_READ_HOST,
+            "PORT": config("DB_READ_PORT", default=DATABASES["default"]["PORT"]),
+            "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+            "TEST": {"MIRROR": "default"},
+        }
+
+DATABASE_ROUTERS = ["placements.routers.ReadReplicaRouter"]
+
+# SQLite pragmas applied to every new connection (see placements/db.py).
+# WAL lets dashboard readers keep working while an import holds the write lock.
+SQLITE_PRAGMAS = {
+    "journal_mode": config("SQLITE_JOURNAL_MODE", default="WAL"),
+    "synchronous": config("SQLITE_SYNCHRONOUS", default="NORMAL"),
+    "mmap_size": config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int),
+    # Negative values are KiB: -65536 is a 64 MB page cache per connection
+    "cache_size": config("SQLITE_CACHE_SIZE", default=-65536, cast=int),
+    "temp_store": config("SQLITE_TEMP_STORE", default="MEMORY"),
+    "busy_timeout": config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int),  # ms
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# "sqlite" is shared by every worker process on the host; "locmem" is per
+# process and only suitable for a single-process dev server.
+
+# Git-ignored; the sqlite and file caches are rebuilt on demand
+CACHE_DIR = BASE_DIR / "cache"
+
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "clinic-dashboard-cache",
+    },
+    "sqlite": {
+        "BACKEND": "clinic_dashboard.cache_backends.SQLiteCache",
+        "LOCATION": str(CACHE_DIR / "cache.sqlite3"),
+        "TIMEOUT": 3600,
+        "OPTIONS": {
+            "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=20000, cast=int),
+        },
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(CACHE_DIR / "files"),
+        "OPTIONS": {
+            "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=20000, cast=int),
+        },
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL", default="redis://127.0.0.1:6379/1"),
+    },
+}
+
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+
+CACHES = {"default": CACHE_BACKENDS[CACHE_BACKEND]}
+
+# Async analytics (for ASGI deployments, see dashboard/async_views.py)
+ASYNC_ANALYTICS = config("ASYNC_ANALYTICS", default=False, cast=bool)
+# Threads per process running analytics queries concurrently
+ANALYTICS_QUERY_WORKERS = config("ANALYTICS_QUERY_WORKERS", default=8, cast=int)
+# Seconds the analytics pages' template fragments are cached; their keys
+# include the data version, so data changes invalidate them immediately
+ANALYTICS_FRAGMENT_TIMEOUT = config("ANALYTICS_FRAGMENT_TIMEOUT", default=3600, cast=int)
+# Live analytics stream (dashboard/api/analytics/stream/, ASGI only):
+# seconds between data version checks and between heartbeats, seconds
+# before a connection is closed for the browser to reopen, and the
+# reconnection delay suggested to the browser
+ANALYTICS_STREAM_POLL_INTERVAL = config("ANALYTICS_STREAM_POLL_INTERVAL", default=2, cast=float)
+ANALYTICS_STREAM_HEARTBEAT = config("ANALYTICS_STREAM_HEARTBEAT", default=15, cast=float)
+ANALYTICS_STREAM_MAX_AGE = config("ANALYTICS_STREAM_MAX_AGE", default=3600, cast=float)
+ANALYTICS_STREAM_RETRY_MS = config("ANALYTICS_STREAM_RETRY_MS", default=5000, cast=int)
+# Single-flight analytics API results (dashboard/singleflight.py): seconds
+# a request waits for an identical in-flight computation before running its
+# own, and seconds the shared result is kept (its key includes the data
+# version, like the fragments', so it can stay until evicted by a change)
+SINGLE_FLIGHT_WAIT_TIMEOUT = config("SINGLE_FLIGHT_WAIT_TIMEOUT", default=10, cast=int)
+SINGLE_FLIGHT_RESULT_TIMEOUT = config("SINGLE_FLIGHT_RESULT_TIMEOUT", default=3600, cast=int)
+# Seconds a physician's schedule (dashboard/schedules.py) is cached; its key
+# includes that physician's version, so only changes to their own
+# placements invalidate it
+PHYSICIAN_SCHEDULE_TIMEOUT = config("PHYSICIAN_SCHEDULE_TIMEOUT", default=86400, cast=int)
+
+# Analytics cache warming (dashboard/warming.py, `manage.py warm_analytics`),
+# also run after every import (in the background, or before `import_placements`
+# exits). Filter combinations are learned from the last WARM_ANALYTICS_LOG_LINES
+# lines of the access log (point GUNICORN_ACCESS_LOG at the same file); without
+# one, defaults apply
+WARM_ANALYTICS_AFTER_IMPORT = config("WARM_ANALYTICS_AFTER_IMPORT", default=True, cast=bool)
+WARM_ANALYTICS_ACCESS_LOG = config("WARM_ANALYTICS_ACCESS_LOG", default="")
+WARM_ANALYTICS_LOG_LINES = config("WARM_ANALYTICS_LOG_LINES", default=100000, cast=int)
+WARM_ANALYTICS_TOP = config("WARM_ANALYTICS_TOP", default=20, cast=int)
+WARM_ANALYTICS_THREADS = config("WARM_ANALYTICS_THREADS", default=4, cast=int)
+
+# Placement rollups (placements/rollups.py): per-cell HyperLogLog sketches
+# answering distinct-physician counts for any filter combination. Refreshed
+# once every import, save, delete or bulk action commits (rebuilds run on a
+# background thread) and by `manage.py refresh_rollups`; while they are
+# behind the change log, counts are exact
+ANALYTICS_ROLLUPS = config("ANALYTICS_ROLLUPS", default=True, cast=bool)
+
+# Request timing (dashboard/perf.py)
+SERVER_TIMING = config("SERVER_TIMING", default=True, cast=bool)
+# Requests kept per URL name for the percentiles at dashboard/api/perf/
+PERF_WINDOW_SIZE = config("PERF_WINDOW_SIZE", default=1000, cast=int)
+PERF_SLOW_REQUEST_MS = config("PERF_SLOW_REQUEST_MS", default=1000, cast=float)
+
+# Prometheus metrics (clinic_dashboard/metrics.py): one file per process in
+# METRICS_DIR, aggregated by /metrics. The default is git-ignored; point it
+# outside the source tree (e.g. under /run) in production
+METRICS_DIR = config("METRICS_DIR", default=str(BASE_DIR / "metrics"))
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=5, cast=float)
+# Peers allowed to scrape while no token is set; behind a local proxy every
+# request is from 127.0.0.1, so set METRICS_TOKEN (which is then required)
+METRICS_ALLOWED_IPS = config("METRICS_ALLOWED_IPS", default="127.0.0.1,::1", cast=Csv())
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Query budgets (dashboard/querybudget.py): maximum queries per request by
+# URL name, checked by `manage.py check_query_budgets` and, in development,
+# by QueryBudgetMiddleware. Budgets cover a cold cache: filter panels load
+# the department and specialty lists (two queries) and analytics pages run
+# their queries when their fragments or results are not cached
+QUERY_BUDGETS = {
+    "dashboard:login": 2,
+    # Session and user lookups, then the session delete
+    "dashboard:logout": 4,
+    # The rollup lookup, then an exact physician count for small or stale sets
+    "dashboard:home": 9,
+    "dashboard:analytics_department": 6,
+    "dashboard:analytics_specialty": 6,
+    "dashboard:analytics_shifts": 6,
+    "dashboard:analytics_status": 6,
+    "dashboard:analytics_timeline": 6,
+    "dashboard:analytics_api": 8,
+    # One GROUP BY per date range, plus a time series and a physician count
+    # per distinct filter set that asks for them
+    "dashboard:analytics_batch_api": 11,
+    # Up to the first snapshot; later events are polled outside the budget
+    "dashboard:analytics_stream": 8,
+    "dashboard:placement_api": 3,
+    "dashboard:placement_export": 2,
+    "dashboard:perf_api": 2,
+    # The physician and their placements when the schedule is not cached
+    "dashboard:physician_schedule_api": 4,
+    "dashboard:placement_list": 8,
+    "dashboard:placement_create": 2,
+    "dashboard:placement_detail": 3,
+    "dashboard:placement_update": 3,
+    "dashboard:placement_delete": 3,
+    "dashboard:placement_bulk_action": 5,
+    "dashboard:placement_import": 2,
+    "dashboard:placement_download_template": 2,
+    "dashboard:physician_schedule": 4,
+    "dashboard:user_list": 6,
+    "dashboard:user_create": 2,
+    "dashboard:user_detail": 3,
+    "dashboard:user_update": 3,
+    "dashboard:user_delete": 3,
+    "dashboard:profile": 2,
+    "dashboard:settings": 2,
 }
+# A query shape repeated this many times in one request is reported as N+1
+QUERY_REPEAT_THRESHOLD = 5
+QUERY_BUDGET_STRICT = False
+
+# Sampled placement query log replayed by `manage.py analyze_queries`
+# (dashboard/querylog.py); disabled when empty
+QUERY_LOG_PATH = config("QUERY_LOG_PATH", default="")
+QUERY_LOG_SAMPLE_RATE = config("QUERY_LOG_SAMPLE_RATE", default=0.01, cast=float)
+
+# Worker startup budget checked by `manage.py check_startup`
+STARTUP_TIME_BUDGET_MS = config("STARTUP_TIME_BUDGET_MS", default=1500, cast=float)
+# Heavy modules, and the test framework, that must only be imported where
+# they are used
+STARTUP_FORBIDDEN_MODULES = ["pandas", "numpy", "openpyxl", "django.test", "unittest"]
 
 
 # Password validation
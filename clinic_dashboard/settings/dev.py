@@ -4,17 +4,15 @@ Development settings for clinic_dashboard project.
 
 from .base import *
 from .logging import *
+from decouple import config
 
 DEBUG = True
 
 # Database
-# Using SQLite for development
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# SQLite by default, or the DB_* environment variables (see base settings)
+for database in DATABASES.values():
+    if "pool" not in database["OPTIONS"]:
+        database["CONN_MAX_AGE"] = config("CONN_MAX_AGE", default=0, cast=int)
 
 # Email backend for development - prints to console
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -24,6 +22,10 @@ INSTALLED_APPS += [
     # Add django-debug-toolbar if needed later
 ]
 
+# Warn about requests over their QUERY_BUDGETS entry or with N+1 patterns
+MIDDLEWARE += ["dashboard.middleware.QueryBudgetMiddleware"]
+QUERY_BUDGET_STRICT = config("QUERY_BUDGET_STRICT", default=False, cast=bool)
+
 # Allow all hosts in development
 ALLOWED_HOSTS = ["*"]
 
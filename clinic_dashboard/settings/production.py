@@ -23,14 +23,12 @@ X_FRAME_OPTIONS = "DENY"
 # SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 # SECURE_HSTS_PRELOAD = True
 
-# Database - Using SQLite for simplicity
-# SQLite will use the db.sqlite3 file from base settings
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# Database - SQLite (WAL mode and pragmas) unless DB_ENGINE selects
+# PostgreSQL; see base settings. Connections persist across requests in each
+# gunicorn worker unless a connection pool is configured
+for database in DATABASES.values():
+    if "pool" not in database["OPTIONS"]:
+        database["CONN_MAX_AGE"] = config("CONN_MAX_AGE", default=600, cast=int)
 
 # Email Configuration for Production
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
@@ -41,13 +39,23 @@ EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="noreply@example.com")
 
+# Templates are compiled once per process and never reloaded from disk
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    )
+]
+
 # Static files configuration for production
 STATICFILES_STORAGE = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
 
-# Cache Configuration (Optional - configure Redis or Memcached)
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "clinic-dashboard-cache",
-    }
-}
+# Cache Configuration - shared by all gunicorn workers on the host, so
+# invalidations in one worker are seen by the others. Set CACHE_BACKEND=redis
+# (with REDIS_URL) to share across hosts.
+CACHE_BACKEND = config("CACHE_BACKEND", default="sqlite")
+CACHES = {"default": CACHE_BACKENDS[CACHE_BACKEND]}
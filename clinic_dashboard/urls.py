@@ -7,10 +7,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from .metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("dashboard/", include("dashboard.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path("", RedirectView.as_view(url="/dashboard/", permanent=False)),
 ]
 
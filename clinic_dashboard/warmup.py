@@ -0,0 +1,85 @@
+"""
+Warm read-only per-process state before serving requests.
+
+With gunicorn's ``preload_app`` this runs once in the master before it
+forks, so every worker inherits resolved URLconfs, compiled templates and
+dimension lists through copy-on-write memory instead of building them on
+its first requests.
+"""
+
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_url_resolvers():
+    """Import every view module and build the reverse lookup tables. Returns the namespace count."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for _prefix, namespace_resolver in resolver.namespace_dict.values():
+        namespace_resolver.reverse_dict
+    return len(resolver.namespace_dict)
+
+
+def warm_templates():
+    """
+    Compile the project's own templates into the cached template loader.
+
+    Returns the number of templates loaded.
+    """
+    base_dir = str(settings.BASE_DIR)
+    loaded = 0
+    for engine in engines.all():
+        for template_dir in engine.template_dirs:
+            template_dir = str(template_dir)
+            # Third-party templates (admin, crispy) are loaded on demand
+            if not template_dir.startswith(base_dir) or not os.path.isdir(template_dir):
+                continue
+            for root, _dirs, files in os.walk(template_dir):
+                for name in files:
+                    if not name.endswith(".html"):
+                        continue
+                    path = os.path.relpath(os.path.join(root, name), template_dir)
+                    engine.get_template(path.replace(os.sep, "/"))
+                    loaded += 1
+    return loaded
+
+
+def warm_dimensions():
+    """Load the filter dropdown values. Returns the number of values loaded."""
+    from placements.dimensions import warm_dimension_values
+
+    return sum(len(values) for values in warm_dimension_values().values())
+
+
+def warm_up():
+    """
+    Warm URL resolvers, templates and dimension lists.
+
+    Database connections opened on the way are closed again so forked
+    workers never share a connection with the master.
+    """
+    started = time.perf_counter()
+    stats = {
+        "namespaces": warm_url_resolvers(),
+        "templates": warm_templates(),
+    }
+    try:
+        stats["dimension_values"] = warm_dimensions()
+    except DatabaseError as e:
+        # Not migrated yet, or the database is unreachable at boot
+        logger.warning(f"Skipped warming dimension lists: {e}")
+    finally:
+        connections.close_all()
+
+    stats["seconds"] = time.perf_counter() - started
+    details = ", ".join(f"{key}={value}" for key, value in stats.items() if key != "seconds")
+    logger.info(f"Warmed shared state in {stats['seconds']:.2f}s: {details}")
+    return stats
@@ -0,0 +1,231 @@
+"""
+Analytics queries shared by the dashboard pages and API endpoints.
+
+Each function runs one independent query (count_unique_physicians a few in
+sequence) against an already-filtered placement queryset, so callers can
+run them one after another or concurrently (see async_views.py).
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Exists, OuterRef
+from placements.models import Physician
+from placements.rollups import estimate_distinct
+from placements.versioning import get_data_version
+from .filters import canonical_filters
+
+# Facet fields and the ordering of their statistics
+FACET_ORDERING = {
+    "department": "-count",
+    "specialty": "-count",
+    "shift": "shift",
+    "status": "-count",
+}
+
+TIME_SERIES_DAYS = 30
+
+# Filtered sets up to this many rows count physicians from their rows
+PHYSICIAN_SAMPLE_ROWS = 5000
+
+
+class LazyResult:
+    """
+    Zero-argument callable computing ``function(*args)`` on its first call.
+
+    Templates call the callables they look up, so a LazyResult in a page's
+    context runs its query only if the template actually uses the value,
+    and not when the fragment using it is served from the cache.
+    """
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+        self.evaluated = False
+        self.value = None
+
+    def __call__(self):
+        if not self.evaluated:
+            self.value = self.function(*self.args)
+            self.evaluated = True
+        return self.value
+
+
+def resolve(value):
+    """The value of a LazyResult, or ``value`` itself."""
+    return value() if isinstance(value, LazyResult) else value
+
+
+def facet_counts(queryset, field):
+    """Placement counts grouped by ``field``, with null values as "Unknown"."""
+    stats = queryset.values(field).annotate(count=Count("id")).order_by(
+        FACET_ORDERING[field]
+    )
+    return [
+        {field: stat[field] or "Unknown", "count": stat["count"]} for stat in stats
+    ]
+
+
+def time_series(queryset, days=TIME_SERIES_DAYS, today=None):
+    """
+    Daily placement counts for the ``days`` days before today.
+
+    One grouped query; days without placements are filled in with zero.
+    """
+    today = today or datetime.now().date()
+    start = today - timedelta(days=days)
+    counts = dict(
+        queryset.filter(date__gte=start, date__lt=today)
+        .values_list("date")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+    time_series = []
+    for i in range(days):
+        date = start + timedelta(days=i)
+        time_series.append(
+            {"date": date.strftime("%Y-%m-%d"), "count": counts.get(date, 0)}
+        )
+    return time_series
+
+
+def count_unique_physicians(queryset, filters=None):
+    """
+    Number of distinct physicians in the queryset.
+
+    With the ``filters`` the queryset applies (FilterForm cleaned data, {}
+    for none), large sets are counted from the rollup sketches instead:
+    within a few units below the true count up to sketches.SPARSE_LIMIT
+    physicians, within sketches.STANDARD_ERROR (0.81%) beyond, in one
+    query whose cost does not grow with the history the table holds. Sets
+    of fewer than PHYSICIAN_SAMPLE_ROWS placements, and any set while the
+    rollups are behind, are counted from the placements.
+
+    An exact count first reads a filtered set through its own filters, up
+    to PHYSICIAN_SAMPLE_ROWS physician IDs: for a small set that is the
+    whole answer. Larger and unfiltered sets are counted from the
+    physicians table instead, one probe of the placement physician foreign
+    key index per physician, which stops at its first matching row. A
+    DISTINCT over the placements would read every matching row (SQLite also
+    picks the foreign key index for it over a selective date filter).
+    """
+    if filters is not None:
+        rollup = estimate_distinct(filters, "physicians", using=queryset.db)
+        if rollup is not None and rollup[1] >= PHYSICIAN_SAMPLE_ROWS:
+            return rollup[0]
+    if queryset.query.where:
+        physician_ids = list(
+            queryset.order_by().values_list("physician_id", flat=True)[:PHYSICIAN_SAMPLE_ROWS]
+        )
+        if len(physician_ids) < PHYSICIAN_SAMPLE_ROWS:
+            return len(set(physician_ids) - {None})
+    return (
+        Physician.objects.using(queryset.db)
+        .filter(Exists(queryset.order_by().filter(physician=OuterRef("pk"))))
+        .count()
+    )
+
+
+def facet_context(field, stats, total):
+    """
+    Template context for a dedicated facet analytics page.
+
+    ``stats`` and ``total`` may be LazyResults; the JSON then stays lazy too.
+    """
+    return {
+        f"{field}_stats": stats,
+        f"{field}_stats_json": LazyResult(lambda: json.dumps(resolve(stats))),
+        "total_placements": total,
+    }
+
+
+def analytics_api_key(params):
+    """
+    Single-flight key of the analytics API result under the filters in
+    ``params``: the filters, the data version and the date the time series
+    ends at. The payload format is left out, as both share the result.
+    """
+    return ":".join(
+        [
+            "analytics_api",
+            str(get_data_version()),
+            datetime.now().date().isoformat(),
+            canonical_filters(params),
+        ]
+    )
+
+
+def analytics_payload(facet_stats, series, total):
+    """Response body of the analytics API."""
+    return {
+        "department_stats": facet_stats["department"],
+        "specialty_stats": facet_stats["specialty"],
+        "shift_stats": facet_stats["shift"],
+        "status_stats": facet_stats["status"],
+        "time_series": series,
+        "total_count": total,
+    }
+
+
+def columnar_payload(facet_stats, series, total):
+    """
+    Response body of the analytics API with ``?format=columnar``.
+
+    Each facet becomes parallel ``labels``/``counts`` arrays, and the time
+    series its first date plus the day offsets and counts of the days that
+    have placements, so no key name or date string is repeated per entry.
+    """
+    facets = {}
+    for field, stats in facet_stats.items():
+        facets[field] = {
+            "labels": [stat[field] for stat in stats],
+            "counts": [stat["count"] for stat in stats],
+        }
+    active = [(offset, point["count"]) for offset, point in enumerate(series) if point["count"]]
+    return {
+        "format": "columnar",
+        "facets": facets,
+        "time_series": {
+            "start": series[0]["date"] if series else None,
+            "days": len(series),
+            "offsets": [offset for offset, _count in active],
+            "counts": [count for _offset, count in active],
+        },
+        "total_count": total,
+    }
+
+
+def payload_delta(previous, current):
+    """
+    What changed between two columnar payloads: per facet, the counts that
+    differ (0 for labels that disappeared), and the time series and total
+    when they differ. Empty when nothing changed.
+    """
+    delta = {}
+    facets = {}
+    for field, facet in current["facets"].items():
+        before = previous["facets"].get(field, {"labels": [], "counts": []})
+        before = dict(zip(before["labels"], before["counts"]))
+        after = dict(zip(facet["labels"], facet["counts"]))
+        changed = {label: count for label, count in after.items() if before.get(label) != count}
+        changed.update({label: 0 for label in before if label not in after})
+        if changed:
+            facets[field] = changed
+    if facets:
+        delta["facets"] = facets
+    if current["time_series"] != previous["time_series"]:
+        delta["time_series"] = current["time_series"]
+    if current["total_count"] != previous["total_count"]:
+        delta["total_count"] = current["total_count"]
+    return delta
+
+
+# Builders of the analytics API body per ?format= value
+PAYLOAD_FORMATS = {"rows": analytics_payload, "columnar": columnar_payload}
+
+
+def get_payload_format(request):
+    """Payload builder for the request's ``format`` parameter, or None if unknown."""
+    return PAYLOAD_FORMATS.get(request.GET.get("format") or "rows")
+
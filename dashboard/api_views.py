@@ -0,0 +1,242 @@
+"""
+Read-only JSON API views for placement data.
+"""
+
+import base64
+import binascii
+import csv
+import json
+import os
+from itertools import chain
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from placements.models import Placement
+from placements.routers import read_database
+from .batch import parse_batch, run_batch
+from .compression import compress_page
+from .filters import apply_placement_filters, apply_placement_search
+from .forms import PhysicianScheduleForm, PlacementApiForm
+from .perf import get_perf_stats
+from .schedules import get_schedule
+
+# Columns that can be requested through ?fields=
+PLACEMENT_API_FIELDS = [
+    "id",
+    "date",
+    "shift",
+    "physician_name",
+    "physician_id",
+    "department",
+    "specialty",
+    "status",
+    "area",
+    "room_number",
+]
+
+DEFAULT_PAGE_SIZE = 100
+
+# Rows fetched per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+
+def encode_cursor(last_id):
+    """Encode the last returned primary key as an opaque cursor string."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, or return None if invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def parse_fields(value):
+    """
+    Parse a comma-separated ?fields= value.
+
+    Returns the list of requested columns (all columns when empty) and the
+    list of unknown names.
+    """
+    if not value:
+        return list(PLACEMENT_API_FIELDS), []
+    requested = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in PLACEMENT_API_FIELDS]
+    # Drop duplicates while keeping the requested order
+    return list(dict.fromkeys(requested)), unknown
+
+
+@require_GET
+@login_required
+@compress_page
+@read_database
+def placement_list_api(request):
+    """
+    JSON list of placements with cursor pagination.
+
+    Accepts the FilterForm filters plus ``search``, ``fields`` (comma
+    separated column names), ``limit`` and ``cursor``. Rows are serialized
+    straight from ``values_list()`` tuples and ordered by primary key, so a
+    cursor is just the last id seen and every page is an index range scan.
+    """
+    form = PlacementApiForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    fields, unknown = parse_fields(request.GET.get("fields", ""))
+    if unknown:
+        return JsonResponse(
+            {
+                "errors": {"fields": [f"Unknown field(s): {', '.join(unknown)}"]},
+                "allowed_fields": PLACEMENT_API_FIELDS,
+            },
+            status=400,
+        )
+
+    queryset = apply_placement_filters(Placement.objects.all(), form.cleaned_data)
+    queryset = apply_placement_search(queryset, form.cleaned_data.get("search"))
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        last_id = decode_cursor(cursor)
+        if last_id is None:
+            return JsonResponse({"errors": {"cursor": ["Invalid cursor."]}}, status=400)
+        queryset = queryset.filter(id__gt=last_id)
+
+    limit = form.cleaned_data.get("limit") or DEFAULT_PAGE_SIZE
+
+    # Always fetch the id first so the cursor can be built even when the
+    # client did not ask for it; one extra row tells us if there is a next page
+    rows = list(queryset.order_by("id").values_list("id", *fields)[: limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    next_url = None
+    if has_next:
+        params = request.GET.copy()
+        params["cursor"] = encode_cursor(rows[-1][0])
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+    data = {
+        "fields": fields,
+        "next": next_url,
+        "results": [dict(zip(fields, row[1:])) for row in rows],
+    }
+
+    return JsonResponse(data, json_dumps_params={"separators": (",", ":")})
+
+
+@require_GET
+@login_required
+@compress_page
+@read_database
+def physician_schedule_api(request, physician_id):
+    """
+    One physician's placements as compact ``[date, shift, room]`` rows.
+
+    Takes optional ``from`` and ``to`` dates (see schedules.schedule_range).
+    Cached per physician, so repeated requests run no placement query until
+    that physician's placements change.
+    """
+    form = PhysicianScheduleForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    schedule = get_schedule(physician_id, form.cleaned_data["from"], form.cleaned_data["to"])
+    if schedule is None:
+        return JsonResponse({"errors": {"physician": ["Unknown physician."]}}, status=404)
+    return JsonResponse(schedule, json_dumps_params={"separators": (",", ":")})
+
+
+class _Echo:
+    """File-like object handing each CSV line straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+@require_GET
+@login_required
+@compress_page
+@read_database
+def placement_export_csv(request):
+    """
+    Stream placements matching the filters and search as CSV.
+
+    Rows are read with ``iterator()``, which uses a server-side cursor on
+    PostgreSQL, so memory stays flat regardless of the export size.
+    """
+    form = PlacementApiForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    fields, unknown = parse_fields(request.GET.get("fields", ""))
+    if unknown:
+        return JsonResponse(
+            {"errors": {"fields": [f"Unknown field(s): {', '.join(unknown)}"]}},
+            status=400,
+        )
+
+    queryset = apply_placement_filters(Placement.objects.all(), form.cleaned_data)
+    queryset = apply_placement_search(queryset, form.cleaned_data.get("search"))
+    queryset = queryset.order_by("id").values_list(*fields)
+    # Rows are fetched while the response streams, after the view (and the
+    # read-database scope) has returned, so pin the alias chosen now
+    queryset = queryset.using(queryset.db)
+
+    writer = csv.writer(_Echo())
+    rows = chain([fields], queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type="text/csv"
+    )
+    response["Content-Disposition"] = 'attachment; filename="placements.csv"'
+    return response
+
+
+@require_POST
+@login_required
+@compress_page
+@read_database
+def analytics_batch_api(request):
+    """
+    Several analytics requests in one call (see batch.py).
+
+    Takes a JSON body ``{"requests": [{"name", "type", "filters", ...}]}``
+    and returns ``{"results": {name: result}, "scans": n}``, where ``scans``
+    is the number of GROUP BY scans the batch took (one per date range).
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"errors": {"__all__": ["Invalid JSON body."]}}, status=400)
+
+    requests, errors = parse_batch(data)
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    results, scans = run_batch(requests)
+    return JsonResponse(
+        {"results": results, "scans": scans}, json_dumps_params={"separators": (",", ":")}
+    )
+
+
+@require_GET
+@login_required
+def perf_stats_api(request):
+    """
+    Request timing percentiles per URL name, for staff.
+
+    Numbers cover this worker process only; ``?reset=1`` clears them.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"errors": {"__all__": ["Staff only."]}}, status=403)
+
+    stats = get_perf_stats()
+    data = {"pid": os.getpid(), "window": stats.window, "views": stats.snapshot()}
+    if request.GET.get("reset"):
+        stats.reset()
+    return JsonResponse(data)
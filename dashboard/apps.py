@@ -9,3 +9,13 @@ class DashboardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dashboard"
     verbose_name = "Dashboard"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from placements.signals import placements_imported
+        from . import perf, querybudget, querylog, warming
+
+        connection_created.connect(perf.install_query_timer)
+        connection_created.connect(querybudget.install_query_recorder)
+        connection_created.connect(querylog.install_query_log)
+        placements_imported.connect(warming.warm_after_import)
@@ -0,0 +1,344 @@
+"""
+Async versions of the analytics pages and API, for ASGI deployments.
+
+Every analytics request needs several independent aggregate queries (one
+per facet, the time series, the totals). The sync views run them one after
+another; these views hand each query to a bounded thread pool and await
+them together, so a request costs roughly its slowest query instead of the
+sum of all of them. The pool size (ANALYTICS_QUERY_WORKERS) caps how many
+queries one worker process runs at once, whatever the number of open
+requests.
+
+Enabled with ASYNC_ANALYTICS=True, which swaps these views in under the
+same URL names (see urls.py).
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.generic import TemplateView
+from placements.models import Placement
+from placements.routers import read_database, use_read_database
+from placements.versioning import get_data_version
+from .analytics import (
+    FACET_ORDERING,
+    PAYLOAD_FORMATS,
+    LazyResult,
+    analytics_api_key,
+    columnar_payload,
+    count_unique_physicians,
+    facet_context,
+    facet_counts,
+    get_payload_format,
+    payload_delta,
+    resolve,
+    time_series,
+)
+from .compression import compress_page
+from .filters import apply_placement_filters
+from .forms import FilterForm
+from .fragments import fragment_context, fragments_cached
+from .mixins import AsyncLoginRequiredMixin, ReadDatabaseMixin
+from .singleflight import single_flight
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_query_executor():
+    """
+    Thread pool shared by all analytics requests of this process.
+
+    Created on first use so no threads exist before gunicorn forks.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ANALYTICS_QUERY_WORKERS,
+                thread_name_prefix="analytics-query",
+            )
+    return _executor
+
+
+def _run_query(func, *args, **kwargs):
+    # Pool threads keep their connections between tasks; drop the ones
+    # past CONN_MAX_AGE or broken, as request_started does for sync views
+    close_old_connections()
+    return func(*args, **kwargs)
+
+
+async def run_query(func, *args, **kwargs):
+    """Run a blocking ORM call on the analytics thread pool."""
+    # sync_to_async copies the context, so use_read_database() still applies
+    return await sync_to_async(
+        _run_query, thread_sensitive=False, executor=get_query_executor()
+    )(func, *args, **kwargs)
+
+
+async def gather_queries(*calls):
+    """Run ``(func, *args)`` calls concurrently and return their results in order."""
+    return await asyncio.gather(*(run_query(*call) for call in calls))
+
+
+async def get_analytics(params):
+    """
+    Facet counts, time series and total of the analytics API under the
+    filters in ``params``, shared with identical concurrent requests (see
+    singleflight.py).
+    """
+    queryset = apply_placement_filters(Placement.objects.all(), params)
+
+    async def compute():
+        fields = list(FACET_ORDERING)
+        *stats, series, total = await gather_queries(
+            *((facet_counts, queryset, field) for field in fields),
+            (time_series, queryset),
+            (queryset.count,),
+        )
+        return dict(zip(fields, stats)), series, total
+
+    def coalesced():
+        with use_read_database():
+            return single_flight(analytics_api_key(params), async_to_sync(compute))
+
+    # Followers block while they wait, so not on the analytics query pool,
+    # whose threads the leader needs
+    return await sync_to_async(coalesced, thread_sensitive=False)()
+
+
+@login_required
+@compress_page
+@read_database
+async def async_analytics_data_api(request):
+    """
+    API endpoint for analytics data (async).
+
+    Same response as analytics_data_api, with the facet, time series and
+    total queries run concurrently.
+    """
+    payload = get_payload_format(request)
+    if payload is None:
+        return JsonResponse(
+            {"errors": {"format": [f"Unknown format; use one of: {', '.join(PAYLOAD_FORMATS)}."]}},
+            status=400,
+        )
+
+    data = payload(*await get_analytics(request.GET))
+    return JsonResponse(data, json_dumps_params={"separators": (",", ":")})
+
+
+def sse_event(event, data):
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def analytics_events(params):
+    """
+    Server-Sent Events for a live analytics screen under the filters in
+    ``params``: a ``snapshot`` (the columnar API payload) on connect, then a
+    ``delta`` with only the changed counts whenever the data version moves,
+    and heartbeat comments in between so proxies keep the connection open.
+    """
+    started = time.monotonic()
+    yield f"retry: {settings.ANALYTICS_STREAM_RETRY_MS}\n\n"
+
+    version = await run_query(get_data_version)
+    payload = columnar_payload(*await get_analytics(params))
+    yield sse_event("snapshot", {**payload, "version": version})
+    last_sent = time.monotonic()
+
+    # Closed after a while; the browser reconnects and gets a fresh snapshot
+    while time.monotonic() - started < settings.ANALYTICS_STREAM_MAX_AGE:
+        await asyncio.sleep(settings.ANALYTICS_STREAM_POLL_INTERVAL)
+        current = await run_query(get_data_version)
+        if current != version:
+            version = current
+            # Every screen on these filters wakes up now; single_flight
+            # makes that one computation, not one per screen
+            previous, payload = payload, columnar_payload(*await get_analytics(params))
+            delta = payload_delta(previous, payload)
+            if delta:
+                yield sse_event("delta", {**delta, "version": version})
+                last_sent = time.monotonic()
+                continue
+        if time.monotonic() - last_sent >= settings.ANALYTICS_STREAM_HEARTBEAT:
+            yield ": heartbeat\n\n"
+            last_sent = time.monotonic()
+
+
+@login_required
+async def async_analytics_stream(request):
+    """
+    Live analytics updates as Server-Sent Events (see analytics_events).
+
+    Each open connection costs a data version lookup per poll interval, not
+    a recomputation, so screens can stay open all day.
+    """
+    response = StreamingHttpResponse(
+        analytics_events(request.GET), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the events
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+class AsyncAnalyticsView(ReadDatabaseMixin, AsyncLoginRequiredMixin, TemplateView):
+    """Base async analytics page; subclasses implement aget_context_data()."""
+
+    async def get(self, request, *args, **kwargs):
+        context = await self.aget_context_data(**kwargs)
+        return self.render_to_response(context)
+
+    async def aget_context_data(self, **kwargs):
+        return self.get_context_data(**kwargs)
+
+    async def get_filter_form(self, **kwargs):
+        # FilterForm loads its department/specialty choices from the database
+        return await run_query(FilterForm, self.request.GET or None, **kwargs)
+
+    async def get_fragment_context(self, page, exclude=()):
+        """Fragment cache context, and whether the fragments are all cached."""
+        context = await run_query(fragment_context, page, self.request.GET, exclude)
+        return context, await run_query(fragments_cached, context)
+
+
+class AsyncDashboardHomeView(AsyncAnalyticsView):
+    """Main analytics dashboard view (async)."""
+
+    template_name = "dashboard/home.html"
+
+    async def aget_context_data(self, **kwargs):
+        context = await super().aget_context_data(**kwargs)
+
+        filter_form = await self.get_filter_form()
+        context["filter_form"] = filter_form
+
+        queryset = Placement.objects.all()
+        filters = {}
+        if filter_form.is_valid():
+            filters = filter_form.cleaned_data
+            queryset = apply_placement_filters(queryset, filters)
+
+        (
+            context["total_placements"],
+            context["full_time_placements"],
+            context["part_time_placements"],
+            context["unique_physicians"],
+        ) = await gather_queries(
+            (queryset.count,),
+            (queryset.filter(status="Full Time").count,),
+            (queryset.filter(status="Part Time").count,),
+            (count_unique_physicians, queryset, filters),
+        )
+
+        return context
+
+
+class AsyncFacetAnalyticsView(AsyncAnalyticsView):
+    """Async page for the statistics of one placement field."""
+
+    facet_field = None
+
+    async def aget_context_data(self, **kwargs):
+        context = await super().aget_context_data(**kwargs)
+
+        filter_form = await self.get_filter_form(exclude_field=self.facet_field)
+        context["filter_form"] = filter_form
+
+        queryset = Placement.objects.all()
+        if filter_form.is_valid():
+            queryset = apply_placement_filters(queryset, filter_form.cleaned_data)
+
+        fragments, cached = await self.get_fragment_context(
+            self.facet_field, exclude=(self.facet_field,)
+        )
+        context.update(fragments)
+        if cached:
+            # Only evaluated if a fragment expires before the page renders
+            stats = LazyResult(facet_counts, queryset, self.facet_field)
+            total = LazyResult(queryset.count)
+        else:
+            stats, total = await gather_queries(
+                (facet_counts, queryset, self.facet_field),
+                (queryset.count,),
+            )
+        context.update(facet_context(self.facet_field, stats, total))
+
+        return context
+
+
+class AsyncDepartmentAnalyticsView(AsyncFacetAnalyticsView):
+    """Department analytics page (async)."""
+
+    facet_field = "department"
+    template_name = "dashboard/analytics/department.html"
+
+
+class AsyncSpecialtyAnalyticsView(AsyncFacetAnalyticsView):
+    """Specialty analytics page (async)."""
+
+    facet_field = "specialty"
+    template_name = "dashboard/analytics/specialty.html"
+
+
+class AsyncShiftAnalyticsView(AsyncFacetAnalyticsView):
+    """Shift analytics page (async)."""
+
+    facet_field = "shift"
+    template_name = "dashboard/analytics/shifts.html"
+
+
+class AsyncStatusAnalyticsView(AsyncFacetAnalyticsView):
+    """Employment status analytics page (async)."""
+
+    facet_field = "status"
+    template_name = "dashboard/analytics/status.html"
+
+
+class AsyncTimelineAnalyticsView(AsyncAnalyticsView):
+    """Timeline/trend analytics page (async)."""
+
+    template_name = "dashboard/analytics/timeline.html"
+
+    async def aget_context_data(self, **kwargs):
+        context = await super().aget_context_data(**kwargs)
+
+        # Timeline is about dates, so the date filters are not offered
+        filter_form = await self.get_filter_form(exclude_field=None)
+        del filter_form.fields["start_date"]
+        del filter_form.fields["end_date"]
+        context["filter_form"] = filter_form
+
+        queryset = apply_placement_filters(
+            Placement.objects.all(),
+            self.request.GET,
+            exclude=("start_date", "end_date"),
+        )
+
+        fragments, cached = await self.get_fragment_context(
+            "timeline", exclude=("start_date", "end_date")
+        )
+        context.update(fragments)
+        if cached:
+            series = LazyResult(time_series, queryset)
+            total = LazyResult(queryset.count)
+        else:
+            series, total = await gather_queries(
+                (time_series, queryset),
+                (queryset.count,),
+            )
+        context["time_series"] = series
+        context["time_series_json"] = LazyResult(lambda: json.dumps(resolve(series)))
+        context["total_placements"] = total
+
+        return context
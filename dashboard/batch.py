@@ -0,0 +1,272 @@
+"""
+Batched analytics requests for ``dashboard/api/analytics/batch/``.
+
+A batch is a list of named requests, each one of:
+
+- ``facet``: counts per value of ``field``, like the analytics API,
+- ``timeseries``: daily counts for the last ``days`` days (default 30),
+- ``kpis``: total, full-time and part-time placements and unique physicians,
+- ``crosstab``: counts per (``rows``, ``columns``) pair of fields,
+
+each with its own ``filters`` (the FilterForm fields). Requests are grouped
+by their canonical filter set, and filter sets with the same date range
+share one scan: a single GROUP BY over the union of the dimensions their
+requests need plus every dimension their equality filters differ on (see
+plan_scans). Each filter set then picks its rows out of that cube in
+Python, and facets, crosstabs and the totals are summed from them. So
+``{}`` and ``{"department": "ER"}`` cost one scan grouped by department
+too, and ``{"department": "ER"}`` and ``{"department": "IM"}`` one scan
+restricted to ``department IN ('ER', 'IM')``. Unique physicians and time
+series need a filter set's exact rows and cost one more query each per
+filter set, the time series at the longest requested length.
+"""
+
+from collections import Counter, OrderedDict
+from datetime import date
+
+from django.db.models import Count
+from placements.models import Placement
+from .analytics import FACET_ORDERING, count_unique_physicians, time_series
+from .filters import FILTER_FIELDS, apply_placement_filters
+from .forms import PlacementApiForm
+
+BATCH_TYPES = ["facet", "timeseries", "kpis", "crosstab"]
+MAX_BATCH_SIZE = 50
+MAX_TIME_SERIES_DAYS = 366
+
+
+def filter_key(cleaned_data):
+    """Hashable canonical form of a request's filters."""
+    key = []
+    for name in FILTER_FIELDS:
+        value = cleaned_data.get(name)
+        if value:
+            key.append((name, value.isoformat() if isinstance(value, date) else value))
+    return tuple(key)
+
+
+def parse_request(item):
+    """Validate one batch entry. Returns ``(request, errors)``."""
+    if not isinstance(item, dict):
+        return None, ["Each request must be an object."]
+    errors = []
+    kind = item.get("type")
+    if kind not in BATCH_TYPES:
+        errors.append(f"type must be one of: {', '.join(BATCH_TYPES)}.")
+
+    filters = item.get("filters") or {}
+    if not isinstance(filters, dict):
+        errors.append("filters must be an object.")
+        filters = {}
+    unknown = sorted(set(filters) - set(FILTER_FIELDS))
+    if unknown:
+        errors.append(f"Unknown filter(s): {', '.join(unknown)}.")
+    form = PlacementApiForm({name: filters[name] for name in FILTER_FIELDS if name in filters})
+    if not form.is_valid():
+        errors.extend(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items())
+
+    request = {"type": kind}
+    if kind == "facet":
+        request["field"] = item.get("field")
+        if request["field"] not in FACET_ORDERING:
+            errors.append(f"field must be one of: {', '.join(FACET_ORDERING)}.")
+    elif kind == "crosstab":
+        request["rows"], request["columns"] = item.get("rows"), item.get("columns")
+        if request["rows"] not in FACET_ORDERING or request["columns"] not in FACET_ORDERING:
+            errors.append(f"rows and columns must be among: {', '.join(FACET_ORDERING)}.")
+        elif request["rows"] == request["columns"]:
+            errors.append("rows and columns must be different fields.")
+    elif kind == "timeseries":
+        request["days"] = item.get("days", 30)
+        if (
+            not isinstance(request["days"], int)
+            or isinstance(request["days"], bool)
+            or not 1 <= request["days"] <= MAX_TIME_SERIES_DAYS
+        ):
+            errors.append(f"days must be an integer from 1 to {MAX_TIME_SERIES_DAYS}.")
+
+    if errors:
+        return None, errors
+    request["filters"] = form.cleaned_data
+    return request, []
+
+
+def parse_batch(data):
+    """
+    Validate a batch body. Returns ``(OrderedDict of name -> request, errors)``.
+
+    Errors of individual requests are keyed by their name (or position, for
+    unnamed requests) under ``"requests"``.
+    """
+    items = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, {"requests": ["Expected a non-empty list of requests."]}
+    if len(items) > MAX_BATCH_SIZE:
+        return None, {"requests": [f"At most {MAX_BATCH_SIZE} requests per batch."]}
+
+    requests, errors = OrderedDict(), {}
+    for position, item in enumerate(items):
+        name = item.get("name") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not name:
+            errors[str(position)] = ["name is required."]
+            continue
+        if name in requests or name in errors:
+            errors[name] = ["Duplicate request name."]
+            continue
+        request, request_errors = parse_request(item)
+        if request_errors:
+            errors[name] = request_errors
+        else:
+            requests[name] = request
+    return requests, {"requests": errors} if errors else {}
+
+
+def plan_batch(requests):
+    """Group requests by filter set, with the scans each group needs."""
+    groups = OrderedDict()
+    for name, request in requests.items():
+        group = groups.setdefault(
+            filter_key(request["filters"]),
+            {
+                "filters": request["filters"],
+                "dimensions": [],
+                "kpis": False,
+                "days": 0,
+                "requests": [],
+            },
+        )
+        group["requests"].append(name)
+        if request["type"] == "facet":
+            fields = [request["field"]]
+        elif request["type"] == "crosstab":
+            fields = [request["rows"], request["columns"]]
+        elif request["type"] == "kpis":
+            # Full/part-time counts come from the status totals
+            group["kpis"] = True
+            fields = ["status"]
+        else:
+            group["days"] = max(group["days"], request["days"])
+            fields = []
+        for field in fields:
+            if field not in group["dimensions"]:
+                group["dimensions"].append(field)
+    return groups
+
+
+def plan_scans(groups):
+    """
+    Merge filter groups needing a cube into scans: one per date range.
+
+    Returns a list of scans, each a dict with the SQL ``filters`` (the
+    date range, equality filters shared by every member, and ``<field>__in``
+    lists for dimensions every member filters on with different values),
+    the ``dimensions`` to group by and the member filter ``groups``.
+    """
+    scans = OrderedDict()
+    for group in groups.values():
+        if not group["dimensions"]:
+            continue
+        filters = group["filters"]
+        key = (filters.get("start_date"), filters.get("end_date"))
+        scans.setdefault(key, []).append(group)
+
+    plans = []
+    for (start, end), members in scans.items():
+        filters = {"start_date": start, "end_date": end}
+        dimensions = []
+        for group in members:
+            dimensions.extend(d for d in group["dimensions"] if d not in dimensions)
+        for field in FACET_ORDERING:
+            values = {group["filters"].get(field) or None for group in members}
+            if len(values) == 1:
+                # The same filter (or none) for every member stays in SQL
+                filters[field] = values.pop()
+                continue
+            # Members differ on this field: group by it and split in Python
+            if field not in dimensions:
+                dimensions.append(field)
+            if None not in values:
+                filters[f"{field}__in"] = sorted(values)
+        plans.append({"filters": filters, "dimensions": dimensions, "groups": members})
+    return plans
+
+
+def _scan(plan):
+    """The cube of a scan plan: one row per combination of its dimensions."""
+    filters = plan["filters"]
+    queryset = apply_placement_filters(Placement.objects.all(), filters)
+    for field in FACET_ORDERING:
+        if filters.get(f"{field}__in"):
+            queryset = queryset.filter(**{f"{field}__in": filters[f"{field}__in"]})
+    return list(queryset.values(*plan["dimensions"]).annotate(count=Count("id")).order_by())
+
+
+def _rows_of(cube, filters):
+    """The cube rows matching a filter set's equality filters."""
+    equal = {field: filters[field] for field in FACET_ORDERING if filters.get(field)}
+    return [row for row in cube if all(row[f] == value for f, value in equal.items())]
+
+
+def _facet(cube, field):
+    counts = Counter()
+    for row in cube:
+        counts[row[field]] += row["count"]
+    if FACET_ORDERING[field] == "-count":
+        ordered = sorted(counts.items(), key=lambda item: -item[1])
+    else:
+        # Same order as ORDER BY <field>, nulls first
+        ordered = sorted(counts.items(), key=lambda item: (item[0] is not None, item[0] or ""))
+    return [{field: value or "Unknown", "count": count} for value, count in ordered]
+
+
+def _crosstab(cube, rows, columns):
+    counts = Counter()
+    for row in cube:
+        counts[(row[rows] or "Unknown", row[columns] or "Unknown")] += row["count"]
+    row_labels = sorted({key[0] for key in counts})
+    column_labels = sorted({key[1] for key in counts})
+    return {
+        "rows": row_labels,
+        "columns": column_labels,
+        "counts": [[counts[(r, c)] for c in column_labels] for r in row_labels],
+    }
+
+
+def run_batch(requests):
+    """Results of a validated batch keyed by request name, and the number of cube scans."""
+    results = {}
+    groups = plan_batch(requests)
+    plans = plan_scans(groups)
+    cubes = {}
+    for plan in plans:
+        cube = _scan(plan)
+        for group in plan["groups"]:
+            cubes[id(group)] = _rows_of(cube, group["filters"])
+
+    for group in groups.values():
+        queryset = apply_placement_filters(Placement.objects.all(), group["filters"])
+        cube = cubes.get(id(group), [])
+        series = time_series(queryset, days=group["days"]) if group["days"] else []
+        unique_physicians = (
+            count_unique_physicians(queryset, group["filters"]) if group["kpis"] else None
+        )
+
+        for name in group["requests"]:
+            request = requests[name]
+            if request["type"] == "facet":
+                results[name] = _facet(cube, request["field"])
+            elif request["type"] == "crosstab":
+                results[name] = _crosstab(cube, request["rows"], request["columns"])
+            elif request["type"] == "timeseries":
+                results[name] = series[len(series) - request["days"]:]
+            else:
+                status_counts = Counter()
+                for row in cube:
+                    status_counts[row["status"]] += row["count"]
+                results[name] = {
+                    "total_placements": sum(status_counts.values()),
+                    "full_time_placements": status_counts["Full Time"],
+                    "part_time_placements": status_counts["Part Time"],
+                    "unique_physicians": unique_physicians,
+                }
+    return results, len(plans)
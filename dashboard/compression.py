@@ -0,0 +1,53 @@
+"""
+Response compression for the JSON API views.
+
+``compress_page`` works like Django's ``gzip_page`` but answers with brotli
+when the client accepts it and the ``brotli`` package is installed, which
+shrinks JSON a good deal further than gzip. Everything else (streaming
+responses, clients without brotli) goes through GZipMiddleware unchanged.
+"""
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only
+    brotli = None
+
+# 0-11; 11 is far too slow for per-request compression
+BROTLI_QUALITY = 5
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware preferring brotli for clients that accept it."""
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or len(response.content) < 200
+            or response.has_header("Content-Encoding")
+            or not re_accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed_content = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+compress_page = decorator_from_middleware(CompressionMiddleware)
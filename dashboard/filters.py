@@ -0,0 +1,54 @@
+"""
+Shared queryset filtering for placement views and API endpoints.
+"""
+
+from urllib.parse import urlencode
+
+from django.db.models import Q
+
+# FilterForm fields, in the order they are applied
+FILTER_FIELDS = ["start_date", "end_date", "department", "specialty", "shift", "status"]
+
+
+def apply_placement_filters(queryset, cleaned_data, exclude=()):
+    """
+    Apply FilterForm-style filters to a placement queryset.
+
+    ``cleaned_data`` is a form's cleaned data (or any mapping with the same
+    keys); empty values are ignored. Fields listed in ``exclude`` are skipped,
+    which is how the dedicated analytics pages drop their own dimension.
+    """
+    if cleaned_data.get("start_date") and "start_date" not in exclude:
+        queryset = queryset.filter(date__gte=cleaned_data["start_date"])
+    if cleaned_data.get("end_date") and "end_date" not in exclude:
+        queryset = queryset.filter(date__lte=cleaned_data["end_date"])
+    for field in ("department", "specialty", "shift", "status"):
+        if cleaned_data.get(field) and field not in exclude:
+            queryset = queryset.filter(**{field: cleaned_data[field]})
+    return queryset
+
+
+def canonical_filters(params, exclude=()):
+    """
+    The non-empty filters in ``params`` as a query string in a fixed order,
+    so requests applying the same filters share cache keys.
+    """
+    return urlencode(
+        sorted(
+            (name, params.get(name))
+            for name in FILTER_FIELDS
+            if name not in exclude and params.get(name)
+        )
+    )
+
+
+def apply_placement_search(queryset, search):
+    """Apply the free-text search used by the placement list."""
+    if search:
+        queryset = queryset.filter(
+            Q(physician_name__icontains=search)
+            | Q(department__icontains=search)
+            | Q(specialty__icontains=search)
+            | Q(area__icontains=search)
+        )
+    return queryset
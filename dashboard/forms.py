@@ -5,7 +5,8 @@ Forms for dashboard app.
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from placements.models import Placement
+from placements.dimensions import get_dimension_values
+from placements.models import Physician, Placement
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Field
 
@@ -13,13 +14,20 @@ from crispy_forms.layout import Layout, Submit, Row, Column, Field
 class PlacementForm(forms.ModelForm):
     """Form for creating and editing placements."""
 
+    # Entered as a plain ID; unknown IDs create their Physician on save
+    physician_id = forms.IntegerField(
+        required=False,
+        label="Physician ID",
+        help_text="Physician unique ID",
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+
     class Meta:
         model = Placement
         fields = [
             "date",
             "shift",
             "physician_name",
-            "physician_id",
             "department",
             "specialty",
             "status",
@@ -30,7 +38,6 @@ class PlacementForm(forms.ModelForm):
             "date": forms.DateInput(attrs={"type": "date", "class": "form-control"}),
             "shift": forms.Select(attrs={"class": "form-select"}),
             "physician_name": forms.TextInput(attrs={"class": "form-control"}),
-            "physician_id": forms.NumberInput(attrs={"class": "form-control"}),
             "department": forms.TextInput(attrs={"class": "form-control"}),
             "specialty": forms.TextInput(attrs={"class": "form-control"}),
             "status": forms.Select(attrs={"class": "form-select"}),
@@ -40,6 +47,7 @@ class PlacementForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields["physician_id"].initial = self.instance.physician_id
         self.helper = FormHelper()
         self.helper.form_method = "post"
         self.helper.layout = Layout(
@@ -63,6 +71,16 @@ class PlacementForm(forms.ModelForm):
             Submit("submit", "Save Placement", css_class="btn btn-primary mt-3"),
         )
 
+    def save(self, commit=True):
+        """Save the placement, creating its physician first if the ID is new."""
+        self.instance.physician_id = self.cleaned_data.get("physician_id")
+        if commit and self.instance.physician_id is not None:
+            Physician.objects.get_or_create(
+                physician_id=self.instance.physician_id,
+                defaults={"name": self.instance.physician_name or ""},
+            )
+        return super().save(commit)
+
 
 class FilterForm(forms.Form):
     """Form for filtering analytics data."""
@@ -102,27 +120,130 @@ class FilterForm(forms.Form):
 
         # Populate department choices dynamically
         if "department" in self.fields:
-            departments = (
-                Placement.objects.values_list("department", flat=True)
-                .distinct()
-                .order_by("department")
-            )
             self.fields["department"].choices = [("", "All Departments")] + [
-                (d, d) for d in departments if d
+                (d, d) for d in get_dimension_values("department")
             ]
 
         # Populate specialty choices dynamically
         if "specialty" in self.fields:
-            specialties = (
-                Placement.objects.values_list("specialty", flat=True)
-                .distinct()
-                .order_by("specialty")
-            )
             self.fields["specialty"].choices = [("", "All Specialties")] + [
-                (s, s) for s in specialties if s
+                (s, s) for s in get_dimension_values("specialty")
             ]
 
 
+class PlacementApiForm(forms.Form):
+    """
+    Query parameters accepted by the placements JSON API.
+
+    Mirrors FilterForm, but takes department and specialty as free text so
+    validating a request does not have to load the choice lists.
+    """
+
+    start_date = forms.DateField(required=False)
+    end_date = forms.DateField(required=False)
+    department = forms.CharField(required=False)
+    specialty = forms.CharField(required=False)
+    shift = forms.ChoiceField(
+        required=False, choices=[("", "All Shifts")] + list(Placement.SHIFT_CHOICES)
+    )
+    status = forms.ChoiceField(
+        required=False, choices=[("", "All Statuses")] + list(Placement.STATUS_CHOICES)
+    )
+    search = forms.CharField(required=False)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=1000)
+
+
+class PhysicianScheduleForm(forms.Form):
+    """The ``from`` and ``to`` dates of the physician schedule page and API."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # "from" is a keyword, so the fields cannot be declared as attributes
+        for name, label in (("from", "From"), ("to", "To")):
+            self.fields[name] = forms.DateField(
+                required=False,
+                label=label,
+                widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+            )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get("from"), cleaned_data.get("to")
+        if start and end and start > end:
+            raise forms.ValidationError("The start date must not be after the end date.")
+        return cleaned_data
+
+
+class PlacementBulkActionForm(forms.Form):
+    """Form for applying one change to every placement matching the current filters."""
+
+    ACTION_UPDATE = "update"
+    ACTION_DELETE = "delete"
+
+    ACTION_CHOICES = [
+        (ACTION_UPDATE, "Set a field"),
+        (ACTION_DELETE, "Delete placements"),
+    ]
+
+    # Fields that can be set in bulk; choice fields are validated below
+    FIELD_CHOICES = [
+        ("department", "Department"),
+        ("specialty", "Specialty"),
+        ("shift", "Shift"),
+        ("status", "Status"),
+        ("area", "Area"),
+        ("room_number", "Room Number"),
+    ]
+
+    action = forms.ChoiceField(
+        choices=ACTION_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    field = forms.ChoiceField(
+        required=False,
+        choices=[("", "Select a field")] + FIELD_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    value = forms.CharField(
+        required=False,
+        max_length=255,
+        help_text="Leave blank to clear the field.",
+        widget=forms.TextInput(attrs={"class": "form-control"}),
+    )
+    # Row count shown on the preview; confirming is refused if it has changed
+    expected_count = forms.IntegerField(required=False, widget=forms.HiddenInput())
+    confirm = forms.BooleanField(required=False, widget=forms.HiddenInput())
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get("action")
+        field = cleaned_data.get("field")
+        value = (cleaned_data.get("value") or "").strip()
+
+        if action == self.ACTION_UPDATE:
+            if not field:
+                raise forms.ValidationError("Choose the field to update.")
+            if field == "shift":
+                allowed = [choice for choice, _ in Placement.SHIFT_CHOICES]
+            elif field == "status":
+                allowed = [choice for choice, _ in Placement.STATUS_CHOICES]
+            else:
+                allowed = None
+            if allowed is not None and value and value not in allowed:
+                raise forms.ValidationError(
+                    f"{value} is not a valid {field}. Choose one of: {', '.join(allowed)}."
+                )
+            max_length = Placement._meta.get_field(field).max_length
+            if len(value) > max_length:
+                raise forms.ValidationError(
+                    f"Value must be at most {max_length} characters for {field}."
+                )
+
+        # Blank means NULL, matching how the import stores missing values
+        cleaned_data["value"] = value or None
+        return cleaned_data
+
+
 class UserForm(forms.ModelForm):
     """Form for creating and editing users."""
 
@@ -0,0 +1,55 @@
+"""
+Template fragment caching for the analytics pages.
+
+The analytics templates wrap their filter panel, statistics and chart data
+in ``{% cache fragment_timeout "<name>" fragment_key %}`` blocks. The key
+covers everything those fragments depend on: the page, the filter values
+it applies, the placement data version (so any data change invalidates
+them) and the date (the time series is relative to today). The views pass
+their statistics as LazyResults, so a page whose fragments are cached
+runs neither the analytics queries nor most of the template.
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from placements.versioning import get_data_version
+from .filters import canonical_filters
+
+# {% cache %} fragment names used by the analytics templates
+FRAGMENT_NAMES = ["analytics_content", "analytics_script"]
+
+
+def fragment_key(page, params, exclude=()):
+    """Cache key for a page's fragments under the filters in ``params``."""
+    return ":".join(
+        [
+            page,
+            str(get_data_version()),
+            date.today().isoformat(),
+            canonical_filters(params, exclude),
+        ]
+    )
+
+
+def fragment_context(page, params, exclude=()):
+    """Template variables the analytics pages key their cached fragments on."""
+    return {
+        "fragment_key": fragment_key(page, params, exclude),
+        "fragment_timeout": settings.ANALYTICS_FRAGMENT_TIMEOUT,
+    }
+
+
+def fragments_cached(context):
+    """Whether every analytics fragment for the context's key is cached."""
+    # The cache the {% cache %} tag uses
+    try:
+        cache = caches["template_fragments"]
+    except InvalidCacheBackendError:
+        cache = caches["default"]
+    keys = [
+        make_template_fragment_key(name, [context["fragment_key"]]) for name in FRAGMENT_NAMES
+    ]
+    return len(cache.get_many(keys)) == len(keys)
@@ -0,0 +1,304 @@
+"""
+Django management command to analyze the placement query workload.
+Usage: python manage.py analyze_queries [--log queries.jsonl] [--repeat 5]
+                                        [--database default] [--top 20]
+
+Groups queries by shape, taken from the QUERY_LOG_PATH capture (or, without
+one, from a built-in workload covering the dashboard's filter
+combinations), and for each shape:
+
+- shows the query plan and flags full scans of filtered queries and
+  temporary sorts for grouping,
+- measures the median latency,
+- for flagged shapes, tries composite indexes built from the columns the
+  query filters and groups on, each created inside a transaction that is
+  rolled back, and reports the latency and plan with the index in place.
+
+Also lists indexes made redundant by another index on the same leading
+columns. Candidate indexes are built on the live table and lock it for
+writes while they exist, so point --database at a copy of production data.
+"""
+
+import re
+import statistics
+import time
+from collections import OrderedDict
+from itertools import product
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from placements.models import Placement
+from dashboard.analytics import FACET_ORDERING, facet_counts, time_series
+from dashboard.filters import apply_placement_filters
+from dashboard.querybudget import query_shape
+from dashboard.querylog import read_query_log
+
+TABLE = Placement._meta.db_table
+
+_FILTER_COLUMN = re.compile(rf'"{TABLE}"\."(\w+)" (=|>=|<=|>|<|IN)\b')
+_SELECT_COLUMN = re.compile(rf'"{TABLE}"\."(\w+)" AS')
+_CANDIDATE_INDEX = "analyze_queries_candidate"
+
+
+class Rollback(Exception):
+    """Raised to roll back a candidate index after measuring it."""
+
+
+def builtin_workload():
+    """
+    Queries the dashboard runs for typical filter combinations.
+
+    Returns ``[(sql, params)]`` captured while running the analytics helpers.
+    """
+    sample = Placement.objects.order_by("-date").values(
+        "date", "department", "specialty", "status", "shift"
+    ).first()
+    if sample is None:
+        raise CommandError("The placements table is empty; nothing to analyze.")
+
+    filter_sets = []
+    for department, specialty, status, dated in product(
+        [None, sample["department"]],
+        [None, sample["specialty"]],
+        [None, sample["status"]],
+        [False, True],
+    ):
+        filters = {
+            "department": department,
+            "specialty": specialty,
+            "status": status,
+        }
+        if dated:
+            filters["start_date"] = sample["date"].replace(day=1)
+            filters["end_date"] = sample["date"]
+        filter_sets.append(filters)
+
+    captured = []
+
+    def capture(execute, sql, params, many, context):
+        captured.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+    with connections[Placement.objects.db].execute_wrapper(capture):
+        for filters in filter_sets:
+            queryset = apply_placement_filters(Placement.objects.all(), filters)
+            queryset.count()
+            time_series(queryset)
+            for field in FACET_ORDERING:
+                facet_counts(queryset, field)
+        list(Placement.objects.order_by("-date", "shift")[:25])
+    return captured
+
+
+def plan_problems(vendor, plan, sql):
+    """Full scans of filtered queries and avoidable temporary sorts in an EXPLAIN output."""
+    # Scanning every row is expected for unfiltered aggregates
+    filtered = " WHERE " in sql
+    problems = []
+    for line in plan:
+        if vendor == "sqlite":
+            scan = re.search(rf"\bSCAN {TABLE}\b( USING (COVERING )?INDEX)?", line)
+            if scan and filtered:
+                problems.append("full index scan" if scan.group(1) else "full table scan")
+            # Sorting grouped rows by their count needs a sort whatever the
+            # indexes, so only grouping and DISTINCT sorts are flagged
+            elif "USE TEMP B-TREE FOR" in line and "ORDER BY" not in line:
+                problems.append(line.strip().lower())
+        elif "Seq Scan on" in line and TABLE in line and filtered:
+            problems.append("sequential scan")
+    return problems
+
+
+def candidate_indexes(sql):
+    """Composite index column lists to try for a query, best guess first."""
+    equality, ranges = [], []
+    for column, operator in _FILTER_COLUMN.findall(sql):
+        target = equality if operator in ("=", "IN") else ranges
+        if column not in target:
+            target.append(column)
+    grouped = []
+    if "GROUP BY" in sql:
+        select = sql.split(" FROM ", 1)[0]
+        grouped = [c for c in _SELECT_COLUMN.findall(select) if c not in equality]
+
+    candidates = []
+    for columns in (
+        equality + [c for c in ranges if c not in equality] + grouped,
+        equality + grouped + [c for c in ranges if c not in equality + grouped],
+        equality + [c for c in ranges if c not in equality],
+    ):
+        columns = list(OrderedDict.fromkeys(columns))
+        if columns and columns not in candidates:
+            candidates.append(columns)
+    return candidates
+
+
+class Command(BaseCommand):
+    help = "Explain and time placement query shapes, flag scans and propose indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log",
+            default=None,
+            help="Query log captured with QUERY_LOG_PATH (default: that setting, "
+            "or a built-in workload when unset)",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Database alias to analyze (default: default)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per latency measurement (default: 5)",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Most frequent shapes to analyze (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        self.connection = connections[options["database"]]
+        self.repeat = max(options["repeat"], 1)
+        vendor = self.connection.vendor
+        if vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"Unsupported database vendor: {vendor}")
+
+        log_path = options["log"] or settings.QUERY_LOG_PATH
+        if log_path:
+            queries = [
+                (entry["sql"], tuple(entry["params"])) for entry in read_query_log(log_path)
+            ]
+            self.stdout.write(f"Replaying {len(queries)} logged queries from {log_path}")
+        else:
+            queries = builtin_workload()
+            self.stdout.write(f"No query log; using {len(queries)} built-in workload queries")
+
+        shapes = OrderedDict()
+        for sql, params in queries:
+            shape = query_shape(sql)
+            if shape in shapes:
+                shapes[shape][2] += 1
+            else:
+                shapes[shape] = [sql, params, 1]
+        ranked = sorted(shapes.values(), key=lambda item: -item[2])[: options["top"]]
+
+        proposals = {}
+        for sql, params, count in ranked:
+            proposal = self.analyze_shape(sql, params, count, vendor)
+            if proposal:
+                columns, before, after = proposal
+                saved = proposals.setdefault(tuple(columns), [0.0, 0])
+                saved[0] += (before - after) * count
+                saved[1] += 1
+
+        self.report_redundant_indexes()
+
+        self.stdout.write("\nProposed indexes:")
+        if not proposals:
+            self.stdout.write("  none")
+        for columns, (saved_ms, shapes_helped) in sorted(
+            proposals.items(), key=lambda item: -item[1][0]
+        ):
+            fields = ", ".join(f'"{column}"' for column in columns)
+            self.stdout.write(
+                f"  models.Index(fields=[{fields}])  "
+                f"helps {shapes_helped} shape(s), saves ~{saved_ms:.1f} ms "
+                "per workload replay"
+            )
+
+    # Measurements
+
+    def explain(self, sql, params):
+        prefix = "EXPLAIN QUERY PLAN " if self.connection.vendor == "sqlite" else "EXPLAIN "
+        with self.connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def time_query(self, sql, params):
+        timings = []
+        with self.connection.cursor() as cursor:
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def try_index(self, sql, params, columns):
+        """Latency and plan with a temporary index on ``columns`` (rolled back)."""
+        quote = self.connection.ops.quote_name
+        result = {}
+        try:
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE INDEX {quote(_CANDIDATE_INDEX)} ON {quote(TABLE)} "
+                        f"({', '.join(quote(column) for column in columns)})"
+                    )
+                result["plan"] = self.explain(sql, params)
+                result["ms"] = self.time_query(sql, params)
+                raise Rollback
+        except Rollback:
+            pass
+        return result
+
+    def analyze_shape(self, sql, params, count, vendor):
+        """Report one query shape. Returns (columns, before_ms, after_ms) for a winning index."""
+        plan = self.explain(sql, params)
+        problems = plan_problems(vendor, plan, sql)
+        before = self.time_query(sql, params)
+
+        self.stdout.write(f"\n[{count}x] {before:.2f} ms  {query_shape(sql)[:160]}")
+        for line in plan:
+            self.stdout.write(f"    plan: {line}")
+        if not problems:
+            return None
+        self.stdout.write(self.style.WARNING(f"    flagged: {', '.join(problems)}"))
+
+        best = None
+        for columns in candidate_indexes(sql):
+            trial = self.try_index(sql, params, columns)
+            fixed = not plan_problems(vendor, trial["plan"], sql)
+            self.stdout.write(
+                f"    try ({', '.join(columns)}): {before:.2f} -> {trial['ms']:.2f} ms"
+                f"{' (no scan)' if fixed else ''}"
+            )
+            if trial["ms"] < before * 0.9 and (best is None or trial["ms"] < best[2]):
+                best = (columns, before, trial["ms"])
+        return best
+
+    # Schema
+
+    def report_redundant_indexes(self):
+        """Indexes whose columns are a leading prefix of another index's columns."""
+        with self.connection.cursor() as cursor:
+            constraints = self.connection.introspection.get_constraints(cursor, TABLE)
+        indexes = {
+            name: info["columns"]
+            for name, info in constraints.items()
+            if info["index"] and not info["primary_key"] and info["columns"]
+        }
+
+        self.stdout.write("\nRedundant indexes:")
+        found = False
+        for name, columns in sorted(indexes.items()):
+            for other, other_columns in sorted(indexes.items()):
+                if other == name or other_columns[: len(columns)] != columns:
+                    continue
+                # Of two identical indexes, report only one of them
+                if other_columns == columns and other < name:
+                    continue
+                found = True
+                self.stdout.write(
+                    f"  {name} ({', '.join(columns)}) is covered by "
+                    f"{other} ({', '.join(other_columns)})"
+                )
+                break
+        if not found:
+            self.stdout.write("  none")
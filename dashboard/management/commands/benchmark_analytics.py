@@ -0,0 +1,305 @@
+"""
+Django management command to benchmark the analytics code paths.
+Usage: python manage.py benchmark_analytics [--rows 10000,100000,1000000]
+                                            [--repeat 5] [--only Department]
+                                            [--baseline path.json] [--save-baseline]
+                                            [--tolerance 0.25] [--json results.json]
+
+Times each analytics code path in isolation on a throwaway test database
+seeded at every ``--rows`` scale:
+
+- ``get_context_data`` of the home page and every analytics page view,
+  unfiltered and filtered,
+- ``analytics_data_api``, unfiltered and filtered,
+- the ``Placement.get_statistics_by_*`` classmethods.
+
+Each case runs once to warm up, then ``--repeat`` times; the fastest and
+median times and the number of queries are recorded. Results are compared
+with the baseline file on the fastest time, which is the least disturbed
+by other load on the machine: a case is flagged when it grows by more than
+``--tolerance`` (and by more than ``--min-ms``), or when it runs more
+queries than before, which is how a new per-row query shows up. Exits
+non-zero on any regression. ``--save-baseline`` writes the results as the
+new baseline; keep one per machine, since timings do not transfer.
+"""
+
+import gc
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from placements.models import Placement
+from placements.seeding import seed_placements
+from dashboard import analytics_views, views
+from dashboard.analytics import resolve
+from dashboard.querybudget import record_queries
+
+DEFAULT_ROWS = "10000,100000,1000000"
+DEFAULT_BASELINE = settings.BASE_DIR / "benchmarks" / "analytics_baseline.json"
+
+# Query strings of the filtered variants
+FILTERED_QUERY = {"department": "Cardiology", "status": "Full Time"}
+TIMELINE_FILTERED_QUERY = {"specialty": "CARDIOLOGY", "shift": "AM"}
+
+VIEW_CLASSES = [
+    views.DashboardHomeView,
+    analytics_views.DepartmentAnalyticsView,
+    analytics_views.SpecialtyAnalyticsView,
+    analytics_views.ShiftAnalyticsView,
+    analytics_views.StatusAnalyticsView,
+    analytics_views.TimelineAnalyticsView,
+]
+
+STATISTICS_METHODS = [
+    "get_statistics_by_department",
+    "get_statistics_by_specialty",
+    "get_statistics_by_shift",
+    "get_statistics_by_status",
+]
+
+
+def benchmark_cases():
+    """``(name, callable)`` for every analytics code path and filter variant."""
+    factory = RequestFactory()
+    user = User(username="benchmark", is_staff=True)
+
+    def request(query):
+        request = factory.get("/", query)
+        request.user = user
+        return request
+
+    def context_case(view_class, query):
+        def run():
+            view = view_class()
+            view.setup(request(query))
+            # Evaluate the statistics the pages compute lazily
+            return {key: resolve(value) for key, value in view.get_context_data().items()}
+
+        return run
+
+    def api_case(query):
+        return lambda: views.analytics_data_api(request(query))
+
+    def statistics_case(method):
+        return lambda: list(getattr(Placement, method)())
+
+    cases = []
+    for view_class in VIEW_CLASSES:
+        filtered = (
+            TIMELINE_FILTERED_QUERY
+            if view_class is analytics_views.TimelineAnalyticsView
+            else FILTERED_QUERY
+        )
+        name = f"{view_class.__name__}.get_context_data"
+        cases.append((name, context_case(view_class, {})))
+        cases.append((f"{name}[filtered]", context_case(view_class, filtered)))
+    cases.append(("analytics_data_api", api_case({})))
+    cases.append(("analytics_data_api[filtered]", api_case(FILTERED_QUERY)))
+    for method in STATISTICS_METHODS:
+        cases.append((f"Placement.{method}", statistics_case(method)))
+    return cases
+
+
+def time_case(function, repeat):
+    """Median and minimum milliseconds over ``repeat`` runs, and queries per run."""
+    function()
+    timings = []
+    # As timeit does, keep collector pauses out of the timings
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            with record_queries() as recording:
+                started = time.perf_counter()
+                function()
+                timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "queries": len(recording),
+    }
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """``(regressions, improvements)`` as lists of messages."""
+    regressions, improvements = [], []
+    for rows, cases in results.items():
+        for name, result in cases.items():
+            before = baseline.get(rows, {}).get(name)
+            if before is None:
+                continue
+            label = f"{name} @ {rows} rows"
+            if result["queries"] > before["queries"]:
+                regressions.append(
+                    f"{label}: {before['queries']} -> {result['queries']} queries"
+                )
+            change = result["min_ms"] - before["min_ms"]
+            if abs(change) < min_ms:
+                continue
+            ratio = result["min_ms"] / before["min_ms"] if before["min_ms"] else None
+            message = (
+                f"{label}: {before['min_ms']:.2f} -> {result['min_ms']:.2f} ms"
+                + (f" ({ratio - 1:+.0%})" if ratio else "")
+            )
+            if ratio is None or ratio > 1 + tolerance:
+                regressions.append(message)
+            elif ratio < 1 - tolerance:
+                improvements.append(message)
+    return regressions, improvements
+
+
+class Command(BaseCommand):
+    help = "Benchmark the analytics code paths and compare with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            default=DEFAULT_ROWS,
+            help=f"Comma-separated table sizes to benchmark at (default: {DEFAULT_ROWS})",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per case (default: 5)",
+        )
+        parser.add_argument(
+            "--only",
+            default=None,
+            help="Only run cases whose name contains this text",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=str(DEFAULT_BASELINE),
+            help="Baseline results file (default: benchmarks/analytics_baseline.json)",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results to the baseline file",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Relative slowdown flagged as a regression (default: 0.25)",
+        )
+        parser.add_argument(
+            "--min-ms",
+            type=float,
+            default=1.0,
+            help="Ignore changes smaller than this many ms (default: 1.0)",
+        )
+        parser.add_argument(
+            "--json",
+            default=None,
+            help="Also write the results to this JSON file",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options["rows"].split(","))
+        except ValueError:
+            raise CommandError(f"--rows must be comma-separated integers: {options['rows']}")
+        cases = [
+            (name, function)
+            for name, function in benchmark_cases()
+            if not options["only"] or options["only"] in name
+        ]
+        if not cases:
+            raise CommandError(f"No benchmark case matches {options['only']!r}")
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Time the analytics API's computation, not its shared result
+            with override_settings(SINGLE_FLIGHT_RESULT_TIMEOUT=0):
+                results = self.run_benchmarks(sizes, cases, max(options["repeat"], 1))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        document = {
+            "meta": {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.node(),
+                "database": connections["default"].vendor,
+                "repeat": options["repeat"],
+            },
+            "results": results,
+        }
+        if options["json"]:
+            self.write_json(options["json"], document)
+
+        if options["save_baseline"]:
+            self.write_json(options["baseline"], document)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+        self.compare_with_baseline(results, options)
+
+    def run_benchmarks(self, sizes, cases, repeat):
+        results = {}
+        seeded = 0
+        for size in sizes:
+            # Grow the table to the next size rather than reseeding it
+            if size > seeded:
+                self.stdout.write(f"\nSeeding to {size} placements...")
+                seed_placements(size - seeded, days=365, physicians=max(50, size // 200), seed=size)
+                seeded = size
+
+            self.stdout.write(f"{'case':<60} {'median ms':>10} {'min ms':>9} {'queries':>8}")
+            results[str(size)] = {}
+            for name, function in cases:
+                result = time_case(function, repeat)
+                results[str(size)][name] = result
+                self.stdout.write(
+                    f"{name:<60} {result['median_ms']:>10.2f} {result['min_ms']:>9.2f} "
+                    f"{result['queries']:>8}"
+                )
+        return results
+
+    def compare_with_baseline(self, results, options):
+        try:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)["results"]
+        except FileNotFoundError:
+            self.stdout.write(
+                f"\nNo baseline at {options['baseline']}; run with --save-baseline to create one."
+            )
+            return
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        regressions, improvements = compare(
+            results, baseline, options["tolerance"], options["min_ms"]
+        )
+        self.stdout.write(f"\nCompared with {options['baseline']}:")
+        for message in improvements:
+            self.stdout.write(self.style.SUCCESS(f"  faster: {message}"))
+        for message in regressions:
+            self.stdout.write(self.style.ERROR(f"  regressed: {message}"))
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark regression(s)")
+        self.stdout.write("  no regressions")
+
+    def write_json(self, path, document):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
@@ -0,0 +1,59 @@
+"""
+Django management command to report cache size and hit rate.
+Usage: python manage.py cache_stats [--alias default] [--reset]
+"""
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Report cache size and host-wide hit rate"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--alias",
+            default="default",
+            help="Cache alias from settings.CACHES (default: default)",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset hit/miss counters after reporting",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            cache = caches[options["alias"]]
+        except Exception as e:
+            raise CommandError(f"Unknown cache alias: {options['alias']} ({e})")
+
+        backend = f"{type(cache).__module__}.{type(cache).__name__}"
+        self.stdout.write(f"Cache '{options['alias']}': {backend}")
+
+        if not hasattr(cache, "stats"):
+            self.stdout.write(
+                self.style.WARNING(
+                    "This backend does not track size or hit rate. "
+                    "Use CACHE_BACKEND=sqlite for a shared cache with statistics."
+                )
+            )
+            return
+
+        stats = cache.stats()
+        hit_rate = (
+            f"{stats['hit_rate']:.1%}" if stats["hit_rate"] is not None else "n/a"
+        )
+        self.stdout.write(
+            f"  - Location: {stats['location']}\n"
+            f"  - Entries: {stats['entries']} "
+            f"(max {stats['max_entries']}, {stats['expired_entries']} expired)\n"
+            f"  - Size: {stats['value_bytes'] / 1024:.1f} KiB of values, "
+            f"{stats['file_bytes'] / 1024:.1f} KiB on disk\n"
+            f"  - Hits: {stats['hits']}, Misses: {stats['misses']}\n"
+            f"  - Hit rate: {hit_rate} across {stats['processes']} process(es)"
+        )
+
+        if options["reset"]:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Hit/miss counters reset."))
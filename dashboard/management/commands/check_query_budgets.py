@@ -0,0 +1,119 @@
+"""
+Django management command to pin the query count of every dashboard URL.
+Usage: python manage.py check_query_budgets [--rows 500] [--verbose]
+
+Creates a throwaway test database, seeds it with placements, then requests
+every URL in dashboard/urls.py as a logged-in superuser and checks the
+query count against QUERY_BUDGETS and for repeated query shapes (N+1).
+Each URL is requested twice, cold (its cache cleared) and warm, and both
+requests are checked. POST-only URLs are sent a representative body
+(querybudget.POST_REQUESTS) and event streams are read up to their first
+event. dashboard/tests.py runs the same checks under `manage.py test`; this
+command prints every count in one table.
+Exits non-zero on any violation, on a URL without a declared budget, or
+on a response that is not a success or a redirect.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from placements.models import Placement
+from placements.seeding import seed_placements
+from dashboard.querybudget import (
+    BUDGET_CACHES,
+    dashboard_url,
+    dashboard_url_names,
+    get_query_budget,
+    record_queries,
+    request_url,
+)
+
+
+class Command(BaseCommand):
+    help = "Check every dashboard URL against its query budget and for N+1 queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=500,
+            help="Placements to seed the test database with (default: 500)",
+        )
+        parser.add_argument(
+            "--verbose",
+            action="store_true",
+            help="Print the queries of URLs that fail",
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CACHES=BUDGET_CACHES):
+                failures = self.check_urls(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f"{failures} URL(s) failed their query budget")
+        self.stdout.write(self.style.SUCCESS("All dashboard URLs are within budget."))
+
+    def check_urls(self, options):
+        seed_placements(options["rows"])
+        user = User.objects.create_superuser("budget", "budget@example.com", "budget")
+        placement = Placement.objects.first()
+        client = Client()
+
+        failures = 0
+        self.stdout.write(
+            f"{'URL name':<40} {'status':>6} {'cold':>5} {'warm':>5} {'budget':>7}"
+        )
+        for name in dashboard_url_names():
+            path = dashboard_url(name, placement, user)
+            budget = get_query_budget(name)
+            for cache in caches.all():
+                cache.clear()
+            recordings = {}
+            statuses = set()
+            for run in ["cold", "warm"]:
+                # Logging in again each time, since one of the URLs logs out
+                client.force_login(user)
+                with record_queries() as recording:
+                    response = request_url(client, name, path)
+                recordings[run] = recording
+                statuses.add(response.status_code)
+
+            problems = [
+                f"{run}: {problem}"
+                for run, recording in recordings.items()
+                for problem in recording.problems(budget)
+            ]
+            if budget is None:
+                problems.insert(0, "no budget declared in QUERY_BUDGETS")
+            problems.extend(
+                f"status {status}: not a success or a redirect"
+                for status in sorted(statuses)
+                if not 200 <= status < 400
+            )
+            self.stdout.write(
+                f"{name:<40} {'/'.join(map(str, sorted(statuses))):>6} "
+                f"{len(recordings['cold']):>5} {len(recordings['warm']):>5} "
+                f"{budget if budget is not None else '-':>7}"
+            )
+            if problems:
+                failures += 1
+                for problem in problems:
+                    self.stdout.write(self.style.ERROR(f"    {problem}"))
+                if options["verbose"]:
+                    for run, recording in recordings.items():
+                        for sql in recording.queries:
+                            self.stdout.write(f"      {run}: {sql}")
+        return failures
@@ -0,0 +1,139 @@
+"""
+Django management command to measure worker startup time and import cost.
+Usage: python manage.py check_startup [--budget-ms 1500] [--runs 3] [--top 15]
+
+Starts a fresh interpreter (as a gunicorn worker would), builds the WSGI
+application and loads the URLconf, then reports the time to ready, peak RSS
+and the import cost per top-level package from ``python -X importtime``.
+Fails when the startup budget is exceeded or a module listed in
+STARTUP_FORBIDDEN_MODULES was imported on the way.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in the child interpreter; prints one JSON line on stdout
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+# The URLconf (and every view module) is otherwise imported by the first request
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready_ms = (time.perf_counter() - started) * 1000
+try:
+    import resource
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:  # Windows
+    max_rss_kb = 0
+print(json.dumps({
+    "ready_ms": ready_ms,
+    "max_rss_kb": max_rss_kb,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def parse_importtime(output):
+    """
+    Sum ``-X importtime`` self times (microseconds) per top-level package.
+
+    Returns ``{package: (self_us, module_count)}``.
+    """
+    packages = defaultdict(lambda: [0, 0])
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # header line
+        package = packages[name.strip().split(".")[0]]
+        package[0] += int(self_us)
+        package[1] += 1
+    return {name: tuple(values) for name, values in packages.items()}
+
+
+class Command(BaseCommand):
+    help = "Measure time to a ready WSGI app and per-package import cost"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            default=settings.STARTUP_TIME_BUDGET_MS,
+            help="Fail when the median time to ready exceeds this "
+            "(default: settings.STARTUP_TIME_BUDGET_MS)",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=3,
+            help="Number of fresh interpreters to start (default: 3)",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=15,
+            help="Number of packages to list by import cost (default: 15)",
+        )
+
+    def run_once(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        report["packages"] = parse_importtime(result.stderr)
+        return report
+
+    def handle(self, *args, **options):
+        runs = [self.run_once() for _ in range(max(options["runs"], 1))]
+        ready_ms = statistics.median(run["ready_ms"] for run in runs)
+        max_rss_mb = max(run["max_rss_kb"] for run in runs) / 1024
+        last = runs[-1]
+
+        self.stdout.write(
+            f"Time to ready WSGI app: {ready_ms:.0f} ms "
+            f"(median of {len(runs)}, budget {options['budget_ms']:.0f} ms)"
+        )
+        self.stdout.write(f"Peak RSS: {max_rss_mb:.1f} MiB")
+        self.stdout.write(f"Modules loaded: {len(last['modules'])}")
+
+        self.stdout.write("\nImport cost by package:")
+        packages = sorted(last["packages"].items(), key=lambda item: -item[1][0])
+        for name, (self_us, count) in packages[: options["top"]]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {name} ({count} modules)")
+
+        problems = []
+        if ready_ms > options["budget_ms"]:
+            problems.append(
+                f"startup took {ready_ms:.0f} ms, over the "
+                f"{options['budget_ms']:.0f} ms budget"
+            )
+        loaded = set(last["modules"])
+        forbidden = [
+            name for name in settings.STARTUP_FORBIDDEN_MODULES if name in loaded
+        ]
+        if forbidden:
+            problems.append(
+                f"imported at startup: {', '.join(forbidden)} "
+                "(import these lazily where they are used)"
+            )
+
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("\nStartup is within budget."))
@@ -0,0 +1,473 @@
+"""
+Django management command to load test the dashboard under gunicorn.
+Usage: python manage.py loadtest [--rows 100000] [--clients 8] [--duration 30]
+                                 [--warmup 5] [--mix mix.json] [--workers 4]
+                                 [--asgi] [--keepdb] [--json results.json]
+
+Creates a test database (test_<NAME>, as the test runner does), seeds it
+with ``--rows`` placements, creates one staff user per client, and starts
+gunicorn with gunicorn_config.py on a free local port against it. Each
+client logs in, then replays requests drawn from a weighted mix for the
+run's duration. Requests made during the warm-up are not counted. Reports
+throughput and latency percentiles per endpoint.
+
+The mix is a JSON list of endpoints; each request picks an endpoint by
+weight, then one of its paths at random. Paths may use the placeholders
+{department}, {specialty}, {shift}, {status}, {search}, {start_date} and
+{end_date}, filled from the seeded data:
+
+    [
+        {"name": "home", "weight": 20, "paths": ["/dashboard/"]},
+        {"name": "search", "weight": 5,
+         "paths": ["/dashboard/placements/?search={search}"]}
+    ]
+
+Weights can be taken straight from request counts in production logs.
+Run with the settings used in production (DEBUG off, static files
+collected) for representative numbers.
+"""
+
+import importlib.util
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import timedelta
+from http.cookiejar import CookieJar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+from placements.models import Placement
+from placements.seeding import seed_placements
+from dashboard.perf import percentile
+
+DEFAULT_MIX = [
+    {
+        "name": "home",
+        "weight": 20,
+        "paths": ["/dashboard/", "/dashboard/?department={department}"],
+    },
+    {
+        "name": "analytics",
+        "weight": 25,
+        "paths": [
+            "/dashboard/analytics/department/",
+            "/dashboard/analytics/specialty/?status={status}",
+            "/dashboard/analytics/shifts/",
+            "/dashboard/analytics/status/?department={department}",
+            "/dashboard/analytics/timeline/?start_date={start_date}&end_date={end_date}",
+        ],
+    },
+    {
+        "name": "list",
+        "weight": 20,
+        "paths": [
+            "/dashboard/placements/",
+            "/dashboard/placements/?specialty={specialty}&shift={shift}",
+        ],
+    },
+    {
+        "name": "search",
+        "weight": 10,
+        "paths": ["/dashboard/placements/?search={search}"],
+    },
+    {
+        "name": "api_analytics",
+        "weight": 15,
+        "paths": [
+            "/dashboard/api/analytics/",
+            "/dashboard/api/analytics/?department={department}&status={status}",
+        ],
+    },
+    {
+        "name": "api_placements",
+        "weight": 10,
+        "paths": ["/dashboard/api/placements/?specialty={specialty}"],
+    },
+]
+
+PASSWORD = "loadtest-password"
+
+_CSRF_TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as responses instead of following them."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def load_mix(path):
+    """Endpoints of a mix file, validated."""
+    try:
+        with open(path) as f:
+            mix = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Cannot read mix file {path}: {e}")
+    if not isinstance(mix, list) or not mix:
+        raise CommandError(f"{path}: expected a non-empty list of endpoints")
+    for endpoint in mix:
+        if not (
+            isinstance(endpoint, dict)
+            and endpoint.get("name")
+            and endpoint.get("paths")
+            and endpoint.get("weight", 0) > 0
+        ):
+            raise CommandError(f"{path}: each endpoint needs a name, paths and a positive weight")
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Client(threading.Thread):
+    """One logged-in user replaying the mix until ``stop_at``."""
+
+    def __init__(self, base_url, username, mix, values, record_after, stop_at, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.username = username
+        self.mix = mix
+        self.values = values
+        self.record_after = record_after
+        self.stop_at = stop_at
+        self.rng = random.Random(seed)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect()
+        )
+        # {endpoint name: [(latency ms, status)]}
+        self.samples = defaultdict(list)
+        self.error = None
+
+    def fetch(self, path, data=None):
+        """Status code and body of a request, without following redirects."""
+        try:
+            with self.opener.open(self.base_url + path, data=data, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login(self):
+        login_path = reverse("dashboard:login")
+        status, body = self.fetch(login_path)
+        token = _CSRF_TOKEN.search(body.decode())
+        if status != 200 or token is None:
+            raise RuntimeError(f"login page returned {status}")
+        form = urllib.parse.urlencode(
+            {
+                "csrfmiddlewaretoken": token.group(1),
+                "username": self.username,
+                "password": PASSWORD,
+            }
+        ).encode()
+        status, _body = self.fetch(login_path, data=form)
+        if status != 302:
+            raise RuntimeError(f"login as {self.username} returned {status}")
+
+    def run(self):
+        try:
+            self.login()
+        except (OSError, RuntimeError) as e:
+            self.error = str(e)
+            return
+
+        weights = [endpoint["weight"] for endpoint in self.mix]
+        while time.monotonic() < self.stop_at:
+            endpoint = self.rng.choices(self.mix, weights)[0]
+            path = self.rng.choice(endpoint["paths"]).format_map(
+                {name: self.rng.choice(choices) for name, choices in self.values.items()}
+            )
+            started = time.monotonic()
+            try:
+                status, _body = self.fetch(path)
+            except OSError:
+                status = 0
+            finished = time.monotonic()
+            if started >= self.record_after:
+                self.samples[endpoint["name"]].append(((finished - started) * 1000, status))
+
+
+class Command(BaseCommand):
+    help = "Replay a weighted request mix against a local gunicorn and report latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=100000,
+            help="Placements to seed the load test database with (default: 100000)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Days of history the seeded placements span (default: 365)",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=8,
+            help="Concurrent clients, each logged in as its own user (default: 8)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=30,
+            help="Seconds of measured load (default: 30)",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=5,
+            help="Seconds of unmeasured load before the run (default: 5)",
+        )
+        parser.add_argument(
+            "--mix",
+            default=None,
+            help="JSON request mix file (default: built-in dashboard mix)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Gunicorn workers (default: gunicorn_config.py's sizing)",
+        )
+        parser.add_argument(
+            "--asgi",
+            action="store_true",
+            help="Serve the ASGI app with uvicorn workers and ASYNC_ANALYTICS on",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the seeded database for the next run, reusing it if present",
+        )
+        parser.add_argument(
+            "--json",
+            default=None,
+            help="Also write the results to this JSON file",
+        )
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec("gunicorn") is None:
+            raise CommandError("gunicorn is not installed.")
+        if options["asgi"] and importlib.util.find_spec("uvicorn") is None:
+            raise CommandError("--asgi needs uvicorn installed.")
+        mix = load_mix(options["mix"]) if options["mix"] else DEFAULT_MIX
+
+        default = connections["default"]
+        if default.vendor == "sqlite" and not default.settings_dict["TEST"].get("NAME"):
+            # gunicorn runs in other processes, so the test database cannot
+            # be the default in-memory one
+            default.settings_dict["TEST"]["NAME"] = str(settings.BASE_DIR / "loadtest.sqlite3")
+
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options["keepdb"])
+        try:
+            self.prepare_data(options)
+            results = self.run_load(mix, options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+
+        self.report(results)
+        if options["json"]:
+            run = {name: options[name] for name in ("rows", "clients", "duration", "workers", "asgi")}
+            with open(options["json"], "w") as f:
+                json.dump({"run": run, "endpoints": results}, f, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def prepare_data(self, options):
+        existing = Placement.objects.count()
+        if existing:
+            self.stdout.write(f"Reusing {existing} seeded placements")
+        else:
+            self.stdout.write(f"Seeding {options['rows']} placements...")
+            started = time.monotonic()
+            seed_placements(
+                options["rows"],
+                days=options["days"],
+                physicians=max(50, options["rows"] // 200),
+            )
+            self.stdout.write(f"  done in {time.monotonic() - started:.1f}s")
+
+        for i in range(options["clients"]):
+            user, created = User.objects.get_or_create(
+                username=f"loadtest{i}", defaults={"is_staff": True}
+            )
+            if created:
+                user.set_password(PASSWORD)
+                user.save()
+
+    def placeholder_values(self):
+        """Values the mix placeholders are drawn from, taken from the seeded data."""
+        values = {}
+        for field in ("department", "specialty", "shift", "status"):
+            values[field] = list(
+                Placement.objects.exclude(**{f"{field}__isnull": True})
+                .order_by()
+                .values_list(field, flat=True)
+                .distinct()
+            )
+        values["search"] = [
+            name.split()[-1] for name in values["department"] + values["specialty"]
+        ] + ["Physician 1"]
+        latest = Placement.objects.order_by("-date").values_list("date", flat=True).first()
+        starts = [latest - timedelta(days=offset) for offset in (7, 30, 90)]
+        values["start_date"] = [start.isoformat() for start in starts]
+        values["end_date"] = [latest.isoformat()]
+        return {
+            name: [urllib.parse.quote(str(value)) for value in choices]
+            for name, choices in values.items()
+        }
+
+    def start_server(self, options, port):
+        """Start gunicorn on ``port``; returns the process and its log file."""
+        database = connections["default"].settings_dict
+        env = {
+            **os.environ,
+            "DB_NAME": str(database["NAME"]),
+            # The replica does not hold the seeded data
+            "DB_READ_HOST": "",
+            "GUNICORN_BIND": f"127.0.0.1:{port}",
+        }
+        app = "clinic_dashboard.wsgi:application"
+        if options["asgi"]:
+            app = "clinic_dashboard.asgi:application"
+            env["GUNICORN_WORKER_CLASS"] = "uvicorn.workers.UvicornWorker"
+            env["ASYNC_ANALYTICS"] = "True"
+        if options["workers"]:
+            env["GUNICORN_WORKERS"] = str(options["workers"])
+
+        log = tempfile.NamedTemporaryFile(prefix="loadtest-gunicorn-", suffix=".log", delete=False)
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "-c",
+                str(settings.BASE_DIR / "gunicorn_config.py"),
+                "--access-logfile",
+                os.devnull,
+                app,
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+        login_url = f"http://127.0.0.1:{port}{reverse('dashboard:login')}"
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(login_url, timeout=5):
+                    return process, log.name
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f"gunicorn did not start; see {log.name}")
+
+    def run_load(self, mix, options):
+        """Run the clients against a fresh gunicorn. Returns the summarized results."""
+        values = self.placeholder_values()
+        port = free_port()
+        process, log_path = self.start_server(options, port)
+        self.stdout.write(f"gunicorn serving on port {port} (log: {log_path})")
+
+        try:
+            now = time.monotonic()
+            record_after = now + options["warmup"]
+            stop_at = record_after + options["duration"]
+            clients = [
+                Client(
+                    f"http://127.0.0.1:{port}",
+                    f"loadtest{i}",
+                    mix,
+                    values,
+                    record_after,
+                    stop_at,
+                    seed=i,
+                )
+                for i in range(options["clients"])
+            ]
+            self.stdout.write(
+                f"{len(clients)} clients, {options['warmup']}s warm-up, "
+                f"{options['duration']}s measured..."
+            )
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        errors = [client.error for client in clients if client.error]
+        if errors:
+            raise CommandError(f"{len(errors)} client(s) failed to log in: {errors[0]}")
+
+        merged = defaultdict(list)
+        for client in clients:
+            for name, samples in client.samples.items():
+                merged[name].extend(samples)
+        return self.summarize(merged, options["duration"])
+
+    def summarize(self, samples_by_endpoint, duration):
+        """Per-endpoint throughput and latency percentiles, plus a total row."""
+        results = {}
+        everything = []
+        for name in sorted(samples_by_endpoint):
+            samples = samples_by_endpoint[name]
+            everything.extend(samples)
+            results[name] = self.summarize_samples(samples, duration)
+        results["TOTAL"] = self.summarize_samples(everything, duration)
+        return results
+
+    def summarize_samples(self, samples, duration):
+        latencies = sorted(ms for ms, _status in samples)
+        errors = sum(1 for _ms, status in samples if not 200 <= status < 300)
+        summary = {
+            "requests": len(samples),
+            "errors": errors,
+            "rps": round(len(samples) / duration, 2),
+        }
+        for label, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            value = percentile(latencies, fraction)
+            summary[f"{label}_ms"] = round(value, 1) if value is not None else None
+        summary["max_ms"] = round(latencies[-1], 1) if latencies else None
+        return summary
+
+    def report(self, results):
+        self.stdout.write(
+            f"\n{'endpoint':<20} {'requests':>9} {'errors':>7} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for name, summary in results.items():
+            line = (
+                f"{name:<20} {summary['requests']:>9} {summary['errors']:>7} "
+                f"{summary['rps']:>8.1f}"
+            )
+            for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms"):
+                value = summary[key]
+                line += f" {value:>8.1f}" if value is not None else f" {'-':>8}"
+            style = self.style.ERROR if summary["errors"] else (lambda text: text)
+            self.stdout.write(style(line))
@@ -0,0 +1,70 @@
+"""
+Django management command to warm the analytics caches.
+Usage: python manage.py warm_analytics [--access-log path] [--lines 100000]
+                                       [--top 20] [--threads 4] [--defaults]
+
+Renders the analytics API and pages for the most requested filter
+combinations, learned from the access log, so their cached fragments and
+results are ready before users ask for them (see dashboard/warming.py).
+Run it after deploys; imports warm the caches on their own.
+"""
+
+from django.core.management.base import BaseCommand
+from dashboard.warming import default_combinations, get_combinations, warm_analytics
+
+
+class Command(BaseCommand):
+    help = "Precompute the analytics caches for the most requested filter combinations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--access-log",
+            default=None,
+            help="Access log to learn filter combinations from "
+            "(default: WARM_ANALYTICS_ACCESS_LOG)",
+        )
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=None,
+            help="Recent access log lines to read (default: WARM_ANALYTICS_LOG_LINES)",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=None,
+            help="Filter combinations to warm (default: WARM_ANALYTICS_TOP)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=None,
+            help="Combinations warmed at once (default: WARM_ANALYTICS_THREADS)",
+        )
+        parser.add_argument(
+            "--defaults",
+            action="store_true",
+            help="Ignore the access log: no filters, each department and specialty, "
+            "this month and last month",
+        )
+
+    def handle(self, *args, **options):
+        if options["defaults"]:
+            combinations = default_combinations()
+        else:
+            combinations = get_combinations(
+                options["access_log"], options["lines"], options["top"]
+            )
+        if options["verbosity"] > 1:
+            for filters in combinations:
+                self.stdout.write(f"  {filters or 'no filters'}")
+
+        stats = warm_analytics(combinations, threads=options["threads"])
+        message = (
+            f"Warmed {stats['combinations']} filter combinations "
+            f"({stats['requests']} requests) in {stats['seconds']:.2f}s"
+        )
+        if stats["failed"]:
+            self.stdout.write(self.style.WARNING(f"{message}; {stats['failed']} failed"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,112 @@
+"""
+Middleware for dashboard app.
+"""
+
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from clinic_dashboard.metrics import observe_request
+from django.conf import settings
+from .perf import get_perf_stats, start_timer, stop_timer
+from .querybudget import get_query_budget, record_queries
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimingMiddleware:
+    """
+    Time every request: total, database time and query count, template time.
+
+    Adds a Server-Timing header (shown in the browser devtools network tab),
+    records the timings per URL name for the perf API and /metrics, and logs requests
+    slower than PERF_SLOW_REQUEST_MS. Put it near the top of MIDDLEWARE so
+    the total includes the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer, token = start_timer()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timer(token)
+        return self.finish(request, response, timer)
+
+    async def __acall__(self, request):
+        timer, token = start_timer()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timer(token)
+        return self.finish(request, response, timer)
+
+    def finish(self, request, response, timer):
+        timer.stop()
+        match = request.resolver_match
+        name = match.view_name if match else "<unresolved>"
+        get_perf_stats().record(name, timer)
+        observe_request(name, response.status_code, timer)
+
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = timer.server_timing()
+        if timer.total * 1000 >= settings.PERF_SLOW_REQUEST_MS:
+            logger.warning(
+                f"Slow request {request.method} {request.path} ({name}): "
+                f"{timer.total * 1000:.0f} ms, {timer.queries} queries in "
+                f"{timer.db_time * 1000:.0f} ms, templates {timer.template_time * 1000:.0f} ms"
+            )
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Development aid: warn about requests over their query budget or
+    repeating one query shape (N+1).
+
+    Budgets come from QUERY_BUDGETS by URL name. Adds an X-Query-Count
+    header. With QUERY_BUDGET_STRICT, violations raise instead of logging.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with record_queries() as recording:
+            response = self.get_response(request)
+        return self.check(request, response, recording)
+
+    async def __acall__(self, request):
+        with record_queries() as recording:
+            response = await self.get_response(request)
+        return self.check(request, response, recording)
+
+    def check(self, request, response, recording):
+        match = request.resolver_match
+        name = match.view_name if match else None
+        response["X-Query-Count"] = str(len(recording))
+
+        problems = recording.problems(get_query_budget(name))
+        if problems:
+            message = f"{request.method} {request.path} ({name}): " + "; ".join(problems)
+            if settings.QUERY_BUDGET_STRICT:
+                raise AssertionError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,51 @@
+"""
+Reusable view mixins for dashboard views.
+"""
+
+from django.contrib.auth.mixins import AccessMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from placements.routers import read_database
+
+
+class ReadDatabaseMixin:
+    """
+    Serve the view's placement queries from the read-only connection.
+
+    Put it first in the bases so the whole request, including template
+    rendering, runs on the read alias.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            dispatch = super().dispatch
+
+            async def async_dispatch(*args, **kwargs):
+                return await dispatch(*args, **kwargs)
+
+            return read_database(async_dispatch)(request, *args, **kwargs)
+        return read_database(super().dispatch)(request, *args, **kwargs)
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """
+    LoginRequiredMixin for async views.
+
+    Loads the user with ``request.auser()`` so the session lookup does not
+    block the event loop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        # Templates read request.user synchronously; reuse the loaded user
+        # instead of letting it query the database a second time
+        request.user = user
+        if not user.is_authenticated:
+            if self.raise_exception:
+                raise PermissionDenied(self.get_permission_denied_message())
+            return redirect_to_login(
+                request.get_full_path(),
+                self.get_login_url(),
+                self.get_redirect_field_name(),
+            )
+        return await super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,148 @@
+"""
+Per-request performance timing.
+
+RequestTimingMiddleware starts a RequestTimer for every request. Database
+queries (through a wrapper installed on every connection) and template
+renders (through TimedDjangoTemplates) add their time to the timer of the
+request they run for, found through a context variable, so queries run on
+the async views' thread pool are counted too.
+
+Finished requests go into PerfStats, a rolling window of samples per URL
+name kept in process memory, read by the staff-only perf API.
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_current_timer = ContextVar("dashboard_request_timer", default=None)
+
+
+class RequestTimer:
+    """Time spent by one request, in total and in the database and templates."""
+
+    __slots__ = ("started", "total", "db_time", "queries", "template_time")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+
+    def stop(self):
+        self.total = time.perf_counter() - self.started
+        return self.total
+
+    def server_timing(self):
+        """Value for the Server-Timing response header."""
+        return (
+            f"total;dur={self.total * 1000:.1f}, "
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f"tpl;dur={self.template_time * 1000:.1f}"
+        )
+
+
+def start_timer():
+    """Start timing the current request. Returns the timer and a reset token."""
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_timer(token):
+    _current_timer.reset(token)
+
+
+def current_timer():
+    """The timer of the request being served, or None outside a request."""
+    return _current_timer.get()
+
+
+def time_queries(execute, sql, params, many, context):
+    """Connection execute wrapper adding query time to the current request."""
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.db_time += time.perf_counter() - started
+        timer.queries += 1
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created handler installing time_queries on the connection."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class PerfStats:
+    """Rolling window of request timings per URL name, for this process."""
+
+    def __init__(self, window=None):
+        self.window = window or settings.PERF_WINDOW_SIZE
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, timer):
+        sample = (timer.total, timer.db_time, timer.queries, timer.template_time)
+        with self._lock:
+            self._samples[name].append(sample)
+            self._counts[name] += 1
+
+    def snapshot(self):
+        """Percentiles (milliseconds) and means per URL name over the window."""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        views = {}
+        for name, values in samples.items():
+            totals = sorted(value[0] * 1000 for value in values)
+            size = len(values)
+            views[name] = {
+                "requests": counts[name],
+                "window": size,
+                "p50_ms": round(percentile(totals, 0.50), 2),
+                "p95_ms": round(percentile(totals, 0.95), 2),
+                "p99_ms": round(percentile(totals, 0.99), 2),
+                "mean_db_ms": round(sum(value[1] for value in values) * 1000 / size, 2),
+                "mean_queries": round(sum(value[2] for value in values) / size, 1),
+                "max_queries": max(value[2] for value in values),
+                "mean_template_ms": round(
+                    sum(value[3] for value in values) * 1000 / size, 2
+                ),
+            }
+        return views
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_perf_stats():
+    """The PerfStats instance of this process."""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = PerfStats()
+    return _stats
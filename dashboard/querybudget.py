@@ -0,0 +1,193 @@
+"""
+Query budgets and N+1 detection.
+
+``record_queries()`` collects every SQL statement run while it is active,
+on any connection and in any thread the request's context reaches (such as
+the async views' query pool). A recording is checked against the budget
+declared for the view in QUERY_BUDGETS and for statements repeated with
+the same shape, the usual sign of an N+1 loop.
+
+Used by QueryBudgetMiddleware in development, and for every dashboard URL
+(``dashboard_url_names()``, requested with ``request_url()``) by the tests
+in dashboard/tests.py through ``assert_query_budget()`` and by
+``manage.py check_query_budgets``.
+"""
+
+import json
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.urls import URLPattern, reverse
+
+_current_recording = ContextVar("dashboard_query_recording", default=None)
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(sql):
+    """SQL with parameter lists collapsed, so repeats of one query compare equal."""
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", sql).strip())
+
+
+class QueryRecording:
+    """SQL statements run while recording, with budget and N+1 checks."""
+
+    def __init__(self, parent=None):
+        self.queries = []
+        # Enclosing recording, which sees the queries of nested ones too
+        self.parent = parent
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated_shapes(self, threshold=None):
+        """``(shape, count)`` pairs run at least ``threshold`` times."""
+        threshold = threshold or settings.QUERY_REPEAT_THRESHOLD
+        counts = Counter(query_shape(sql) for sql in self.queries)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+    def problems(self, budget=None, threshold=None):
+        """Human-readable budget and N+1 violations (empty when all is well)."""
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(f"{len(self)} queries, over the budget of {budget}")
+        for shape, count in self.repeated_shapes(threshold):
+            problems.append(f"possible N+1: {count} x {shape[:200]}")
+        return problems
+
+
+def capture_queries(execute, sql, params, many, context):
+    """Connection execute wrapper adding statements to the active recording."""
+    recording = _current_recording.get()
+    while recording is not None:
+        recording.queries.append(sql)
+        recording = recording.parent
+    return execute(sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created handler installing capture_queries on the connection."""
+    if capture_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(capture_queries)
+
+
+@contextmanager
+def record_queries():
+    """Record the queries run inside the block. Yields a QueryRecording."""
+    recording = QueryRecording(parent=_current_recording.get())
+    token = _current_recording.set(recording)
+    try:
+        yield recording
+    finally:
+        _current_recording.reset(token)
+
+
+def get_query_budget(view_name):
+    """Budget declared for a URL name in QUERY_BUDGETS, or None."""
+    return settings.QUERY_BUDGETS.get(view_name)
+
+
+@contextmanager
+def assert_query_budget(budget, threshold=None):
+    """
+    Fail (AssertionError) if the block runs more than ``budget`` queries or
+    repeats a query shape ``threshold`` times.
+
+        with assert_query_budget(get_query_budget("dashboard:home")):
+            client.get(reverse("dashboard:home"))
+    """
+    with record_queries() as recording:
+        yield recording
+    problems = recording.problems(budget, threshold)
+    if problems:
+        raise AssertionError("; ".join(problems))
+
+
+# A process-local cache for budget checks, so clearing it between URLs
+# touches nothing shared
+BUDGET_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "query-budgets",
+    }
+}
+
+# Body sent to each URL that only accepts POST
+POST_REQUESTS = {
+    "dashboard:logout": {},
+    # Two filter sets, every request type
+    "dashboard:analytics_batch_api": {
+        "requests": [
+            {"name": "departments", "type": "facet", "field": "department"},
+            {"name": "kpis", "type": "kpis"},
+            {"name": "timeline", "type": "timeseries", "days": 30},
+            {
+                "name": "er_shifts",
+                "type": "crosstab",
+                "rows": "shift",
+                "columns": "status",
+                "filters": {"department": "ER"},
+            },
+            {"name": "er_kpis", "type": "kpis", "filters": {"department": "ER"}},
+        ]
+    },
+}
+
+
+def _dashboard_patterns():
+    from dashboard import urls
+
+    for pattern in urls.urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            yield f"{urls.app_name}:{pattern.name}", str(pattern.pattern)
+
+
+def dashboard_url_names():
+    """Every named URL in dashboard/urls.py."""
+    return [name for name, _route in _dashboard_patterns()]
+
+
+def dashboard_url(name, placement, user):
+    """Path of the URL ``name``, pointing any ID it takes at ``placement`` or ``user``."""
+    route = dict(_dashboard_patterns())[name]
+    kwargs = {}
+    if "<int:pk>" in route:
+        kwargs["pk"] = user.pk if route.startswith("users/") else placement.pk
+    if "<int:physician_id>" in route:
+        kwargs["physician_id"] = placement.physician_id
+    return reverse(name, kwargs=kwargs)
+
+
+async def _read_first_event(response):
+    """Read a streaming response up to the end of its first event."""
+    received = ""
+    content = response.streaming_content
+    async for chunk in content:
+        received += chunk.decode() if isinstance(chunk, bytes) else chunk
+        if "\nevent:" in f"\n{received}" and received.endswith("\n\n"):
+            break
+    await content.aclose()
+
+
+def request_url(client, name, path):
+    """
+    Request ``path`` with test ``client`` the way a browser would: POST-only
+    URLs with their POST_REQUESTS body, streams read up to their first event.
+    """
+    if name in POST_REQUESTS:
+        response = client.post(
+            path, json.dumps(POST_REQUESTS[name]), content_type="application/json"
+        )
+    else:
+        response = client.get(path)
+    if response.streaming and response.is_async:
+        async_to_sync(_read_first_event)(response)
+    elif response.streaming:
+        next(iter(response.streaming_content), None)
+        response.close()
+    return response
@@ -0,0 +1,70 @@
+"""
+Sampled log of placement queries, replayed by ``manage.py analyze_queries``.
+
+When QUERY_LOG_PATH is set, a QUERY_LOG_SAMPLE_RATE fraction of the SELECT
+statements that touch the placements table are appended to it as JSON
+lines (SQL, parameters, alias, duration), so the analyzer can work from
+the production query mix instead of guesses.
+"""
+
+import json
+import random
+import threading
+import time
+from datetime import date, datetime
+
+from django.conf import settings
+
+PLACEMENTS_TABLE = "placements_placement"
+
+_lock = threading.Lock()
+
+
+def _json_param(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def log_query(execute, sql, params, many, context):
+    """Connection execute wrapper sampling placement SELECTs into QUERY_LOG_PATH."""
+    if (
+        many
+        or random.random() >= settings.QUERY_LOG_SAMPLE_RATE
+        or not sql.lstrip().upper().startswith("SELECT")
+        or PLACEMENTS_TABLE not in sql
+    ):
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        entry = {
+            "sql": sql,
+            "params": [_json_param(value) for value in params or ()],
+            "alias": context["connection"].alias,
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        with _lock, open(settings.QUERY_LOG_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def install_query_log(sender, connection, **kwargs):
+    """connection_created handler installing log_query when QUERY_LOG_PATH is set."""
+    if settings.QUERY_LOG_PATH and log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_query)
+
+
+def read_query_log(path):
+    """Yield the logged entries of a query log file, skipping malformed lines."""
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if "sql" in entry:
+                yield entry
@@ -0,0 +1,75 @@
+"""
+Physician schedules: one physician's placements over a date range.
+
+A schedule is a range scan of the (physician, date) index returning only
+the date, shift and room of each placement. It is cached under the
+physician's version (placements/versioning.py) rather than the data
+version, so it stays cached while other physicians' placements change and
+is invalidated as soon as one of its own rows does.
+"""
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from placements.models import Physician, Placement
+from placements.versioning import get_physician_version
+
+# Days shown on either side of a range given only one end (or from today)
+SCHEDULE_DAYS = 30
+
+# Columns of each schedule row, in order
+SCHEDULE_FIELDS = ["date", "shift", "room"]
+
+
+def schedule_range(start=None, end=None):
+    """
+    The ``(start, end)`` dates of a schedule request: SCHEDULE_DAYS from
+    today by default, or from/to the one end given.
+    """
+    if start is None and end is None:
+        start = date.today()
+    if start is None:
+        start = end - timedelta(days=SCHEDULE_DAYS)
+    if end is None:
+        end = start + timedelta(days=SCHEDULE_DAYS)
+    return start, end
+
+
+def schedule_key(physician_id, start, end):
+    """Cache key of a physician's schedule between ``start`` and ``end``."""
+    version = get_physician_version(physician_id)
+    return f"physician_schedule:{physician_id}:{version}:{start.isoformat()}:{end.isoformat()}"
+
+
+def get_schedule(physician_id, start=None, end=None):
+    """
+    A physician's placements between ``start`` and ``end`` (inclusive):
+    ``{"physician": {"id", "name"}, "from", "to", "fields", "placements"}``
+    with each placement a ``[date, shift, room]`` list in date order.
+
+    Returns None for an unknown physician.
+    """
+    start, end = schedule_range(start, end)
+    key = schedule_key(physician_id, start, end)
+    schedule = cache.get(key)
+    if schedule is not None:
+        return schedule
+
+    physician = Physician.objects.filter(physician_id=physician_id).values("name").first()
+    if physician is None:
+        return None
+    rows = (
+        Placement.objects.filter(physician_id=physician_id, date__gte=start, date__lte=end)
+        .order_by("date", "shift")
+        .values_list("date", "shift", "room_number")
+    )
+    schedule = {
+        "physician": {"id": physician_id, "name": physician["name"]},
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "fields": SCHEDULE_FIELDS,
+        "placements": [[day.isoformat(), shift, room] for day, shift, room in rows],
+    }
+    cache.set(key, schedule, settings.PHYSICIAN_SCHEDULE_TIMEOUT)
+    return schedule
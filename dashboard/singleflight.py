@@ -0,0 +1,111 @@
+"""
+Single-flight coalescing of expensive computations.
+
+Right after an import, many users open the dashboard at once and every
+worker would compute the same analytics result in parallel. With
+``single_flight`` one caller (the leader) computes it and the others wait
+for its result:
+
+- threads of the same process wait on the leader's in-flight computation,
+- other processes see the lock the leader holds in the shared cache
+  (``cache.add``) and poll the cache for the result it stores there.
+
+Results stay in the cache for SINGLE_FLIGHT_RESULT_TIMEOUT seconds, so
+requests arriving just after the computation reuse them too. A caller that
+has waited SINGLE_FLIGHT_WAIT_TIMEOUT seconds (or whose leader failed)
+computes the result itself, so a stuck leader only costs time.
+
+Keys must cover everything the result depends on (filters, data version).
+Coalescing across processes needs a shared cache backend
+(CACHE_BACKEND=sqlite or redis); with locmem it only spans threads.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from clinic_dashboard.metrics import record_single_flight
+
+KEY_PREFIX = "singleflight"
+
+# Seconds between checks for a result computed by another process
+POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+class Flight:
+    """A computation in progress in this process."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = _MISSING
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key, compute):
+    """
+    Return ``compute()``, sharing one computation among concurrent callers
+    with the same ``key``. The result must be picklable.
+    """
+    result_key = f"{KEY_PREFIX}:result:{key}"
+    result = cache.get(result_key, _MISSING)
+    if result is not _MISSING:
+        record_single_flight("cached")
+        return result
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+
+    if not leader:
+        if flight.done.wait(settings.SINGLE_FLIGHT_WAIT_TIMEOUT) and flight.result is not _MISSING:
+            record_single_flight("waited")
+            return flight.result
+        record_single_flight("fallback")
+        return compute()
+
+    try:
+        flight.result = _compute_shared(key, result_key, compute)
+        return flight.result
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _compute_shared(key, result_key, compute):
+    """Compute under the cache lock, or wait for the process holding it."""
+    lock_key = f"{KEY_PREFIX}:lock:{key}"
+    timeout = settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, timeout=timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            result = cache.get(result_key, _MISSING)
+            if result is not _MISSING:
+                record_single_flight("shared")
+                return result
+            if cache.get(lock_key) is None:
+                # Released without a result: the leader failed
+                break
+        record_single_flight("fallback")
+        token = None
+
+    try:
+        result = compute()
+        cache.set(result_key, result, settings.SINGLE_FLIGHT_RESULT_TIMEOUT)
+        if token:
+            record_single_flight("computed")
+        return result
+    finally:
+        if token and cache.get(lock_key) == token:
+            cache.delete(lock_key)
@@ -0,0 +1,65 @@
+"""
+Query budget tests: every named dashboard URL, requested cold (caches
+cleared) and warm as a logged-in superuser, stays within its QUERY_BUDGETS
+entry without repeated query shapes (N+1) and answers with a success or a
+redirect. Run with `python manage.py test dashboard`.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from placements.models import Placement
+from placements.seeding import seed_placements
+from dashboard.querybudget import (
+    BUDGET_CACHES,
+    assert_query_budget,
+    dashboard_url,
+    dashboard_url_names,
+    get_query_budget,
+    request_url,
+)
+
+
+@override_settings(CACHES=BUDGET_CACHES)
+class QueryBudgetTests(TransactionTestCase):
+    """One test per named dashboard URL, added below the class."""
+
+    # Writes (sessions, seeded rows) commit as they do in production, so
+    # requests run the same statements they would there
+    databases = {"default", "read"}
+
+    rows = 500
+
+    def setUp(self):
+        seed_placements(self.rows)
+        self.user = User.objects.create_superuser("budget", "budget@example.com", "budget")
+        self.placement = Placement.objects.first()
+        for cache in caches.all():
+            cache.clear()
+
+    def check_url(self, name):
+        budget = get_query_budget(name)
+        self.assertIsNotNone(budget, f"No budget declared for {name} in QUERY_BUDGETS")
+        path = dashboard_url(name, self.placement, self.user)
+        for run in ["cold", "warm"]:
+            with self.subTest(run=run):
+                # Logging in again each time, since one of the URLs logs out
+                self.client.force_login(self.user)
+                with assert_query_budget(budget):
+                    response = request_url(self.client, name, path)
+                self.assertTrue(
+                    200 <= response.status_code < 400,
+                    f"{name} answered {response.status_code}",
+                )
+
+
+def _budget_test(name):
+    def test(self):
+        self.check_url(name)
+
+    test.__doc__ = f"{name} stays within its query budget"
+    return test
+
+
+for _name in dashboard_url_names():
+    setattr(QueryBudgetTests, f"test_{_name.split(':', 1)[1]}", _budget_test(_name))
@@ -2,6 +2,7 @@
 URL configuration for dashboard app.
 """
 
+from django.conf import settings
 from django.urls import path
 from .views import (
     LoginView,
@@ -12,6 +13,8 @@ from .views import (
     PlacementUpdateView,
     PlacementDeleteView,
     PlacementDetailView,
+    PlacementBulkActionView,
+    PhysicianScheduleView,
     UserListView,
     UserCreateView,
     UserUpdateView,
@@ -22,6 +25,7 @@ from .views import (
     ProfileView,
     SettingsView,
     analytics_data_api,
+    analytics_stream,
 )
 from .analytics_views import (
     DepartmentAnalyticsView,
@@ -30,6 +34,27 @@ from .analytics_views import (
     StatusAnalyticsView,
     TimelineAnalyticsView,
 )
+from .api_views import (
+    analytics_batch_api,
+    perf_stats_api,
+    physician_schedule_api,
+    placement_list_api,
+    placement_export_csv,
+)
+
+if settings.ASYNC_ANALYTICS:
+    # Under ASGI, serve the analytics pages and API from the async views,
+    # which run their independent queries concurrently
+    from .async_views import (
+        AsyncDashboardHomeView as DashboardHomeView,
+        AsyncDepartmentAnalyticsView as DepartmentAnalyticsView,
+        AsyncSpecialtyAnalyticsView as SpecialtyAnalyticsView,
+        AsyncShiftAnalyticsView as ShiftAnalyticsView,
+        AsyncStatusAnalyticsView as StatusAnalyticsView,
+        AsyncTimelineAnalyticsView as TimelineAnalyticsView,
+        async_analytics_data_api as analytics_data_api,
+        async_analytics_stream as analytics_stream,
+    )
 
 app_name = "dashboard"
 
@@ -59,6 +84,18 @@ urlpatterns = [
     ),
     # API endpoints
     path("api/analytics/", analytics_data_api, name="analytics_api"),
+    path("api/analytics/batch/", analytics_batch_api, name="analytics_batch_api"),
+    path("api/analytics/stream/", analytics_stream, name="analytics_stream"),
+    path("api/placements/", placement_list_api, name="placement_api"),
+    path(
+        "api/placements/export/", placement_export_csv, name="placement_export"
+    ),
+    path("api/perf/", perf_stats_api, name="perf_api"),
+    path(
+        "api/physicians/<int:physician_id>/schedule/",
+        physician_schedule_api,
+        name="physician_schedule_api",
+    ),
     # Placement CRUD
     path("placements/", PlacementListView.as_view(), name="placement_list"),
     path("placements/create/", PlacementCreateView.as_view(), name="placement_create"),
@@ -75,6 +112,11 @@ urlpatterns = [
         PlacementDeleteView.as_view(),
         name="placement_delete",
     ),
+    path(
+        "placements/bulk/",
+        PlacementBulkActionView.as_view(),
+        name="placement_bulk_action",
+    ),
     path(
         "placements/import/",
         ImportPlacementsView.as_view(),
@@ -85,6 +127,12 @@ urlpatterns = [
         DownloadTemplateView.as_view(),
         name="placement_download_template",
     ),
+    # Physicians
+    path(
+        "physicians/<int:physician_id>/schedule/",
+        PhysicianScheduleView.as_view(),
+        name="physician_schedule",
+    ),
     # User CRUD
     path("users/", UserListView.as_view(), name="user_list"),
     path("users/create/", UserCreateView.as_view(), name="user_create"),
@@ -22,10 +22,16 @@ from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required as login_required_decorator
-from django.urls import reverse_lazy
-from django.db.models import Count, Q
-from django.http import JsonResponse, HttpResponse
-from placements.models import Placement
+from django.urls import reverse, reverse_lazy
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, JsonResponse, HttpResponse, QueryDict
+from django.utils import timezone
+from placements.changes import record_changes
+from placements.models import Placement, PlacementChange
+from placements.routers import read_database
+from placements.signals import placements_changed
+from placements.versioning import bump_data_version, bump_physician_versions, physicians_of
 from .forms import (
     PlacementForm,
     FilterForm,
@@ -33,13 +39,26 @@ from .forms import (
     ImportPlacementsForm,
     ProfileForm,
     SettingsForm,
+    PlacementBulkActionForm,
+    PhysicianScheduleForm,
 )
-from datetime import datetime, timedelta
-import pandas as pd
+from .analytics import (
+    FACET_ORDERING,
+    PAYLOAD_FORMATS,
+    analytics_api_key,
+    count_unique_physicians,
+    facet_counts,
+    get_payload_format,
+    time_series,
+)
+from .compression import compress_page
+from .mixins import ReadDatabaseMixin
+from .schedules import get_schedule
+from .singleflight import single_flight
+from .filters import FILTER_FIELDS, apply_placement_filters, apply_placement_search
 import logging
 import tempfile
 import os
-from io import BytesIO
 
 logger = logging.getLogger(__name__)
 
@@ -70,7 +89,7 @@ def logout_view(request):
     return redirect("dashboard:login")
 
 
-class DashboardHomeView(LoginRequiredMixin, TemplateView):
+class DashboardHomeView(ReadDatabaseMixin, LoginRequiredMixin, TemplateView):
     """Main analytics dashboard view."""
 
     template_name = "dashboard/home.html"
@@ -84,45 +103,51 @@ class DashboardHomeView(LoginRequiredMixin, TemplateView):
 
         # Base queryset
         queryset = Placement.objects.all()
+        filters = {}
 
         # Apply filters if form is valid
         if filter_form.is_valid():
-            if filter_form.cleaned_data.get("start_date"):
-                queryset = queryset.filter(
-                    date__gte=filter_form.cleaned_data["start_date"]
-                )
-            if filter_form.cleaned_data.get("end_date"):
-                queryset = queryset.filter(
-                    date__lte=filter_form.cleaned_data["end_date"]
-                )
-            if filter_form.cleaned_data.get("department"):
-                queryset = queryset.filter(
-                    department=filter_form.cleaned_data["department"]
-                )
-            if filter_form.cleaned_data.get("specialty"):
-                queryset = queryset.filter(
-                    specialty=filter_form.cleaned_data["specialty"]
-                )
-            if filter_form.cleaned_data.get("shift"):
-                queryset = queryset.filter(shift=filter_form.cleaned_data["shift"])
-            if filter_form.cleaned_data.get("status"):
-                queryset = queryset.filter(status=filter_form.cleaned_data["status"])
+            filters = filter_form.cleaned_data
+            queryset = apply_placement_filters(queryset, filters)
 
         # Statistics
         context["total_placements"] = queryset.count()
         context["full_time_placements"] = queryset.filter(status="Full Time").count()
         context["part_time_placements"] = queryset.filter(status="Part Time").count()
-        context["unique_physicians"] = (
-            queryset.exclude(physician_id__isnull=True)
-            .values("physician_id")
-            .distinct()
-            .count()
-        )
+        context["unique_physicians"] = count_unique_physicians(queryset, filters)
 
         return context
 
 
-class PlacementListView(LoginRequiredMixin, ListView):
+class PlacementFilterMixin:
+    """Build the placement queryset from the list page's search and filters."""
+
+    def get_filter_form(self):
+        if not hasattr(self, "filter_form"):
+            self.filter_form = FilterForm(self.request.GET or None)
+        return self.filter_form
+
+    def get_filtered_queryset(self, queryset=None):
+        if queryset is None:
+            queryset = Placement.objects.all()
+
+        filter_form = self.get_filter_form()
+        if filter_form.is_valid():
+            queryset = apply_placement_filters(queryset, filter_form.cleaned_data)
+
+        return apply_placement_search(queryset, self.request.GET.get("search"))
+
+    def get_filter_query(self):
+        """Query string carrying the active search and filters (no paging)."""
+        params = QueryDict(mutable=True)
+        for name in ["search"] + FILTER_FIELDS:
+            value = self.request.GET.get(name)
+            if value:
+                params[name] = value
+        return params.urlencode()
+
+
+class PlacementListView(LoginRequiredMixin, PlacementFilterMixin, ListView):
     """List view for all placements with filtering."""
 
     model = Placement
@@ -148,21 +173,16 @@ class PlacementListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         queryset = super().get_queryset()
 
-        # Search functionality
-        search = self.request.GET.get("search")
-        if search:
-            queryset = queryset.filter(
-                Q(physician_name__icontains=search)
-                | Q(department__icontains=search)
-                | Q(specialty__icontains=search)
-                | Q(area__icontains=search)
-            )
+        # Search and filters
+        queryset = self.get_filtered_queryset(queryset)
 
         return queryset.select_related()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["search_query"] = self.request.GET.get("search", "")
+        context["filter_form"] = self.get_filter_form()
+        context["filter_query"] = self.get_filter_query()
 
         # Get current rows per page from session or request
         current_rows = self.request.GET.get(
@@ -212,6 +232,148 @@ class PlacementDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+class PlacementBulkActionView(
+    LoginRequiredMixin, UserPassesTestMixin, PlacementFilterMixin, FormView
+):
+    """
+    Apply one field change, or a delete, to every placement matching the
+    placement list's current search and filters. Staff only.
+
+    The first submit only shows how many rows will be affected; the confirm
+    submit runs a single UPDATE or DELETE inside a transaction and then
+    invalidates derived data once.
+    """
+
+    template_name = "dashboard/placement_bulk_action.html"
+    form_class = PlacementBulkActionForm
+
+    def test_func(self):
+        """Only staff can change placements in bulk."""
+        return self.request.user.is_staff
+
+    def handle_no_permission(self):
+        """Handle unauthorized access."""
+        messages.error(self.request, "You don't have permission to run bulk actions.")
+        return redirect("dashboard:placement_list")
+
+    def filters_invalid(self):
+        """
+        Whether filters were given but do not validate. They would all be
+        dropped, so the action would match every placement: refuse it.
+        """
+        filter_form = self.get_filter_form()
+        return filter_form.is_bound and not filter_form.is_valid()
+
+    def refuse_invalid_filters(self):
+        errors = "; ".join(
+            f"{name.replace('_', ' ')}: {' '.join(messages_)}"
+            for name, messages_ in self.get_filter_form().errors.items()
+        )
+        messages.error(
+            self.request,
+            f"Bulk actions need valid filters. Fix them and try again ({errors}).",
+        )
+        return redirect(self.get_list_url())
+
+    def get(self, request, *args, **kwargs):
+        if self.filters_invalid():
+            return self.refuse_invalid_filters()
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        if self.filters_invalid():
+            return self.refuse_invalid_filters()
+        return super().post(request, *args, **kwargs)
+
+    def get_list_url(self):
+        url = reverse("dashboard:placement_list")
+        filter_query = self.get_filter_query()
+        return f"{url}?{filter_query}" if filter_query else url
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filter_form = self.get_filter_form()
+        context["filter_form"] = filter_form
+        context["filter_query"] = self.get_filter_query()
+        context["list_url"] = self.get_list_url()
+        context["search_query"] = self.request.GET.get("search", "")
+        context["active_filters"] = [
+            (filter_form[name].label, value)
+            for name, value in (
+                filter_form.cleaned_data.items() if filter_form.is_valid() else []
+            )
+            if value
+        ]
+        if "match_count" not in context:
+            context["match_count"] = self.get_filtered_queryset().count()
+        return context
+
+    def form_valid(self, form):
+        action = form.cleaned_data["action"]
+        field = form.cleaned_data["field"]
+        value = form.cleaned_data["value"]
+
+        with transaction.atomic():
+            queryset = self.get_filtered_queryset()
+            match_count = queryset.count()
+
+            if (
+                not form.cleaned_data["confirm"]
+                or form.cleaned_data["expected_count"] != match_count
+            ):
+                if form.cleaned_data["confirm"]:
+                    messages.warning(
+                        self.request,
+                        "The matching placements changed since the preview. "
+                        "Please review the new count before confirming.",
+                    )
+                preview_form = self.form_class(
+                    initial={
+                        "action": action,
+                        "field": field,
+                        "value": value,
+                        "expected_count": match_count,
+                        "confirm": True,
+                    }
+                )
+                return self.render_to_response(
+                    self.get_context_data(
+                        form=preview_form, preview=True, match_count=match_count
+                    )
+                )
+
+            # Logged before the change, while the filters still match the rows
+            physician_ids = physicians_of(queryset)
+            if action == PlacementBulkActionForm.ACTION_DELETE:
+                operation = PlacementChange.DELETE
+                record_changes(queryset, operation)
+                affected, _ = queryset.delete()
+            else:
+                operation = PlacementChange.UPDATE
+                record_changes(queryset, operation)
+                affected = queryset.update(
+                    **{field: value, "updated_at": timezone.now()}
+                )
+
+            # One invalidation for the whole set, after the data is visible
+            transaction.on_commit(bump_data_version)
+            transaction.on_commit(lambda: bump_physician_versions(physician_ids))
+            transaction.on_commit(
+                lambda: placements_changed.send(
+                    sender=Placement, operation=operation, using=queryset.db
+                )
+            )
+
+        if action == PlacementBulkActionForm.ACTION_DELETE:
+            messages.success(self.request, f"Deleted {affected} placements.")
+        else:
+            messages.success(
+                self.request,
+                f"Updated {field.replace('_', ' ')} on {affected} placements.",
+            )
+        return redirect(self.get_list_url())
+
+
 class PlacementDetailView(LoginRequiredMixin, DetailView):
     """Detail view for a single placement."""
 
@@ -220,92 +382,81 @@ class PlacementDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "placement"
 
 
+class PhysicianScheduleView(ReadDatabaseMixin, LoginRequiredMixin, TemplateView):
+    """A physician's placements between two dates (see schedules.py)."""
+
+    template_name = "dashboard/physician_schedule.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = PhysicianScheduleForm(self.request.GET)
+        if form.is_valid():
+            start, end = form.cleaned_data["from"], form.cleaned_data["to"]
+        else:
+            start = end = None
+        schedule = get_schedule(self.kwargs["physician_id"], start, end)
+        if schedule is None:
+            raise Http404("Unknown physician.")
+        if form.is_valid():
+            # Show the range actually used when one end was left blank
+            form = PhysicianScheduleForm(initial={"from": schedule["from"], "to": schedule["to"]})
+        context["form"] = form
+        context["schedule"] = schedule
+        context["placements"] = [
+            dict(zip(schedule["fields"], row)) for row in schedule["placements"]
+        ]
+        return context
+
+
 @login_required
+@compress_page
+@read_database
 def analytics_data_api(request):
     """
     API endpoint for analytics data.
     Returns JSON data for charts based on filters.
+
+    ``?format=columnar`` returns parallel label/count arrays instead of a
+    list of objects per facet (see analytics.columnar_payload).
+
+    Concurrent requests for the same filters share one computation (see
+    singleflight.py).
+    """
+    payload = get_payload_format(request)
+    if payload is None:
+        return JsonResponse(
+            {"errors": {"format": [f"Unknown format; use one of: {', '.join(PAYLOAD_FORMATS)}."]}},
+            status=400,
+        )
+
+    def compute():
+        # Base queryset
+        queryset = Placement.objects.all()
+
+        # Apply filters
+        queryset = apply_placement_filters(queryset, request.GET)
+
+        # Statistics per facet, null values reported as "Unknown"
+        facet_stats = {field: facet_counts(queryset, field) for field in FACET_ORDERING}
+
+        # Time series data (last 30 days) and total
+        return facet_stats, time_series(queryset), queryset.count()
+
+    data = payload(*single_flight(analytics_api_key(request.GET), compute))
+
+    return JsonResponse(data, json_dumps_params={"separators": (",", ":")})
+
+
+@login_required
+def analytics_stream(request):
     """
-    # Base queryset
-    queryset = Placement.objects.all()
-
-    # Apply filters
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
-    department = request.GET.get("department")
-    specialty = request.GET.get("specialty")
-    shift = request.GET.get("shift")
-    status = request.GET.get("status")
-
-    if start_date:
-        queryset = queryset.filter(date__gte=start_date)
-    if end_date:
-        queryset = queryset.filter(date__lte=end_date)
-    if department:
-        queryset = queryset.filter(department=department)
-    if specialty:
-        queryset = queryset.filter(specialty=specialty)
-    if shift:
-        queryset = queryset.filter(shift=shift)
-    if status:
-        queryset = queryset.filter(status=status)
-
-    # Department statistics - handle null values
-    dept_stats = list(
-        queryset.values("department").annotate(count=Count("id")).order_by("-count")
-    )
-    dept_stats = [
-        {"department": stat["department"] or "Unknown", "count": stat["count"]}
-        for stat in dept_stats
-    ]
-
-    # Specialty statistics - handle null values
-    specialty_stats = list(
-        queryset.values("specialty").annotate(count=Count("id")).order_by("-count")
-    )
-    specialty_stats = [
-        {"specialty": stat["specialty"] or "Unknown", "count": stat["count"]}
-        for stat in specialty_stats
-    ]
-
-    # Shift statistics - handle null values
-    shift_stats = list(
-        queryset.values("shift").annotate(count=Count("id")).order_by("shift")
-    )
-    shift_stats = [
-        {"shift": stat["shift"] or "Unknown", "count": stat["count"]}
-        for stat in shift_stats
-    ]
-
-    # Status statistics - handle null values
-    status_stats = list(
-        queryset.values("status").annotate(count=Count("id")).order_by("-count")
-    )
-    status_stats = [
-        {"status": stat["status"] or "Unknown", "count": stat["count"]}
-        for stat in status_stats
-    ]
-
-    # Time series data (last 30 days)
-    today = datetime.now().date()
-    thirty_days_ago = today - timedelta(days=30)
-
-    time_series = []
-    for i in range(30):
-        date = thirty_days_ago + timedelta(days=i)
-        count = queryset.filter(date=date).count()
-        time_series.append({"date": date.strftime("%Y-%m-%d"), "count": count})
-
-    data = {
-        "department_stats": dept_stats,
-        "specialty_stats": specialty_stats,
-        "shift_stats": shift_stats,
-        "status_stats": status_stats,
-        "time_series": time_series,
-        "total_count": queryset.count(),
-    }
-
-    return JsonResponse(data)
+    Live analytics updates, which need the async views under ASGI (see
+    async_views.async_analytics_stream).
+
+    A sync worker would be tied up for as long as a screen stays open, so
+    this answers 204, which tells EventSource not to reconnect.
+    """
+    return HttpResponse(status=204)
 
 
 # User CRUD Views - Admin Only
@@ -447,57 +598,6 @@ class ImportPlacementsView(LoginRequiredMixin, FormView):
     form_class = ImportPlacementsForm
     success_url = reverse_lazy("dashboard:placement_list")
 
-    def read_placements_excel(self, file_path):
-        """Read placements from Excel file."""
-        expected_columns = [
-            "Date",
-            "Shift",
-            "Physician Name",
-            "ID",
-            "Department",
-            "Speciality",
-            "Status",
-            "Area",
-            "Room Number",
-        ]
-
-        with open(file_path, "rb") as f:
-            _df = pd.read_excel(
-                f,
-                header=0,
-                dtype=str,
-                engine="openpyxl",
-            )
-        df = _df.where(pd.notnull(_df), None)
-
-        # Map column names (case-insensitive, handle variations)
-        column_mapping = {
-            "date": "Date",
-            "shift": "Shift",
-            "physician name": "Physician Name",
-            "physician_name": "Physician Name",
-            "id": "ID",
-            "department": "Department",
-            "speciality": "Speciality",
-            "specialty": "Speciality",
-            "status": "Status",
-            "area": "Area",
-            "room number": "Room Number",
-            "room_number": "Room Number",
-        }
-
-        # Rename columns if they don't match exactly
-        df.columns = [
-            column_mapping.get(col.strip().lower(), col) for col in df.columns
-        ]
-
-        # Ensure we have the expected columns (fill missing with None)
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = None
-
-        return df
-
     def form_valid(self, form):
         excel_file = form.cleaned_data["excel_file"]
         replace = form.cleaned_data["replace"]
@@ -509,115 +609,22 @@ class ImportPlacementsView(LoginRequiredMixin, FormView):
             tmp_file_path = tmp_file.name
 
         try:
-            # Clear existing data if replace is checked
+            # Imported here so workers that never import files skip pandas
+            from placements.importing import import_placements
+
+            stats = import_placements(tmp_file_path, replace=replace)
+
             if replace:
-                count = Placement.objects.count()
-                Placement.objects.all().delete()
                 messages.warning(
                     self.request,
-                    f"Deleted {count} existing placements (replace mode)",
+                    f"Deleted {stats['deleted']} existing placements (replace mode)",
                 )
 
-            # Read Excel file
-            df = self.read_placements_excel(tmp_file_path)
-
-            # Process and import data
-            created_count = 0
-            skipped_count = 0
-            error_count = 0
-
-            for index, row in df.iterrows():
-                try:
-                    # Skip only if date, shift AND physician info are all missing
-                    if (
-                        pd.isna(row.get("Date"))
-                        and pd.isna(row.get("Shift"))
-                        and pd.isna(row.get("Physician Name"))
-                    ):
-                        skipped_count += 1
-                        continue
-
-                    # Prepare placement data
-                    date_value = None
-                    if pd.notna(row.get("Date")):
-                        try:
-                            date_obj = row.get("Date")
-                            # If it's already a datetime/date object
-                            if hasattr(date_obj, "date"):
-                                date_value = date_obj.date()
-                            elif isinstance(date_obj, str):
-                                # Try multiple date formats
-                                for fmt in [
-                                    "%m/%d/%Y",
-                                    "%m/%#d/%Y",
-                                    "%Y-%m-%d",
-                                    "%d/%m/%Y",
-                                ]:
-                                    try:
-                                        date_value = datetime.strptime(
-                                            date_obj.split(" ")[0], fmt
-                                        ).date()
-                                        break
-                                    except:
-                                        continue
-                                # If string parsing failed, try pandas
-                                if date_value is None:
-                                    date_value = pd.to_datetime(
-                                        date_obj, errors="coerce"
-                                    )
-                                    if pd.notna(date_value):
-                                        date_value = date_value.date()
-                            else:
-                                # Try pandas to_datetime
-                                date_value = pd.to_datetime(date_obj, errors="coerce")
-                                if pd.notna(date_value):
-                                    date_value = date_value.date()
-                        except Exception as e:
-                            logger.warning(f"Error parsing date: {e}")
-                            date_value = None
-
-                    placement_data = {
-                        "date": date_value,
-                        "shift": str(row.get("Shift")).strip()
-                        if pd.notna(row.get("Shift"))
-                        else None,
-                        "physician_name": str(row.get("Physician Name")).strip()
-                        if pd.notna(row.get("Physician Name"))
-                        else None,
-                        "physician_id": int(row.get("ID"))
-                        if pd.notna(row.get("ID")) and str(row.get("ID")).strip() != ""
-                        else None,
-                        "department": str(row.get("Department")).strip()
-                        if pd.notna(row.get("Department"))
-                        else None,
-                        "specialty": str(row.get("Speciality")).strip()
-                        if pd.notna(row.get("Speciality"))
-                        else None,
-                        "status": str(row.get("Status")).strip()
-                        if pd.notna(row.get("Status"))
-                        else None,
-                        "area": str(row.get("Area")).strip()
-                        if pd.notna(row.get("Area"))
-                        else None,
-                        "room_number": str(row.get("Room Number")).strip()
-                        if pd.notna(row.get("Room Number"))
-                        else None,
-                    }
-
-                    # Create placement
-                    Placement.objects.create(**placement_data)
-                    created_count += 1
-
-                except Exception as e:
-                    logger.error(f"Error processing row {index}: {e}")
-                    error_count += 1
-                    skipped_count += 1
-
             # Success message
             messages.success(
                 self.request,
-                f"Import completed successfully! Created: {created_count}, "
-                f"Skipped: {skipped_count}, Errors: {error_count}",
+                f"Import completed successfully! Created: {stats['created']}, "
+                f"Skipped: {stats['skipped']}, Errors: {stats['errors']}",
             )
 
         except Exception as e:
@@ -635,74 +642,10 @@ class DownloadTemplateView(LoginRequiredMixin, View):
     """View to download an empty Excel template for placements."""
 
     def get(self, request, *args, **kwargs):
-        # Create an empty DataFrame with the required columns
-        columns = [
-            "Date",
-            "Shift",
-            "Physician Name",
-            "ID",
-            "Department",
-            "Speciality",
-            "Status",
-            "Area",
-            "Room Number",
-        ]
-
-        # Create empty DataFrame with column headers
-        df = pd.DataFrame(columns=columns)
-
-        # Add a few example rows to guide users
-        example_rows = [
-            {
-                "Date": "11/30/2025",
-                "Shift": "AM",
-                "Physician Name": "John Doe",
-                "ID": "12345",
-                "Department": "IM",
-                "Speciality": "INTERNAL MEDICINE",
-                "Status": "Full Time",
-                "Area": "MAIN",
-                "Room Number": "A-8",
-            },
-            {
-                "Date": "12/01/2025",
-                "Shift": "PM",
-                "Physician Name": "Jane Smith",
-                "ID": "67890",
-                "Department": "Cardiology",
-                "Speciality": "CARDIOLOGY",
-                "Status": "Part Time",
-                "Area": "WING-B",
-                "Room Number": "B-12",
-            },
-        ]
-
-        # Add example rows
-        df = pd.concat([df, pd.DataFrame(example_rows)], ignore_index=True)
-
-        # Create Excel file in memory
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Placements")
-
-            # Get the worksheet to format it
-            worksheet = writer.sheets["Placements"]
-
-            # Auto-adjust column widths
-            try:
-                from openpyxl.utils import get_column_letter
-
-                for idx, col in enumerate(df.columns, 1):
-                    max_length = max(df[col].astype(str).map(len).max(), len(col))
-                    column_letter = get_column_letter(idx)
-                    worksheet.column_dimensions[column_letter].width = min(
-                        max_length + 2, 30
-                    )
-            except ImportError:
-                # If openpyxl.utils is not available, skip column width adjustment
-                pass
+        # pandas/openpyxl are only imported when a template is requested
+        from placements.importing import build_template_workbook
 
-        output.seek(0)
+        output = build_template_workbook()
 
         # Create HTTP response
         response = HttpResponse(
@@ -0,0 +1,233 @@
+"""
+Cache warming for the analytics pages and API.
+
+After an import bumps the data version, every cached analytics fragment and
+API result is stale, and the first user to open each page pays for all of
+its queries. ``warm_analytics`` renders the five analytics pages and the
+analytics API ahead of them for the filter combinations users actually
+request, so their fragments (see fragments.py) and API results (see
+singleflight.py) are already cached under the new version, and loads the
+filter dropdown lists.
+
+The combinations are learned from the last lines of the gunicorn access
+log (WARM_ANALYTICS_ACCESS_LOG): the most frequent filter sets requested
+from any analytics page or the API. Without a log, the defaults are no
+filters, each department, each specialty and the current and previous
+month. Combinations are warmed on a bounded thread pool, and each process
+runs one warm-up after imports at a time: imports finishing while it runs
+get one more pass once it is done, not pools of their own.
+
+Fragments and API results only reach other workers through a shared cache
+backend (CACHE_BACKEND=sqlite or redis); dimension lists are per process.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connections
+from django.http import HttpRequest, QueryDict
+from django.urls import reverse
+from placements.dimensions import warm_dimension_values
+from . import analytics_views, views
+from .filters import FILTER_FIELDS, canonical_filters
+from .forms import PlacementApiForm
+
+logger = logging.getLogger(__name__)
+
+# URL name and view of every analytics page
+ANALYTICS_PAGES = [
+    ("dashboard:analytics_department", analytics_views.DepartmentAnalyticsView),
+    ("dashboard:analytics_specialty", analytics_views.SpecialtyAnalyticsView),
+    ("dashboard:analytics_shifts", analytics_views.ShiftAnalyticsView),
+    ("dashboard:analytics_status", analytics_views.StatusAnalyticsView),
+    ("dashboard:analytics_timeline", analytics_views.TimelineAnalyticsView),
+]
+
+# Request line of a common/combined log format entry
+REQUEST_LINE_RE = re.compile(r'"(?:GET|HEAD) (\S+) HTTP/[\d.]+"')
+
+
+def analytics_paths():
+    """Paths whose requests count towards the learned combinations."""
+    return {reverse(name) for name, _view in ANALYTICS_PAGES} | {
+        reverse("dashboard:analytics_api")
+    }
+
+
+def valid_filters(params):
+    """The filters in ``params`` if they are valid analytics filters, else None."""
+    filters = {name: params[name] for name in FILTER_FIELDS if params.get(name)}
+    return filters if PlacementApiForm(filters).is_valid() else None
+
+
+def learned_combinations(path, lines, top):
+    """
+    The ``top`` most requested filter combinations in the last ``lines``
+    lines of the access log at ``path``, most frequent first.
+    """
+    paths = analytics_paths()
+    counts = Counter()
+    with open(path, errors="replace") as f:
+        for line in deque(f, maxlen=lines):
+            match = REQUEST_LINE_RE.search(line)
+            if not match:
+                continue
+            url = urlsplit(match.group(1))
+            if url.path not in paths:
+                continue
+            filters = valid_filters(dict(parse_qsl(url.query)))
+            if filters is not None:
+                counts[canonical_filters(filters)] += 1
+    return [dict(parse_qsl(query)) for query, _count in counts.most_common(top)]
+
+
+def default_combinations():
+    """No filters, each department, each specialty, this month and last month."""
+    dimensions = warm_dimension_values()
+    month_start = date.today().replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    previous_end = month_start - timedelta(days=1)
+
+    combinations = [{}]
+    for field in ("department", "specialty"):
+        combinations.extend({field: value} for value in dimensions[field])
+    for start, end in ((month_start, month_end), (previous_end.replace(day=1), previous_end)):
+        combinations.append({"start_date": start.isoformat(), "end_date": end.isoformat()})
+    return combinations
+
+
+def get_combinations(access_log=None, lines=None, top=None):
+    """Filter combinations to warm: learned from the access log when there is one."""
+    access_log = settings.WARM_ANALYTICS_ACCESS_LOG if access_log is None else access_log
+    if access_log:
+        try:
+            combinations = learned_combinations(
+                access_log,
+                lines or settings.WARM_ANALYTICS_LOG_LINES,
+                top or settings.WARM_ANALYTICS_TOP,
+            )
+        except OSError as e:
+            logger.warning(f"Cannot read access log {access_log}: {e}")
+        else:
+            if combinations:
+                # Unfiltered pages are always worth having
+                return [{}] + [filters for filters in combinations if filters]
+    return default_combinations()
+
+
+def warm_request(path, filters, user):
+    """A GET request for ``path`` with ``filters`` as its query string, made by ``user``."""
+    query = urlencode(filters)
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = path
+    request.GET = QueryDict(query)
+    request.META = {
+        "REQUEST_METHOD": "GET",
+        "QUERY_STRING": query,
+        "SERVER_NAME": "warm_analytics",
+        "SERVER_PORT": "80",
+    }
+    request.user = user
+    return request
+
+
+def warm_combination(filters):
+    """Render the analytics API and pages under ``filters``. Returns the requests made."""
+    user = User(username="warm_analytics", is_staff=True)
+
+    def get(path):
+        return warm_request(path, filters, user)
+
+    close_old_connections()
+    try:
+        views.analytics_data_api(get(reverse("dashboard:analytics_api")))
+        for name, view_class in ANALYTICS_PAGES:
+            response = view_class.as_view()(get(reverse(name)))
+            response.render()
+    finally:
+        # Pool threads must not keep connections open once warming is done
+        connections.close_all()
+    return len(ANALYTICS_PAGES) + 1
+
+
+def warm_analytics(combinations=None, threads=None):
+    """
+    Warm the analytics caches for ``combinations`` (default: get_combinations()).
+
+    Returns a dict with ``combinations``, ``requests``, ``failed`` and ``seconds``.
+    """
+    started = time.perf_counter()
+    if combinations is None:
+        combinations = get_combinations()
+    else:
+        warm_dimension_values()
+
+    stats = {"combinations": len(combinations), "requests": 0, "failed": 0}
+    with ThreadPoolExecutor(
+        max_workers=threads or settings.WARM_ANALYTICS_THREADS,
+        thread_name_prefix="warm-analytics",
+    ) as executor:
+        futures = [
+            (filters, executor.submit(warm_combination, filters)) for filters in combinations
+        ]
+        for filters, future in futures:
+            try:
+                stats["requests"] += future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                logger.warning(f"Warming analytics for {filters or 'no filters'} failed: {e}")
+
+    stats["seconds"] = time.perf_counter() - started
+    logger.info(
+        f"Warmed analytics for {stats['combinations']} filter combinations "
+        f"({stats['requests']} requests, {stats['failed']} failed) in {stats['seconds']:.2f}s"
+    )
+    return stats
+
+
+# Whether a background warm-up is running, and whether an import finished
+# since it started (so it must run again for the newer data)
+_background_lock = threading.Lock()
+_background = {"running": False, "pending": False}
+
+
+def _warm_in_background():
+    try:
+        again = True
+        while again:
+            try:
+                warm_analytics()
+            except Exception:
+                logger.exception("Warming analytics after import failed")
+            with _background_lock:
+                again = _background["pending"]
+                _background["pending"] = False
+                _background["running"] = again
+    finally:
+        connections.close_all()
+
+
+def warm_after_import(sender, background=True, **kwargs):
+    """
+    placements_imported handler warming the analytics caches in the
+    background, or asking the warm-up already running for another pass.
+    Imports that cannot leave a background thread running (``background``
+    False) warm in the foreground themselves.
+    """
+    if not settings.WARM_ANALYTICS_AFTER_IMPORT or not background:
+        return
+    with _background_lock:
+        if _background["running"]:
+            _background["pending"] = True
+            return
+        _background["running"] = True
+    threading.Thread(target=_warm_in_background, name="warm-analytics").start()
@@ -1,23 +1,89 @@
 # Gunicorn configuration file for clinic_dashboard
+#
+# Production profile: the app is preloaded and warmed in the master, then
+# forked, so workers share its memory copy-on-write and serve their first
+# request warm. Workers are recycled after a number of requests or when
+# their RSS grows past a threshold. Every value can be overridden with the
+# GUNICORN_* environment variables below.
 
+import gc
 import multiprocessing
+import os
+import signal
+import threading
+import time
 
 # Server socket
-bind = "0.0.0.0:8000"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
 backlog = 2048
 
+
+def _memory_limit_mb():
+    """Memory available to this host or container, in MiB (None if unknown)."""
+    # cgroup v2 / v1 limit when running in a container
+    for path in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def _default_workers():
+    """2 x CPUs + 1, capped by how many workers fit in available memory."""
+    by_cpu = multiprocessing.cpu_count() * 2 + 1
+    memory = _memory_limit_mb()
+    if memory is None:
+        return by_cpu
+    return max(1, min(by_cpu, memory // worker_memory_mb))
+
+
+# Expected memory per worker (MiB), used to size the pool from memory
+worker_memory_mb = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 150))
+
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+workers = int(os.environ.get("GUNICORN_WORKERS", 0)) or _default_workers()
+# Use "uvicorn.workers.UvicornWorker" with clinic_dashboard.asgi:application
+# to serve the async analytics views (ASYNC_ANALYTICS=True)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Load the app once in the master and fork workers from it. Code changes
+# then need a full restart; a HUP only re-forks the preloaded app.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True").lower() in ("1", "true", "yes")
+
+# Worker recycling: after max_requests (+ jitter so workers do not all
+# restart together), or once RSS exceeds max_worker_rss_mb. The RSS is
+# checked from a thread in each worker rather than after requests, since
+# UvicornWorker never calls the post_request hook
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+max_worker_rss_mb = int(os.environ.get("GUNICORN_MAX_WORKER_RSS_MB", 300))
+# Seconds between RSS checks
+rss_check_interval = int(os.environ.get("GUNICORN_RSS_CHECK_INTERVAL", 10))
+
 # Process naming
 proc_name = "clinic_dashboard"
 
 # Logging
-accesslog = "-"  # Log to stdout
+# Stdout by default; write it to a file (WARM_ANALYTICS_ACCESS_LOG) to let
+# `manage.py warm_analytics` learn the most requested filters from it
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
 errorlog = "-"   # Log to stderr
 loglevel = "info"
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
@@ -33,3 +99,64 @@ tmp_upload_dir = None
 # SSL (uncomment and configure if using HTTPS)
 # keyfile = "/path/to/keyfile"
 # certfile = "/path/to/certfile"
+
+
+def _rss_mb():
+    """Current resident set size of this process in MiB (Linux), else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+# Server hooks
+
+
+def when_ready(server):
+    """Warm shared state in the master, once the preloaded app is imported."""
+    if not preload_app:
+        return
+    from clinic_dashboard.warmup import warm_up
+
+    warm_up()
+    # Move everything allocated so far out of the collector's reach so GC
+    # passes in the workers do not touch (and copy) the shared pages
+    gc.freeze()
+    server.log.info("Shared state warmed before fork")
+
+
+def _watch_rss(worker):
+    """Ask the worker to exit gracefully once its RSS is over the limit."""
+    while True:
+        time.sleep(rss_check_interval)
+        rss = _rss_mb()
+        if rss is not None and rss > max_worker_rss_mb:
+            worker.log.info(
+                "Worker %s RSS %s MiB over %s MiB, recycling", worker.pid, rss, max_worker_rss_mb
+            )
+            # SIGTERM is a graceful exit for every worker class: in-flight
+            # requests finish, then the master starts a replacement
+            os.kill(worker.pid, signal.SIGTERM)
+            return
+
+
+def post_worker_init(worker):
+    """Start the RSS watch; without preload, each worker also warms itself."""
+    if max_worker_rss_mb:
+        threading.Thread(
+            target=_watch_rss, args=(worker,), name="rss-watch", daemon=True
+        ).start()
+    if preload_app:
+        return
+    from clinic_dashboard.warmup import warm_up
+
+    warm_up()
+
+
+def worker_exit(server, worker):
+    """Write out the worker's last metrics so /metrics keeps its counts."""
+    from clinic_dashboard.metrics import flush_process_metrics
+
+    flush_process_metrics()
+
@@ -1,9 +1,13 @@
 """
-Admin configuration for Placement model.
+Admin configuration for Physician and Placement models.
 """
 
 from django.contrib import admin
-from .models import Placement
+from django.db import transaction
+from .changes import record_changes
+from .models import Physician, Placement, PlacementChange
+from .signals import placements_changed
+from .versioning import bump_data_version, bump_physician_versions, physicians_of
 
 
 @admin.register(Placement)
@@ -32,7 +36,7 @@ class PlacementAdmin(admin.ModelAdmin):
 
     search_fields = [
         "physician_name",
-        "physician_id",
+        "physician__physician_id",
         "department",
         "specialty",
         "area",
@@ -44,7 +48,7 @@ class PlacementAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
     fieldsets = (
-        ("Physician Information", {"fields": ("physician_name", "physician_id")}),
+        ("Physician Information", {"fields": ("physician_name", "physician")}),
         ("Placement Details", {"fields": ("date", "shift", "status")}),
         ("Location", {"fields": ("department", "specialty", "area", "room_number")}),
         (
@@ -55,7 +59,38 @@ class PlacementAdmin(admin.ModelAdmin):
 
     readonly_fields = ("created_at", "updated_at")
 
+    raw_id_fields = ["physician"]
+
     def get_queryset(self, request):
         """Optimize queryset with select_related if needed."""
         qs = super().get_queryset(request)
         return qs
+
+    def delete_queryset(self, request, queryset):
+        """Delete the selected placements, logging the deletes and invalidating once."""
+        using = queryset.db
+        with transaction.atomic(using=using):
+            physician_ids = physicians_of(queryset)
+            record_changes(queryset, PlacementChange.DELETE)
+            queryset.delete()
+            transaction.on_commit(bump_data_version, using=using)
+            transaction.on_commit(lambda: bump_physician_versions(physician_ids), using=using)
+            transaction.on_commit(
+                lambda: placements_changed.send(
+                    sender=Placement, operation=PlacementChange.DELETE, using=using
+                ),
+                using=using,
+            )
+
+
+@admin.register(Physician)
+class PhysicianAdmin(admin.ModelAdmin):
+    """Admin interface for Physician model."""
+
+    list_display = ["physician_id", "name", "created_at"]
+
+    search_fields = ["physician_id", "name"]
+
+    list_per_page = 50
+
+    readonly_fields = ("created_at",)
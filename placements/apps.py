@@ -0,0 +1,21 @@
+"""
+Placements app configuration.
+"""
+
+from django.apps import AppConfig
+
+
+class PlacementsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "placements"
+    verbose_name = "Placements"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import db, rollups
+        from .signals import placements_changed, placements_imported
+
+        connection_created.connect(db.configure_sqlite_connection)
+        # Connected before the dashboard's cache warming, which then sees fresh rollups
+        placements_imported.connect(rollups.refresh_after_import)
+        placements_changed.connect(rollups.refresh_after_change)
@@ -0,0 +1,120 @@
+"""
+Change data capture for placements.
+
+Every insert, update and delete of a placement appends a PlacementChange
+with a growing sequence number: single rows from Placement.save() and
+delete(), whole sets from imports, bulk actions and the admin with one
+``INSERT ... SELECT`` each (record_changes). Deletes are logged before the
+rows go, so the mass delete of a replace-mode import is captured too.
+
+Consumers (caches, rollups, exports) keep a named checkpoint and read the
+changes after it:
+
+    changes = read_changes("search-index")
+    ...process them...
+    advance("search-index", changes[-1].seq)
+
+A new consumer starts at the end of the log and is expected to load the
+current table itself first. Sequence numbers are allocated at insert time,
+so on a database with concurrent writers (PostgreSQL) a transaction can
+commit a lower ``seq`` after a consumer has read past it; SQLite has a
+single writer and never does.
+
+prune_changes() drops what every consumer has processed, and
+compact_changes() keeps only the latest change per placement, which is
+all a consumer needs: inserts and updates both mean "re-read this row".
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+from .models import ChangeConsumer, PlacementChange
+
+
+def record_changes(queryset, operation):
+    """
+    Log ``operation`` for every placement in ``queryset`` with one
+    ``INSERT ... SELECT``. Returns the number of changes logged.
+    """
+    using = queryset.db
+    connection = connections[using]
+    select_sql, params = (
+        queryset.order_by()
+        .values(changed_id=F("pk"))
+        .query.get_compiler(using)
+        .as_sql()
+    )
+    table = connection.ops.quote_name(PlacementChange._meta.db_table)
+    changed_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (placement_id, operation, changed_at) "
+            f"SELECT changed.changed_id, %s, %s FROM ({select_sql}) changed",
+            [operation, changed_at, *params],
+        )
+        return cursor.rowcount
+
+
+def last_seq(using=DEFAULT_DB_ALIAS):
+    """Sequence number of the newest change (0 for an empty log)."""
+    return PlacementChange.objects.using(using).aggregate(seq=Max("seq"))["seq"] or 0
+
+
+def get_consumer(name, using=DEFAULT_DB_ALIAS):
+    """The checkpoint of consumer ``name``, registered at the end of the log on first use."""
+    consumer = ChangeConsumer.objects.using(using).filter(name=name).first()
+    if consumer is None:
+        consumer, _created = ChangeConsumer.objects.using(using).get_or_create(
+            name=name, defaults={"seq": last_seq(using)}
+        )
+    return consumer
+
+
+def read_changes(name, limit=1000, using=DEFAULT_DB_ALIAS):
+    """Up to ``limit`` changes after consumer ``name``'s checkpoint, oldest first."""
+    checkpoint = get_consumer(name, using).seq
+    return list(
+        PlacementChange.objects.using(using).filter(seq__gt=checkpoint).order_by("seq")[:limit]
+    )
+
+
+def advance(name, seq, using=DEFAULT_DB_ALIAS):
+    """Move consumer ``name``'s checkpoint forward to ``seq`` (never back)."""
+    get_consumer(name, using)
+    ChangeConsumer.objects.using(using).filter(name=name, seq__lt=seq).update(
+        seq=seq, updated_at=timezone.now()
+    )
+
+
+def prune_changes(using=DEFAULT_DB_ALIAS):
+    """
+    Delete the changes every consumer has processed (all of them when there
+    are no consumers). Returns the number deleted.
+    """
+    horizon = ChangeConsumer.objects.using(using).aggregate(seq=Min("seq"))["seq"]
+    changes = PlacementChange.objects.using(using).all()
+    if horizon is not None:
+        changes = changes.filter(seq__lte=horizon)
+    deleted, _ = changes.delete()
+    return deleted
+
+
+def compact_changes(using=DEFAULT_DB_ALIAS):
+    """
+    Delete every change followed by a later one for the same placement.
+    Returns the number deleted.
+
+    Safe whatever the checkpoints: a consumer that has not read a dropped
+    change has not read the later one that supersedes it either.
+    """
+    with transaction.atomic(using=using):
+        latest = (
+            PlacementChange.objects.using(using)
+            .values("placement_id")
+            .annotate(latest=Max("seq"))
+            .values("latest")
+        )
+        deleted, _ = (
+            PlacementChange.objects.using(using).exclude(seq__in=latest).delete()
+        )
+    return deleted
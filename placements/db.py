@@ -0,0 +1,135 @@
+"""
+Database connection setup and checks.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Pragmas that may be set from settings.SQLITE_PRAGMAS
+SQLITE_PRAGMA_NAMES = {
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "temp_store",
+    "busy_timeout",
+    "foreign_keys",
+    "wal_autocheckpoint",
+}
+
+# synchronous and temp_store read back as numbers
+SQLITE_PRAGMA_NUMERIC_VALUES = {
+    "synchronous": {"off": "0", "normal": "1", "full": "2", "extra": "3"},
+    "temp_store": {"default": "0", "file": "1", "memory": "2"},
+}
+
+# Aliases whose effective pragmas have been logged by this process
+_logged_aliases = set()
+
+
+def get_sqlite_pragmas():
+    """Configured pragmas, skipping unset values and unknown names."""
+    pragmas = {}
+    for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+        if value is None or value == "":
+            continue
+        if name not in SQLITE_PRAGMA_NAMES:
+            logger.warning(f"Ignoring unsupported SQLite pragma: {name}")
+            continue
+        value = str(value)
+        # Values are integers or bare keywords (WAL, NORMAL, MEMORY)
+        if not value.lstrip("-").isalnum():
+            logger.warning(f"Ignoring invalid value for SQLite pragma {name}: {value}")
+            continue
+        pragmas[name] = value
+    return pragmas
+
+
+def is_read_only(connection):
+    """Whether a SQLite connection was opened with a read-only URI."""
+    return "mode=ro" in str(connection.settings_dict["NAME"])
+
+
+def read_sqlite_pragmas(raw_connection, names):
+    """Return the effective value of each pragma on a DB-API connection."""
+    effective = {}
+    for name in names:
+        row = raw_connection.execute(f"PRAGMA {name}").fetchone()
+        effective[name] = row[0] if row else None
+    return effective
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    connection_created handler applying settings.SQLITE_PRAGMAS.
+
+    Runs once per new connection; with CONN_MAX_AGE connections are reused
+    across requests, so this cost is paid once per worker thread.
+    """
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = get_sqlite_pragmas()
+    if is_read_only(connection):
+        # The journal mode is a property of the file, set by the writer
+        pragmas.pop("journal_mode", None)
+    raw_connection = connection.connection
+    for name, value in pragmas.items():
+        raw_connection.execute(f"PRAGMA {name} = {value}")
+
+    if connection.alias not in _logged_aliases:
+        _logged_aliases.add(connection.alias)
+        effective = read_sqlite_pragmas(raw_connection, pragmas)
+        logger.info(
+            f"SQLite connection '{connection.alias}' ready: "
+            + ", ".join(f"{name}={value}" for name, value in effective.items())
+        )
+
+
+@register(Tags.database)
+def check_sqlite_pragmas(app_configs, databases=None, **kwargs):
+    """
+    Log the effective SQLite pragmas and warn when they differ from settings.
+
+    Database checks run on ``migrate`` and ``check --database default``.
+    journal_mode is the one most likely to silently fall back (for example
+    on network filesystems that cannot host a WAL file).
+    """
+    errors = []
+    pragmas = get_sqlite_pragmas()
+
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != "sqlite":
+            continue
+
+        connection.ensure_connection()
+        effective = read_sqlite_pragmas(connection.connection, pragmas)
+        logger.info(
+            f"Effective SQLite pragmas for '{alias}': "
+            + ", ".join(f"{name}={value}" for name, value in effective.items())
+        )
+
+        for name in ("journal_mode", "synchronous", "temp_store"):
+            if name not in pragmas or connection.is_in_memory_db():
+                continue
+            expected = pragmas[name].lower()
+            expected = SQLITE_PRAGMA_NUMERIC_VALUES.get(name, {}).get(expected, expected)
+            actual = str(effective[name]).lower()
+            if actual != expected:
+                errors.append(
+                    Warning(
+                        f"SQLite {name} is '{effective[name]}' on '{alias}', "
+                        f"but SQLITE_PRAGMAS requests '{pragmas[name]}'.",
+                        hint="Check that the database directory is on a local, "
+                        "writable filesystem.",
+                        id="placements.W001",
+                    )
+                )
+
+    return errors
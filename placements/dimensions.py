@@ -0,0 +1,45 @@
+"""
+Distinct values of placement dimensions (departments, specialties) for
+filter dropdowns.
+
+Lists are kept in process memory per data version, so rendering a filter
+form costs a cache lookup instead of two DISTINCT scans. Warmed in the
+gunicorn master before fork (see clinic_dashboard/warmup.py), so workers
+start with them already loaded.
+"""
+
+import threading
+
+from .models import Placement
+from .versioning import get_data_version
+
+DIMENSION_FIELDS = ["department", "specialty"]
+
+_values = {}
+_lock = threading.Lock()
+
+
+def get_dimension_values(field, version=None):
+    """Sorted non-empty distinct values of ``field`` at the current data version."""
+    if version is None:
+        version = get_data_version()
+    cached = _values.get(field)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    values = [
+        value
+        for value in Placement.objects.values_list(field, flat=True)
+        .distinct()
+        .order_by(field)
+        if value
+    ]
+    with _lock:
+        _values[field] = (version, values)
+    return values
+
+
+def warm_dimension_values():
+    """Load every dimension list for the current data version."""
+    version = get_data_version()
+    return {field: get_dimension_values(field, version) for field in DIMENSION_FIELDS}
@@ -0,0 +1,429 @@
+"""
+Placement import pipeline shared by the import view and management command.
+
+Imports pandas, so views import this module inside the functions that use
+it rather than at module level.
+
+Rows are read from Excel, normalized into plain tuples in PLACEMENT_FIELDS
+order and then loaded in bulk. On PostgreSQL the load streams through
+``COPY ... FROM STDIN``; other backends use batched ``bulk_create``.
+
+Physician IDs are collected on the way through (PhysicianCache) and the new
+ones are created after the load, before the transaction commits; the
+placement foreign key is only checked at commit.
+"""
+
+import csv
+import io
+import logging
+import time
+from datetime import datetime
+
+import pandas as pd
+from clinic_dashboard.metrics import record_import
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from .changes import record_changes
+from .models import Physician, Placement, PlacementChange
+from .signals import placements_imported
+from .versioning import bump_data_version, bump_physician_versions, physicians_of
+
+logger = logging.getLogger(__name__)
+
+# Excel columns, in template order
+EXCEL_COLUMNS = [
+    "Date",
+    "Shift",
+    "Physician Name",
+    "ID",
+    "Department",
+    "Speciality",
+    "Status",
+    "Area",
+    "Room Number",
+]
+
+# Map column names (case-insensitive, handle variations)
+COLUMN_MAPPING = {
+    "date": "Date",
+    "shift": "Shift",
+    "physician name": "Physician Name",
+    "physician_name": "Physician Name",
+    "id": "ID",
+    "department": "Department",
+    "speciality": "Speciality",
+    "specialty": "Speciality",
+    "status": "Status",
+    "area": "Area",
+    "room number": "Room Number",
+    "room_number": "Room Number",
+}
+
+# Model fields filled by the import, matching EXCEL_COLUMNS one to one
+PLACEMENT_FIELDS = [
+    "date",
+    "shift",
+    "physician_name",
+    "physician_id",
+    "department",
+    "specialty",
+    "status",
+    "area",
+    "room_number",
+]
+
+DATE_FORMATS = ["%m/%d/%Y", "%m/%#d/%Y", "%Y-%m-%d", "%d/%m/%Y"]
+
+BATCH_SIZE = 2000
+
+LOAD_METHODS = ["auto", "copy", "bulk"]
+
+# Example rows included in the downloadable template to guide users
+TEMPLATE_EXAMPLE_ROWS = [
+    {
+        "Date": "11/30/2025",
+        "Shift": "AM",
+        "Physician Name": "John Doe",
+        "ID": "12345",
+        "Department": "IM",
+        "Speciality": "INTERNAL MEDICINE",
+        "Status": "Full Time",
+        "Area": "MAIN",
+        "Room Number": "A-8",
+    },
+    {
+        "Date": "12/01/2025",
+        "Shift": "PM",
+        "Physician Name": "Jane Smith",
+        "ID": "67890",
+        "Department": "Cardiology",
+        "Speciality": "CARDIOLOGY",
+        "Status": "Part Time",
+        "Area": "WING-B",
+        "Room Number": "B-12",
+    },
+]
+
+
+def build_template_workbook():
+    """Build the import template (EXCEL_COLUMNS plus example rows) as an .xlsx BytesIO."""
+    from openpyxl.utils import get_column_letter
+
+    df = pd.DataFrame(TEMPLATE_EXAMPLE_ROWS, columns=EXCEL_COLUMNS)
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Placements")
+
+        # Auto-adjust column widths
+        worksheet = writer.sheets["Placements"]
+        for idx, col in enumerate(df.columns, 1):
+            max_length = max(df[col].astype(str).map(len).max(), len(col))
+            worksheet.column_dimensions[get_column_letter(idx)].width = min(
+                max_length + 2, 30
+            )
+
+    output.seek(0)
+    return output
+
+
+def read_placements_excel(file_path):
+    """Read placements from an Excel file into a DataFrame with EXCEL_COLUMNS."""
+    with open(file_path, "rb") as f:
+        _df = pd.read_excel(
+            f,
+            header=0,
+            dtype=str,
+            engine="openpyxl",
+        )
+    df = _df.where(pd.notnull(_df), None)
+
+    # Rename columns if they don't match exactly
+    df.columns = [COLUMN_MAPPING.get(str(col).strip().lower(), col) for col in df.columns]
+
+    # Ensure we have the expected columns (fill missing with None)
+    for col in EXCEL_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    return df
+
+
+def parse_date(value):
+    """Parse an Excel date cell, returning a date or None."""
+    if hasattr(value, "date"):
+        return value.date()
+    if isinstance(value, str):
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value.split(" ")[0], fmt).date()
+            except ValueError:
+                continue
+    # Fall back to pandas for anything else
+    parsed = pd.to_datetime(value, errors="coerce")
+    return parsed.date() if pd.notna(parsed) else None
+
+
+def clean_text(value):
+    """Strip a text cell, mapping empty values to None."""
+    if pd.isna(value):
+        return None
+    return str(value).strip() or None
+
+
+def normalize_row(values):
+    """
+    Turn one row of EXCEL_COLUMNS values into a PLACEMENT_FIELDS tuple.
+
+    Returns None for rows to skip. Raises ValueError for rows that cannot be
+    stored.
+    """
+    date, shift, name, physician_id, *rest = values
+
+    # Skip only if date, shift AND physician info are all missing
+    if pd.isna(date) and pd.isna(shift) and pd.isna(name):
+        return None
+
+    date_value = None
+    if pd.notna(date):
+        try:
+            date_value = parse_date(date)
+        except Exception as e:
+            logger.warning(f"Error parsing date: {e}")
+
+    id_text = clean_text(physician_id)
+    row = (
+        date_value,
+        clean_text(shift),
+        clean_text(name),
+        int(float(id_text)) if id_text else None,
+        *(clean_text(value) for value in rest),
+    )
+
+    for field, value in zip(PLACEMENT_FIELDS, row):
+        max_length = Placement._meta.get_field(field).max_length
+        if max_length and value and len(value) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters")
+
+    return row
+
+
+def normalize_rows(df, stats):
+    """Yield normalized rows from a DataFrame, counting skips and errors in ``stats``."""
+    for index, values in enumerate(df[EXCEL_COLUMNS].itertuples(index=False, name=None)):
+        try:
+            row = normalize_row(values)
+        except Exception as e:
+            logger.error(f"Error processing row {index}: {e}")
+            stats["errors"] += 1
+            stats["skipped"] += 1
+            continue
+        if row is None:
+            stats["skipped"] += 1
+            continue
+        yield row
+
+
+class PhysicianCache:
+    """
+    In-memory set of the physician IDs the database already has.
+
+    ``track()`` passes rows through while noting physician IDs it has not
+    seen, with the first name given for each; ``create_missing()`` then
+    writes those physicians in one batch. One ID lookup per import instead
+    of one per row. ``seen`` collects every physician ID passed through.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.known = set(
+            Physician.objects.using(using).values_list("physician_id", flat=True)
+        )
+        self.missing = {}
+        self.seen = set()
+
+    def track(self, rows):
+        """Yield ``rows`` unchanged, noting physicians not in the database."""
+        id_index = PLACEMENT_FIELDS.index("physician_id")
+        name_index = PLACEMENT_FIELDS.index("physician_name")
+        for row in rows:
+            physician_id = row[id_index]
+            self.seen.add(physician_id)
+            if physician_id is not None and physician_id not in self.known:
+                self.known.add(physician_id)
+                self.missing[physician_id] = row[name_index] or ""
+            yield row
+
+    def create_missing(self):
+        """Create the physicians noted by track(). Returns how many."""
+        Physician.objects.using(self.using).bulk_create(
+            [
+                Physician(physician_id=physician_id, name=name)
+                for physician_id, name in self.missing.items()
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        created = len(self.missing)
+        self.missing = {}
+        return created
+
+
+def bulk_insert_rows(rows, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """Insert rows with batched bulk_create. Returns the number of rows written."""
+    created = 0
+    batch = []
+    for row in rows:
+        batch.append(Placement(**dict(zip(PLACEMENT_FIELDS, row))))
+        if len(batch) >= batch_size:
+            Placement.objects.using(using).bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        Placement.objects.using(using).bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+class _CSVRowStream(io.RawIOBase):
+    """File-like object rendering rows as CSV on demand, for psycopg2's copy_expert."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = b""
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text)
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self._buffer) < len(target):
+            for row in self._rows:
+                self._writer.writerow(row)
+                self.count += 1
+                if self._text.tell() >= 65536:
+                    break
+            data = self._text.getvalue()
+            if not data:
+                break
+            self._text.seek(0)
+            self._text.truncate()
+            self._buffer += data.encode()
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def copy_rows(rows, using=DEFAULT_DB_ALIAS):
+    """
+    Stream rows into the placements table with PostgreSQL COPY FROM STDIN.
+
+    Returns the number of rows written.
+    """
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    now = timezone.now()
+    columns = [Placement._meta.get_field(name).column for name in PLACEMENT_FIELDS]
+    columns += ["created_at", "updated_at"]
+    sql = (
+        f"COPY {quote_name(Placement._meta.db_table)} "
+        f"({', '.join(quote_name(column) for column in columns)}) FROM STDIN"
+    )
+    rows = (row + (now, now) for row in rows)
+
+    with connection.cursor() as cursor:
+        if is_psycopg3:
+            count = 0
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+            return count
+
+        stream = _CSVRowStream(rows)
+        cursor.copy_expert(f"{sql} WITH (FORMAT csv)", io.BufferedReader(stream))
+        return stream.count
+
+
+def load_rows(rows, using=DEFAULT_DB_ALIAS, method="auto"):
+    """
+    Load normalized rows with the fastest loader the backend supports.
+
+    ``method`` is ``"auto"`` (COPY on PostgreSQL, bulk_create elsewhere),
+    ``"copy"`` or ``"bulk"``.
+    """
+    vendor = connections[using].vendor
+    if method == "copy" or (method == "auto" and vendor == "postgresql"):
+        if vendor != "postgresql":
+            raise ValueError("COPY loading requires a PostgreSQL database")
+        return copy_rows(rows, using=using)
+    return bulk_insert_rows(rows, using=using)
+
+
+def import_placements(
+    file_path, replace=False, method="auto", using=DEFAULT_DB_ALIAS, background=True
+):
+    """
+    Import placements from an Excel file in a single transaction.
+
+    ``background`` is passed on to placements_imported receivers: pass False
+    from processes exiting right after the import (see signals.py).
+
+    Returns a dict with ``created``, ``skipped``, ``errors``, ``deleted``,
+    ``physicians`` (new physicians), ``seconds`` and ``rows_per_second``.
+    """
+    stats = {"created": 0, "skipped": 0, "errors": 0, "deleted": 0, "physicians": 0}
+    started = time.perf_counter()
+
+    df = read_placements_excel(file_path)
+
+    with transaction.atomic(using=using):
+        placements = Placement.objects.using(using)
+
+        # Clear existing data if replace is checked, logging the deletes first
+        changed_physicians = set()
+        if replace:
+            changed_physicians = physicians_of(placements.all())
+            record_changes(placements.all(), PlacementChange.DELETE)
+            stats["deleted"], _ = placements.all().delete()
+
+        # IDs only grow, so the new rows are the ones above the current maximum
+        last_id = placements.aggregate(last_id=Max("id"))["last_id"] or 0
+        physicians = PhysicianCache(using)
+        stats["created"] = load_rows(
+            physicians.track(normalize_rows(df, stats)), using=using, method=method
+        )
+        stats["physicians"] = physicians.create_missing()
+        changed_physicians |= physicians.seen
+        record_changes(placements.filter(id__gt=last_id), PlacementChange.INSERT)
+
+        # One invalidation for the whole import, and one per physician imported
+        transaction.on_commit(bump_data_version, using=using)
+        transaction.on_commit(
+            lambda: bump_physician_versions(changed_physicians), using=using
+        )
+        # Then let caches be rebuilt for the new data (see dashboard/warming.py)
+        transaction.on_commit(
+            lambda: placements_imported.send(
+                sender=Placement, stats=stats, background=background
+            ),
+            using=using,
+        )
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = (
+        stats["created"] / stats["seconds"] if stats["seconds"] else 0.0
+    )
+    record_import(stats, method)
+    logger.info(
+        f"Imported {stats['created']} placements in {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:.0f} rows/s, method={method}, "
+        f"vendor={connections[using].vendor})"
+    )
+    return stats
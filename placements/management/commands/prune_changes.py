@@ -0,0 +1,50 @@
+"""
+Django management command to prune and compact the placement change log.
+Usage: python manage.py prune_changes [--compact] [--drop-consumer NAME]
+
+Deletes the changes every consumer has processed, then with ``--compact``
+keeps only the latest change per placement among the rest. A consumer that
+stopped reading holds back pruning; ``--drop-consumer`` removes its
+checkpoint (it then restarts from the end of the log on its next read).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from placements.changes import compact_changes, last_seq, prune_changes
+from placements.models import ChangeConsumer
+
+
+class Command(BaseCommand):
+    help = "Prune (and optionally compact) the placement change log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compact",
+            action="store_true",
+            help="Also keep only the latest unread change per placement",
+        )
+        parser.add_argument(
+            "--drop-consumer",
+            action="append",
+            default=[],
+            metavar="NAME",
+            help="Remove a consumer's checkpoint before pruning (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        for name in options["drop_consumer"]:
+            deleted, _ = ChangeConsumer.objects.filter(name=name).delete()
+            if not deleted:
+                raise CommandError(f"Unknown change consumer: {name}")
+            self.stdout.write(f"Dropped consumer {name}")
+
+        newest = last_seq()
+        for consumer in ChangeConsumer.objects.all():
+            self.stdout.write(
+                f"  {consumer.name:<30} at {consumer.seq} ({newest - consumer.seq} behind)"
+            )
+
+        pruned = prune_changes()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} processed changes"))
+        if options["compact"]:
+            compacted = compact_changes()
+            self.stdout.write(self.style.SUCCESS(f"Compacted away {compacted} superseded changes"))
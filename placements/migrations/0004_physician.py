@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_physicians(apps, schema_editor):
+    """One physician per distinct placement physician_id, named after one of its rows."""
+    Placement = apps.get_model("placements", "Placement")
+    Physician = apps.get_model("placements", "Physician")
+    using = schema_editor.connection.alias
+    names = (
+        Placement.objects.using(using)
+        .exclude(physician_id__isnull=True)
+        .values_list("physician_id")
+        .annotate(name=Max("physician_name"))
+        .order_by()
+    )
+    Physician.objects.using(using).bulk_create(
+        [Physician(physician_id=physician_id, name=name or "") for physician_id, name in names],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("placements", "0003_placement_change_log"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Physician",
+            fields=[
+                (
+                    "physician_id",
+                    models.IntegerField(
+                        help_text="Physician unique ID",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        blank=True, help_text="Physician's full name", max_length=255
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Physician",
+                "verbose_name_plural": "Physicians",
+                "ordering": ["name", "physician_id"],
+            },
+        ),
+        migrations.RunPython(create_physicians, migrations.RunPython.noop),
+        # physician_id becomes the column of the physician foreign key without
+        # touching the data; the constraint and index are added below
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name="placement",
+                    name="physician_id",
+                ),
+                migrations.AddField(
+                    model_name="placement",
+                    name="physician",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_column="physician_id",
+                        db_constraint=False,
+                        db_index=False,
+                        help_text="Physician unique ID",
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="placements",
+                        to="placements.physician",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="placement",
+            name="physician",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="physician_id",
+                help_text="Physician unique ID",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="placements",
+                to="placements.physician",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("placements", "0004_physician"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlacementRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[
+                            ("day", "Day"),
+                            ("month", "Month"),
+                            ("total", "Total"),
+                        ],
+                        max_length=5,
+                    ),
+                ),
+                ("date", models.DateField(blank=True, null=True)),
+                ("department", models.CharField(blank=True, max_length=255, null=True)),
+                ("specialty", models.CharField(blank=True, max_length=255, null=True)),
+                ("shift", models.CharField(blank=True, max_length=10, null=True)),
+                ("status", models.CharField(blank=True, max_length=50, null=True)),
+                ("placements", models.PositiveIntegerField(default=0)),
+                ("physicians", models.BinaryField(default=b"")),
+                ("rooms", models.BinaryField(default=b"")),
+            ],
+            options={
+                "verbose_name": "Placement rollup",
+                "verbose_name_plural": "Placement rollups",
+                "indexes": [
+                    models.Index(
+                        fields=["period", "date"], name="placements__period_52d38f_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("placements", "0005_placement_rollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="placement",
+            index=models.Index(
+                fields=["physician", "date"], name="placements__physici_acb54f_idx"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="placement",
+            name="physician",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="physician_id",
+                db_index=False,
+                help_text="Physician unique ID",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="placements",
+                to="placements.physician",
+            ),
+        ),
+    ]
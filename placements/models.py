@@ -1,8 +1,39 @@
 """
-Placement model for clinic placement data.
+Placement and physician models for clinic placement data.
 """
 
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
+from .signals import placements_changed
+from .versioning import bump_data_version, bump_physician_versions
+
+
+class Physician(models.Model):
+    """
+    A physician, keyed by the ID placements carry.
+
+    Imports create one row per new ID with the first name seen for it;
+    ``Placement.physician_name`` keeps the name exactly as each row gave it.
+    """
+
+    physician_id = models.IntegerField(primary_key=True, help_text="Physician unique ID")
+    name = models.CharField(max_length=255, blank=True, help_text="Physician's full name")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["name", "physician_id"]
+        verbose_name = "Physician"
+        verbose_name_plural = "Physicians"
+
+    def __str__(self):
+        return f"{self.name or 'Unknown Physician'} ({self.physician_id})"
+
+    def save(self, *args, **kwargs):
+        """Save the physician and invalidate their cached schedule once committed."""
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        super().save(*args, **kwargs)
+        physician_ids = [self.physician_id]
+        transaction.on_commit(lambda: bump_physician_versions(physician_ids), using=using)
 
 
 class Placement(models.Model):
@@ -38,8 +69,17 @@ class Placement(models.Model):
     physician_name = models.CharField(
         max_length=255, null=True, blank=True, help_text="Physician's full name"
     )
-    physician_id = models.IntegerField(
-        null=True, blank=True, help_text="Physician unique ID"
+    # The column stays physician_id, so rows and queries keep using the raw ID.
+    # Indexed by the (physician, date) index below
+    physician = models.ForeignKey(
+        Physician,
+        on_delete=models.PROTECT,
+        db_column="physician_id",
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name="placements",
+        help_text="Physician unique ID",
     )
     department = models.CharField(
         max_length=255, null=True, blank=True, help_text="Department name"
@@ -79,6 +119,9 @@ class Placement(models.Model):
             models.Index(fields=["department"]),
             models.Index(fields=["specialty"]),
             models.Index(fields=["status"]),
+            # One physician's schedule is a range scan; a physician_id
+            # lookup alone uses its prefix
+            models.Index(fields=["physician", "date"]),
         ]
 
     def __str__(self):
@@ -87,6 +130,55 @@ class Placement(models.Model):
         name = self.physician_name or "Unknown Physician"
         return f"{name} - {date_str} ({self.shift or 'N/A'})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # A save that moves the row to another physician changes both schedules
+        instance._loaded_physician_id = instance.__dict__.get("physician_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save the placement, log the change and invalidate derived data."""
+        operation = PlacementChange.INSERT if self._state.adding else PlacementChange.UPDATE
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        physician_ids = [self.physician_id, getattr(self, "_loaded_physician_id", None)]
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            PlacementChange.objects.using(using).create(placement_id=self.pk, operation=operation)
+            # Invalidated once committed, which may be when an enclosing
+            # transaction (an admin view's) commits, not when this block exits;
+            # bumping earlier would let readers cache the old rows under the
+            # new version
+            transaction.on_commit(bump_data_version, using=using)
+            transaction.on_commit(lambda: bump_physician_versions(physician_ids), using=using)
+            transaction.on_commit(
+                lambda: placements_changed.send(
+                    sender=Placement, operation=operation, using=using
+                ),
+                using=using,
+            )
+        self._loaded_physician_id = self.physician_id
+
+    def delete(self, *args, **kwargs):
+        """Delete the placement, log the change and invalidate derived data."""
+        placement_id = self.pk
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        physician_ids = [self.physician_id]
+        with transaction.atomic(using=using):
+            result = super().delete(*args, **kwargs)
+            PlacementChange.objects.using(using).create(
+                placement_id=placement_id, operation=PlacementChange.DELETE
+            )
+            transaction.on_commit(bump_data_version, using=using)
+            transaction.on_commit(lambda: bump_physician_versions(physician_ids), using=using)
+            transaction.on_commit(
+                lambda: placements_changed.send(
+                    sender=Placement, operation=PlacementChange.DELETE, using=using
+                ),
+                using=using,
+            )
+        return result
+
     @property
     def is_active(self):
         """Check if placement is currently active."""
@@ -144,3 +236,101 @@ class Placement(models.Model):
         return (
             cls.objects.values("status").annotate(count=Count("id")).order_by("-count")
         )
+
+
+class PlacementChange(models.Model):
+    """
+    Append-only log entry: one placement was inserted, updated or deleted.
+
+    ``seq`` grows with every entry, so consumers read "what changed since X"
+    by sequence number (see changes.py). Entries only name the placement;
+    its current state is read from the placements table, and a delete is
+    the only trace left of a removed row.
+    """
+
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+    OPERATION_CHOICES = [
+        (INSERT, "Insert"),
+        (UPDATE, "Update"),
+        (DELETE, "Delete"),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    # Not a foreign key: the log outlives the rows it describes
+    placement_id = models.BigIntegerField(db_index=True)
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["seq"]
+        verbose_name = "Placement change"
+        verbose_name_plural = "Placement changes"
+
+    def __str__(self):
+        return f"#{self.seq} {self.operation} placement {self.placement_id}"
+
+
+class ChangeConsumer(models.Model):
+    """Checkpoint of a reader of the placement change log: the last ``seq`` it processed."""
+
+    name = models.CharField(max_length=100, unique=True)
+    seq = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} @ {self.seq}"
+
+
+class PlacementRollup(models.Model):
+    """
+    Placement count and distinct-value sketches of one rollup cell.
+
+    A cell is a (period, date, department, specialty, shift, status)
+    combination: ``day`` cells per placement date, ``month`` cells dated the
+    first of the month and one undated ``total`` cell per dimension
+    combination, so any date range is covered by whole months plus the days
+    at either end. ``physicians`` and ``rooms`` are HyperLogLog sketches
+    (see sketches.py) of the cell's physician IDs and room numbers; see
+    rollups.py for how cells are kept up to date and combined.
+    """
+
+    DAY = "day"
+    MONTH = "month"
+    TOTAL = "total"
+
+    PERIOD_CHOICES = [
+        (DAY, "Day"),
+        (MONTH, "Month"),
+        (TOTAL, "Total"),
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    date = models.DateField(null=True, blank=True)
+    department = models.CharField(max_length=255, null=True, blank=True)
+    specialty = models.CharField(max_length=255, null=True, blank=True)
+    shift = models.CharField(max_length=10, null=True, blank=True)
+    status = models.CharField(max_length=50, null=True, blank=True)
+    placements = models.PositiveIntegerField(default=0)
+    physicians = models.BinaryField(default=b"")
+    rooms = models.BinaryField(default=b"")
+
+    class Meta:
+        verbose_name = "Placement rollup"
+        verbose_name_plural = "Placement rollups"
+        indexes = [
+            models.Index(fields=["period", "date"]),
+        ]
+
+    def __str__(self):
+        cell = ", ".join(
+            str(value)
+            for value in (self.date, self.department, self.specialty, self.shift, self.status)
+            if value
+        )
+        return f"{self.period} rollup ({cell or 'all'}): {self.placements} placements"
@@ -0,0 +1,365 @@
+"""
+Placement rollups: placement counts and distinct-value sketches per cell.
+
+Every placement counts towards three PlacementRollup cells with its
+department, specialty, shift and status: its ``day`` cell, its ``month``
+cell and the ``total`` cell (undated placements only count towards the
+total). Each cell holds the number of placements and HyperLogLog sketches
+(sketches.py) of their physician IDs and room numbers.
+
+Any FilterForm filter combination maps onto a set of cells holding exactly
+its placements (cell_filter): whole months come from month cells, the
+days at either end of the range from day cells, and no date range from
+the total cells. estimate_distinct() merges their sketches, so a distinct
+count costs one query over a number of cells that depends on the filters
+but not on how much history the table holds.
+
+The rollups are a consumer of the placement change log (changes.py).
+refresh_rollups() folds logged inserts into the cells; updates and deletes
+cannot be taken out of a sketch, so any of those rebuilds the rollups from
+the table. Imports refresh them right away (placements_imported). Other
+changes refresh them once committed (placements_changed): new placements
+are folded in on the spot, while updates and deletes leave the rebuild to
+a background thread, one per process at a time, which runs once more for
+changes committed while it works. Until they catch up estimate_distinct()
+returns None and callers count exactly.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Exists, Q, Subquery
+from django.db.models.functions import Coalesce
+from . import sketches
+from .changes import advance, get_consumer, last_seq
+from .models import ChangeConsumer, Placement, PlacementChange, PlacementRollup
+
+logger = logging.getLogger(__name__)
+
+# Change log consumer name of the rollups
+CONSUMER = "rollups"
+
+DIMENSIONS = ["department", "specialty", "shift", "status"]
+
+# Sketch fields and the placement field each one counts
+SKETCH_FIELDS = {"physicians": "physician_id", "rooms": "room_number"}
+
+# Placement columns read into the rollups, in _summarize() order
+ROW_FIELDS = ["date", *DIMENSIONS, "physician_id", "room_number"]
+
+BATCH_SIZE = 2000
+
+# Unlocked reads of the table a rebuild tries before reading it under the lock
+REBUILD_ATTEMPTS = 3
+
+
+def _summarize(rows):
+    """
+    Cells of placement ``rows`` (ROW_FIELDS tuples): a dict mapping cell key
+    (period, date, *DIMENSIONS) to (placements, physicians, rooms).
+    """
+    cells = {}
+    counts = Counter()
+    physician_cells, physician_ids = [], []
+    room_cells, rooms = [], []
+
+    for date, *dimensions, physician_id, room_number in rows:
+        keys = [(PlacementRollup.TOTAL, None, *dimensions)]
+        if date is not None:
+            keys.append((PlacementRollup.DAY, date, *dimensions))
+            keys.append((PlacementRollup.MONTH, date.replace(day=1), *dimensions))
+        for key in keys:
+            cell = cells.setdefault(key, len(cells))
+            counts[cell] += 1
+            if physician_id is not None:
+                physician_cells.append(cell)
+                physician_ids.append(physician_id)
+            if room_number is not None:
+                room_cells.append(cell)
+                rooms.append(room_number)
+
+    physician_sketches = sketches.build_sketches(
+        physician_cells, sketches.hash_ints(physician_ids)
+    )
+    room_sketches = sketches.build_sketches(room_cells, sketches.hash_strings(rooms))
+    return {
+        key: (counts[cell], physician_sketches.get(cell, b""), room_sketches.get(cell, b""))
+        for key, cell in cells.items()
+    }
+
+
+def _new_cell(key, placements, physicians, rooms):
+    period, date, *dimensions = key
+    return PlacementRollup(
+        period=period,
+        date=date,
+        **dict(zip(DIMENSIONS, dimensions)),
+        placements=placements,
+        physicians=physicians,
+        rooms=rooms,
+    )
+
+
+def _cell_key(cell):
+    return (cell.period, cell.date, *(getattr(cell, name) for name in DIMENSIONS))
+
+
+def _read_table(using):
+    """The newest change and the cells of every placement: ``(seq, summary)``."""
+    seq = last_seq(using)
+    rows = (
+        Placement.objects.using(using)
+        .order_by()
+        .values_list(*ROW_FIELDS)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    return seq, _summarize(rows)
+
+
+def rebuild_rollups(using=DEFAULT_DB_ALIAS):
+    """
+    Recompute every rollup cell from the placements table. Returns the number of cells.
+
+    The table is read before taking the write lock, so writers only wait
+    while the cells are replaced; if placements changed in the meantime it
+    is read again, and after REBUILD_ATTEMPTS under the lock.
+    """
+    get_consumer(CONSUMER, using)
+    for attempt in range(REBUILD_ATTEMPTS + 1):
+        locked = attempt == REBUILD_ATTEMPTS
+        if not locked:
+            seq, summary = _read_table(using)
+        with transaction.atomic(using=using):
+            # One rebuild replaces the cells at a time
+            ChangeConsumer.objects.using(using).select_for_update().filter(
+                name=CONSUMER
+            ).first()
+            if locked:
+                seq, summary = _read_table(using)
+            elif last_seq(using) != seq:
+                continue
+            PlacementRollup.objects.using(using).all().delete()
+            PlacementRollup.objects.using(using).bulk_create(
+                [_new_cell(key, *values) for key, values in summary.items()],
+                batch_size=BATCH_SIZE,
+            )
+            advance(CONSUMER, seq, using)
+        return len(summary)
+
+
+def _add_placements(placement_ids, using):
+    """Fold the placements with ``placement_ids`` into the rollup cells."""
+    placement_ids = list(placement_ids)
+    rows = []
+    for start in range(0, len(placement_ids), BATCH_SIZE):
+        rows.extend(
+            Placement.objects.using(using)
+            .filter(id__in=placement_ids[start:start + BATCH_SIZE])
+            .values_list(*ROW_FIELDS)
+        )
+    summary = _summarize(rows)
+
+    days = {key[1] for key in summary if key[0] == PlacementRollup.DAY}
+    months = {key[1] for key in summary if key[0] == PlacementRollup.MONTH}
+    existing = {
+        _cell_key(cell): cell
+        for cell in PlacementRollup.objects.using(using).filter(
+            Q(period=PlacementRollup.TOTAL)
+            | Q(period=PlacementRollup.DAY, date__in=days)
+            | Q(period=PlacementRollup.MONTH, date__in=months)
+        )
+    }
+
+    changed, created = [], []
+    for key, (placements, physicians, rooms) in summary.items():
+        cell = existing.get(key)
+        if cell is None:
+            created.append(_new_cell(key, placements, physicians, rooms))
+            continue
+        cell.placements += placements
+        cell.physicians = sketches.merge([cell.physicians, physicians])
+        cell.rooms = sketches.merge([cell.rooms, rooms])
+        changed.append(cell)
+    PlacementRollup.objects.using(using).bulk_update(
+        changed, ["placements", "physicians", "rooms"], batch_size=BATCH_SIZE
+    )
+    PlacementRollup.objects.using(using).bulk_create(created, batch_size=BATCH_SIZE)
+
+
+def refresh_rollups(using=DEFAULT_DB_ALIAS, rebuild=True):
+    """
+    Bring the rollups up to date with the change log.
+
+    Returns ``"current"`` (nothing to do), ``"updated"`` (inserts folded in)
+    or ``"rebuilt"``. With ``rebuild`` False, returns ``"behind"`` instead
+    of rebuilding.
+    """
+    with transaction.atomic(using=using):
+        consumer = (
+            ChangeConsumer.objects.using(using).select_for_update().filter(name=CONSUMER).first()
+        )
+        if consumer is not None:
+            seq = last_seq(using)
+            if seq <= consumer.seq:
+                return "current"
+            changes = PlacementChange.objects.using(using).filter(
+                seq__gt=consumer.seq, seq__lte=seq
+            )
+            if not changes.exclude(operation=PlacementChange.INSERT).exists():
+                _add_placements(changes.values_list("placement_id", flat=True), using)
+                advance(CONSUMER, seq, using)
+                return "updated"
+    # Rebuilt outside this transaction, which would hold the write lock throughout
+    if not rebuild:
+        return "behind"
+    rebuild_rollups(using)
+    return "rebuilt"
+
+
+def _current_checkpoint(using):
+    """The rollups' checkpoint, if it is at the end of the change log."""
+    newest = PlacementChange.objects.using(using).order_by("-seq").values("seq")[:1]
+    return ChangeConsumer.objects.using(using).filter(
+        name=CONSUMER, seq__gte=Coalesce(Subquery(newest), 0)
+    )
+
+
+def rollups_current(using=DEFAULT_DB_ALIAS):
+    """Whether the rollups include every logged change."""
+    return _current_checkpoint(using).exists()
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def cell_filter(filters):
+    """
+    Q selecting the cells that together hold exactly the placements matching
+    FilterForm-style ``filters`` (see apply_placement_filters).
+    """
+    dimensions = Q(**{name: filters[name] for name in DIMENSIONS if filters.get(name)})
+    start, end = filters.get("start_date"), filters.get("end_date")
+    if not start and not end:
+        return dimensions & Q(period=PlacementRollup.TOTAL)
+
+    # Whole months in [start, end] are [first_month, end_month)
+    first_month = start if not start or start.day == 1 else _next_month(start)
+    end_month = None
+    if end:
+        after_end = end + timedelta(days=1)
+        end_month = after_end if after_end.day == 1 else end.replace(day=1)
+    if first_month and end_month and first_month >= end_month:
+        days = Q(period=PlacementRollup.DAY, date__gte=start, date__lte=end)
+        return dimensions & days
+
+    months = Q(period=PlacementRollup.MONTH)
+    if first_month:
+        months &= Q(date__gte=first_month)
+    if end_month:
+        months &= Q(date__lt=end_month)
+    cells = months
+    if start and start < first_month:
+        cells |= Q(period=PlacementRollup.DAY, date__gte=start, date__lt=first_month)
+    if end:
+        cells |= Q(period=PlacementRollup.DAY, date__gte=end_month, date__lte=end)
+    return dimensions & cells
+
+
+def estimate_distinct(filters, field="physicians", using=DEFAULT_DB_ALIAS):
+    """
+    Approximate number of distinct ``field`` values ("physicians" or
+    "rooms") among the placements matching ``filters``, with the number of
+    those placements: ``(estimate, placements)``.
+
+    Within a few units below the true count up to sketches.SPARSE_LIMIT
+    distinct values, within sketches.STANDARD_ERROR beyond. One query.
+    Returns None when the rollups are disabled (ANALYTICS_ROLLUPS), behind
+    the change log or without a matching cell.
+    """
+    if field not in SKETCH_FIELDS:
+        raise ValueError(f"Unknown sketch field: {field}")
+    if not settings.ANALYTICS_ROLLUPS:
+        return None
+    # Cells only come back while the rollups are current
+    cells = list(
+        PlacementRollup.objects.using(using)
+        .filter(cell_filter(filters), Exists(_current_checkpoint(using)))
+        .values_list("placements", field)
+    )
+    if not cells:
+        return None
+    placements = sum(count for count, _sketch in cells)
+    return sketches.count_distinct(sketch for _count, sketch in cells), placements
+
+
+def refresh_after_import(sender, **kwargs):
+    """placements_imported handler folding the imported rows into the rollups."""
+    if not settings.ANALYTICS_ROLLUPS:
+        return
+    started = time.perf_counter()
+    result = refresh_rollups()
+    logger.info(f"Rollups {result} after import in {time.perf_counter() - started:.2f}s")
+
+
+# Whether a background refresh is running, and whether placements changed
+# since it started (so it must run again for the newer changes)
+_background_lock = threading.Lock()
+_background = {"running": False, "pending": False}
+
+
+def _refresh_in_background(using):
+    try:
+        again = True
+        while again:
+            try:
+                started = time.perf_counter()
+                result = refresh_rollups(using)
+                logger.info(
+                    f"Rollups {result} after changes in {time.perf_counter() - started:.2f}s"
+                )
+            except Exception:
+                logger.exception("Refreshing rollups after changes failed")
+            with _background_lock:
+                again = _background["pending"]
+                _background["pending"] = False
+                _background["running"] = again
+    finally:
+        connections.close_all()
+
+
+def refresh_in_background(using=DEFAULT_DB_ALIAS):
+    """
+    Refresh the rollups on a background thread, or ask the refresh already
+    running for another pass.
+    """
+    with _background_lock:
+        if _background["running"]:
+            _background["pending"] = True
+            return
+        _background["running"] = True
+    threading.Thread(
+        target=_refresh_in_background, args=(using,), name="refresh-rollups"
+    ).start()
+
+
+def refresh_after_change(sender, operation, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    placements_changed handler: folds new placements in right away, and
+    rebuilds in the background after updates and deletes (or inserts the
+    rollups cannot fold, behind an earlier update).
+    """
+    if not settings.ANALYTICS_ROLLUPS:
+        return
+    if operation == PlacementChange.INSERT:
+        with _background_lock:
+            rebuilding = _background["running"]
+        # A running rebuild picks new placements up on its next pass
+        if not rebuilding and refresh_rollups(using, rebuild=False) != "behind":
+            return
+    refresh_in_background(using)
@@ -0,0 +1,85 @@
+"""
+Database routing for read-heavy analytics and export paths.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_DB_ALIAS = "read"
+
+_use_read_database = ContextVar("placements_use_read_database", default=False)
+
+
+def read_database_available():
+    return READ_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_read_database():
+    """Route placement reads inside the block to the ``read`` alias."""
+    token = _use_read_database.set(True)
+    try:
+        yield
+    finally:
+        _use_read_database.reset(token)
+
+
+def read_database(view_func):
+    """View decorator running the whole view, template rendering included, on the read alias."""
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def _async_view(*args, **kwargs):
+            with use_read_database():
+                response = await view_func(*args, **kwargs)
+                if hasattr(response, "render") and not response.is_rendered:
+                    await sync_to_async(response.render)()
+                return response
+
+        return _async_view
+
+    @wraps(view_func)
+    def _view(*args, **kwargs):
+        with use_read_database():
+            response = view_func(*args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+            return response
+
+    return _view
+
+
+class ReadReplicaRouter:
+    """
+    Send placement reads to the ``read`` alias inside use_read_database().
+
+    Everything else stays on ``default``: all writes, reads from other apps
+    (sessions, auth), and any read made inside a transaction on ``default``,
+    so read-after-write paths always see their own changes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_read_database.get()
+            and model._meta.app_label == "placements"
+            and read_database_available()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return READ_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_DB_ALIAS:
+            return False
+        return None
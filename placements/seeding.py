@@ -0,0 +1,59 @@
+"""
+Synthetic placement data for load tests and query checks.
+
+Rows are generated from a fixed random seed, so two databases seeded at the
+same scale hold the same data and their timings can be compared.
+"""
+
+import random
+from datetime import date, timedelta
+
+from django.db.models import Max
+from .changes import record_changes
+from .models import Physician, Placement, PlacementChange
+from .versioning import bump_data_version, bump_physician_versions
+
+DEPARTMENTS = ["IM", "ER", "Cardiology", "Pediatrics", "Surgery"]
+SPECIALTIES = ["INTERNAL MEDICINE", "CARDIOLOGY", "PEDIATRICS", "GENERAL SURGERY"]
+AREAS = ["MAIN", "NORTH", "SOUTH", "ANNEX"]
+
+
+def seed_placements(rows, days=60, physicians=50, batch_size=5000, seed=0):
+    """
+    Create ``rows`` placements spread over the last ``days`` days.
+
+    Rows are inserted in batches of ``batch_size``, so seeding a million
+    rows does not hold them all in memory at once.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    shifts = [choice for choice, _label in Placement.SHIFT_CHOICES]
+    statuses = [choice for choice, _label in Placement.STATUS_CHOICES]
+    last_id = Placement.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+
+    Physician.objects.bulk_create(
+        [Physician(physician_id=1000 + i, name=f"Physician {i}") for i in range(physicians)],
+        ignore_conflicts=True,
+    )
+
+    for start in range(0, rows, batch_size):
+        Placement.objects.bulk_create(
+            [
+                Placement(
+                    date=today - timedelta(days=rng.randrange(days)),
+                    shift=rng.choice(shifts),
+                    physician_name=f"Physician {i % physicians}",
+                    physician_id=1000 + i % physicians,
+                    department=rng.choice(DEPARTMENTS),
+                    specialty=rng.choice(SPECIALTIES),
+                    status=rng.choice(statuses),
+                    area=rng.choice(AREAS),
+                    room_number=f"R-{i % 20}",
+                )
+                for i in range(start, min(start + batch_size, rows))
+            ]
+        )
+    # bulk_create skips the save() that normally logs and invalidates
+    record_changes(Placement.objects.filter(id__gt=last_id), PlacementChange.INSERT)
+    bump_data_version()
+    bump_physician_versions(range(1000, 1000 + physicians))
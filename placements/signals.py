@@ -0,0 +1,16 @@
+"""
+Signals sent by the placements app.
+"""
+
+from django.dispatch import Signal
+
+# Sent once an import has committed and bumped the data version, with the
+# import's ``stats`` (see importing.import_placements) and ``background``:
+# False when the importing process exits right after it (management
+# commands), so receivers must not leave work to background threads
+placements_imported = Signal()
+
+# Sent once other changes to placements have committed (saves, deletes,
+# bulk actions), with the PlacementChange ``operation`` and the ``using``
+# database alias
+placements_changed = Signal()
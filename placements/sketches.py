@@ -0,0 +1,220 @@
+"""
+HyperLogLog sketches for approximate distinct counts.
+
+A sketch summarizes a set of values in REGISTERS one-byte registers: each
+value is hashed to 64 bits, the first PRECISION bits pick a register and
+the register keeps the longest run of leading zeros (plus one) seen in the
+remaining bits. Sketches of any number of sets merge by taking the
+register-wise maximum, which is what lets per-cell sketches (see
+rollups.py) answer "how many distinct physicians" for any combination of
+cells.
+
+Small sets are kept sparse instead, as the list of their hashes cut to
+SPARSE_PRECISION bits (plus the run of zeros after them, so the list can
+still be turned into registers), as long as that list is smaller than the
+registers: up to SPARSE_LIMIT distinct values. A cell with a handful of
+physicians costs a few bytes, and merged sketches stay sparse while the
+merged set is small.
+
+Error bounds:
+
+- Sparse (up to SPARSE_LIMIT = 4096 distinct values): linear counting over
+  2**25 buckets. Not exact: values whose hashes share a bucket count once,
+  so estimates are low by a few units at most, and usually right (in 300
+  random sets each: never off at 100 values, at most 1 low at 1000 and at
+  most 2 low at 4000).
+- Dense: relative standard error 1.04 / sqrt(REGISTERS), 0.81% at
+  PRECISION 14, so about 68% of estimates are within 0.81% of the true
+  count, 95% within 1.6% and 99.7% within 2.4%.
+
+NumPy is imported inside the functions: it must not load at worker startup
+(STARTUP_FORBIDDEN_MODULES).
+"""
+
+import hashlib
+import math
+
+PRECISION = 14
+REGISTERS = 1 << PRECISION
+
+SPARSE_PRECISION = 25
+SPARSE_LIMIT = REGISTERS // 4
+
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+# First byte of a stored sketch
+SPARSE = 1
+DENSE = 2
+
+_SPLITMIX_GAMMA = 0x9E3779B97F4A7C15
+_SPLITMIX_MUL1 = 0xBF58476D1CE4E5B9
+_SPLITMIX_MUL2 = 0x94D049BB133111EB
+
+# A sparse entry packs the bucket above the run of zeros (at most 40, six bits)
+_RANK_BITS = 6
+
+
+def hash_ints(values):
+    """64-bit hashes (uint64 array) of integers, with the SplitMix64 finalizer."""
+    import numpy as np
+
+    with np.errstate(over="ignore"):
+        z = np.asarray(values, dtype=np.int64).astype(np.uint64) + np.uint64(_SPLITMIX_GAMMA)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(_SPLITMIX_MUL1)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(_SPLITMIX_MUL2)
+        return z ^ (z >> np.uint64(31))
+
+
+def hash_strings(values):
+    """64-bit hashes (uint64 array) of strings; each distinct string is hashed once."""
+    import numpy as np
+
+    hashes = {}
+    for value in values:
+        if value not in hashes:
+            digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+            hashes[value] = int.from_bytes(digest, "little")
+    return np.fromiter((hashes[value] for value in values), dtype=np.uint64, count=len(values))
+
+
+def _bit_length(values):
+    """Bit length of each value of an integer array (exact below 2**53)."""
+    import numpy as np
+
+    _mantissa, exponent = np.frexp(np.asarray(values).astype(np.float64))
+    return exponent
+
+
+def _sparse_entries(hashes):
+    """Sparse entries of hashes: the SPARSE_PRECISION-bit bucket and rank, packed."""
+    import numpy as np
+
+    rest_bits = 64 - SPARSE_PRECISION
+    bucket = hashes >> np.uint64(rest_bits)
+    rest = hashes & np.uint64((1 << rest_bits) - 1)
+    rank = (rest_bits + 1 - _bit_length(rest)).astype(np.uint64)
+    return ((bucket << np.uint64(_RANK_BITS)) | rank).astype(np.uint32)
+
+
+def _dedupe(entries):
+    """Sorted entries keeping the highest rank per bucket."""
+    import numpy as np
+
+    entries = np.sort(entries)
+    buckets = entries >> np.uint32(_RANK_BITS)
+    last = np.ones(len(entries), dtype=bool)
+    last[:-1] = buckets[1:] != buckets[:-1]
+    return entries[last]
+
+
+def _dense_registers(entries):
+    """Dense registers equivalent to sparse entries."""
+    import numpy as np
+
+    registers = np.zeros(REGISTERS, dtype=np.uint8)
+    bucket = (entries >> np.uint32(_RANK_BITS)).astype(np.int64)
+    rank = (entries & np.uint32((1 << _RANK_BITS) - 1)).astype(np.int64)
+    low_bits = SPARSE_PRECISION - PRECISION
+    low = bucket & ((1 << low_bits) - 1)
+    # The run of zeros ends within the extra bucket bits, or continues into the rest
+    value = np.where(low > 0, low_bits + 1 - _bit_length(low), low_bits + rank)
+    np.maximum.at(registers, bucket >> low_bits, value.astype(np.uint8))
+    return registers
+
+
+def _encode(entries):
+    """Stored form of deduplicated sparse entries: sparse while small enough."""
+    import numpy as np
+
+    if len(entries) <= SPARSE_LIMIT:
+        return bytes([SPARSE]) + entries.astype("<u4").tobytes()
+    return bytes([DENSE]) + _dense_registers(entries).astype(np.uint8).tobytes()
+
+
+def _decode(sketch):
+    """``(entries, None)`` of a stored sparse sketch, ``(None, registers)`` of a dense one."""
+    import numpy as np
+
+    sketch = bytes(sketch)
+    if sketch[:1] == bytes([DENSE]):
+        return None, np.frombuffer(sketch, dtype=np.uint8, offset=1)
+    return np.frombuffer(sketch, dtype="<u4", offset=min(len(sketch), 1)).astype(np.uint32), None
+
+
+def build_sketches(groups, hashes):
+    """
+    One sketch per group: ``groups`` (int array) names the group of each of
+    ``hashes``. Returns a dict mapping group to stored sketch.
+    """
+    import numpy as np
+
+    groups = np.asarray(groups, dtype=np.int64)
+    if not len(groups):
+        return {}
+    entries = _sparse_entries(hashes)
+
+    # Per (group, bucket) keep the highest rank: the last after sorting
+    order = np.lexsort((entries, groups))
+    groups, entries = groups[order], entries[order]
+    buckets = entries >> np.uint32(_RANK_BITS)
+    last = np.ones(len(groups), dtype=bool)
+    last[:-1] = (groups[1:] != groups[:-1]) | (buckets[1:] != buckets[:-1])
+    groups, entries = groups[last], entries[last]
+
+    starts = np.concatenate(([0], np.flatnonzero(groups[1:] != groups[:-1]) + 1))
+    ends = np.append(starts[1:], len(groups))
+    return {
+        int(groups[start]): _encode(entries[start:end]) for start, end in zip(starts, ends)
+    }
+
+
+def _merge(sketches):
+    """Merged ``(entries, None)`` while sparse, else ``(None, registers)``."""
+    import numpy as np
+
+    sparse, dense = [], []
+    for sketch in sketches:
+        entries, registers = _decode(sketch)
+        if registers is None:
+            sparse.append(entries)
+        else:
+            dense.append(registers)
+
+    entries = _dedupe(np.concatenate(sparse)) if sparse else np.zeros(0, dtype=np.uint32)
+    if not dense and len(entries) <= SPARSE_LIMIT:
+        return entries, None
+    registers = _dense_registers(entries)
+    for other in dense:
+        np.maximum(registers, other, out=registers)
+    return None, registers
+
+
+def merge(sketches):
+    """Merge stored sketches into one stored sketch."""
+    entries, registers = _merge(sketches)
+    if registers is None:
+        return _encode(entries)
+    return bytes([DENSE]) + registers.tobytes()
+
+
+def estimate(registers):
+    """Estimated number of distinct values behind a dense register array."""
+    import numpy as np
+
+    alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+    raw = alpha * REGISTERS * REGISTERS / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * REGISTERS and zeros:
+        # Linear counting is more accurate while registers are still empty
+        return REGISTERS * math.log(REGISTERS / zeros)
+    return raw
+
+
+def count_distinct(sketches):
+    """Estimated number of distinct values across stored sketches, rounded."""
+    entries, registers = _merge(sketches)
+    if registers is not None:
+        return round(estimate(registers))
+    # Linear counting over the sparse buckets
+    buckets = 1 << SPARSE_PRECISION
+    return round(buckets * math.log(buckets / (buckets - len(entries))))
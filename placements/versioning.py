@@ -0,0 +1,76 @@
+"""
+Version counters for placement data.
+
+Anything derived from the placements table (cached analytics, rollups,
+dimension lists) keys itself on the current data version, so invalidating
+all of it is a single counter bump instead of a cache sweep.
+
+Data derived from one physician's placements only (their schedule) keys
+itself on that physician's version as well, which is bumped only when
+their rows change, so it survives changes to everyone else's.
+"""
+
+import time
+
+from django.core.cache import cache
+
+DATA_VERSION_KEY = "placements:data_version"
+
+PHYSICIAN_VERSION_KEY = "placements:physician_version:{}"
+
+
+def _seed_version():
+    """
+    Starting value for a counter when it is missing from the cache.
+
+    Derived from the clock so a counter that was evicted never restarts
+    below a version that may still have entries cached under it.
+    """
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing or evicted; re-seed rather than restart from 1
+        version = _seed_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_data_version():
+    """Return the current placement data version."""
+    return _get_version(DATA_VERSION_KEY)
+
+
+def bump_data_version():
+    """Invalidate everything derived from placement data. Returns the new version."""
+    return _bump_version(DATA_VERSION_KEY)
+
+
+def get_physician_version(physician_id):
+    """Return the version of one physician's placements."""
+    return _get_version(PHYSICIAN_VERSION_KEY.format(physician_id))
+
+
+def bump_physician_versions(physician_ids):
+    """Invalidate what is derived from these physicians' placements."""
+    for physician_id in set(physician_ids) - {None}:
+        _bump_version(PHYSICIAN_VERSION_KEY.format(physician_id))
+
+
+def physicians_of(queryset):
+    """
+    Physician IDs of the placements in ``queryset``, read before a bulk
+    change so their versions can be bumped once it is committed.
+    """
+    return set(queryset.order_by().values_list("physician_id", flat=True).distinct())
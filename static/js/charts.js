@@ -32,10 +32,12 @@
     };
   }
 
-  // Fetch analytics data from API
+  // Fetch analytics data from API (columnar format)
   async function fetchAnalyticsData(filterParams = "") {
     try {
-      const response = await fetch(`/dashboard/api/analytics/?${filterParams}`);
+      const response = await fetch(
+        `/dashboard/api/analytics/?format=columnar&${filterParams}`
+      );
       if (!response.ok) {
         throw new Error("Failed to fetch analytics data");
       }
@@ -46,15 +48,38 @@
     }
   }
 
+  // Labels and values of one facet
+  function facetData(data, field) {
+    const facet = data.facets[field];
+    return { labels: facet.labels, values: facet.counts };
+  }
+
+  // Expand the time series (start date plus offsets of the days with
+  // placements) into one label and value per day
+  function timeSeriesData(data) {
+    const series = data.time_series;
+    const start = new Date(`${series.start}T00:00:00Z`);
+    const labels = [];
+    const values = new Array(series.days).fill(0);
+
+    for (let i = 0; i < series.days; i++) {
+      const day = new Date(start);
+      day.setUTCDate(start.getUTCDate() + i);
+      labels.push(day.toISOString().slice(0, 10));
+    }
+    series.offsets.forEach((offset, i) => {
+      values[offset] = series.counts[i];
+    });
+
+    return { labels, values };
+  }
+
   // Create or update department chart
   function createDepartmentChart(data, colors) {
     const ctx = document.getElementById("departmentChart");
     if (!ctx) return;
 
-    const labels = data.department_stats.map(
-      (item) => item.department || "Unknown"
-    );
-    const values = data.department_stats.map((item) => item.count);
+    const { labels, values } = facetData(data, "department");
 
     if (charts.department) {
       charts.department.destroy();
@@ -111,10 +136,7 @@
     const ctx = document.getElementById("specialtyChart");
     if (!ctx) return;
 
-    const labels = data.specialty_stats.map(
-      (item) => item.specialty || "Unknown"
-    );
-    const values = data.specialty_stats.map((item) => item.count);
+    const { labels, values } = facetData(data, "specialty");
 
     if (charts.specialty) {
       charts.specialty.destroy();
@@ -171,8 +193,7 @@
     const ctx = document.getElementById("shiftChart");
     if (!ctx) return;
 
-    const labels = data.shift_stats.map((item) => item.shift || "Unknown");
-    const values = data.shift_stats.map((item) => item.count);
+    const { labels, values } = facetData(data, "shift");
 
     if (charts.shift) {
       charts.shift.destroy();
@@ -246,8 +267,7 @@
     const ctx = document.getElementById("statusChart");
     if (!ctx) return;
 
-    const labels = data.status_stats.map((item) => item.status || "Unknown");
-    const values = data.status_stats.map((item) => item.count);
+    const { labels, values } = facetData(data, "status");
 
     if (charts.status) {
       charts.status.destroy();
@@ -304,8 +324,7 @@
     const ctx = document.getElementById("timeSeriesChart");
     if (!ctx) return;
 
-    const labels = data.time_series.map((item) => item.date);
-    const values = data.time_series.map((item) => item.count);
+    const { labels, values } = timeSeriesData(data);
 
     if (charts.timeSeries) {
       charts.timeSeries.destroy();
@@ -392,6 +411,95 @@
     createTimeSeriesChart(data, colors);
   }
 
+  // Live updates: the stream sends a snapshot on connect, then only the
+  // counts that changed, which are patched into the existing charts
+  const FACETS = ["department", "specialty", "shift", "status"];
+  let stream = null;
+
+  function setChartData(chart, labels, values) {
+    chart.data.labels = labels;
+    chart.data.datasets[0].data = values;
+    chart.update("none");
+  }
+
+  function patchFacetChart(chart, changes) {
+    Object.entries(changes).forEach(([label, count]) => {
+      const index = chart.data.labels.indexOf(label);
+      if (index === -1) {
+        chart.data.labels.push(label);
+        chart.data.datasets[0].data.push(count);
+      } else {
+        chart.data.datasets[0].data[index] = count;
+      }
+    });
+    chart.update("none");
+  }
+
+  // Statistic cards of the home page; statusCounts may be partial
+  function updateTotals(totalCount, statusCounts = {}) {
+    const cards = {
+      totalPlacements: totalCount,
+      fullTimePlacements: statusCounts["Full Time"],
+      partTimePlacements: statusCounts["Part Time"],
+    };
+    Object.entries(cards).forEach(([id, value]) => {
+      const element = document.getElementById(id);
+      if (element && value !== undefined) {
+        element.textContent = value;
+      }
+    });
+  }
+
+  function applySnapshot(data) {
+    FACETS.forEach((field) => {
+      if (charts[field]) {
+        const { labels, values } = facetData(data, field);
+        setChartData(charts[field], labels, values);
+      }
+    });
+    if (charts.timeSeries) {
+      const { labels, values } = timeSeriesData(data);
+      setChartData(charts.timeSeries, labels, values);
+    }
+    const { labels, values } = facetData(data, "status");
+    const statusCounts = {};
+    labels.forEach((label, i) => {
+      statusCounts[label] = values[i];
+    });
+    updateTotals(data.total_count, statusCounts);
+  }
+
+  function applyDelta(delta) {
+    const facets = delta.facets || {};
+    Object.entries(facets).forEach(([field, changes]) => {
+      if (charts[field]) {
+        patchFacetChart(charts[field], changes);
+      }
+    });
+    if (delta.time_series && charts.timeSeries) {
+      const { labels, values } = timeSeriesData(delta);
+      setChartData(charts.timeSeries, labels, values);
+    }
+    updateTotals(delta.total_count, facets.status);
+  }
+
+  // Subscribe to live updates (needs the ASGI deployment; the sync server
+  // answers 204, after which the browser does not reconnect)
+  function connectAnalyticsStream(filterParams = "") {
+    if (typeof EventSource === "undefined") return null;
+    if (stream) {
+      stream.close();
+    }
+    stream = new EventSource(`/dashboard/api/analytics/stream/?${filterParams}`);
+    stream.addEventListener("snapshot", (event) => {
+      applySnapshot(JSON.parse(event.data));
+    });
+    stream.addEventListener("delta", (event) => {
+      applyDelta(JSON.parse(event.data));
+    });
+    return stream;
+  }
+
   // Update charts when theme changes
   function updateChartsTheme(theme) {
     if (Object.keys(charts).length > 0) {
@@ -404,4 +512,5 @@
   // Expose functions globally
   window.initializeCharts = initializeCharts;
   window.updateChartsTheme = updateChartsTheme;
+  window.connectAnalyticsStream = connectAnalyticsStream;
 })();